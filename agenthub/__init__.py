@@ -2,16 +2,18 @@ from dotenv import load_dotenv
 
 load_dotenv()
 
-from . import (  # noqa: E402
-    browsing_agent,
-    dummy_web_agent,
-    reasoner_agent_fast,
-    reasoner_agent_full,
-)
+from easyweb.controller.agent import Agent  # noqa: E402
 
-__all__ = [
-    'browsing_agent',
-    'dummy_web_agent',
-    'reasoner_agent_full',
-    'reasoner_agent_fast',
-]
+# Agent modules are imported on first use (Agent.get_cls), so a server that only
+# runs BrowsingAgent never imports the reasoner agents' dependencies.
+AGENT_MODULES = {
+    'BrowsingAgent': 'agenthub.browsing_agent',
+    'DummyWebAgent': 'agenthub.dummy_web_agent',
+    'ReasonerAgentFull': 'agenthub.reasoner_agent_full',
+    'ReasonerAgentFast': 'agenthub.reasoner_agent_fast',
+}
+
+for agent_name, agent_module in AGENT_MODULES.items():
+    Agent.register_lazy(agent_name, agent_module)
+
+__all__ = ['AGENT_MODULES']
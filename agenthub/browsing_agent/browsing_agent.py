@@ -1,6 +1,6 @@
+import asyncio
+import contextvars
 import os
-import random
-import time
 from datetime import datetime
 
 from browsergym.core.action.highlevel import HighLevelActionSet
@@ -37,46 +37,66 @@ if not USE_NAV and USE_CONCISE_ANSWER:
 else:
     EVAL_MODE = False
 
+# stop right after the action block. Streams stop on the parser's
+# `is_complete` instead: with these, the closing fence it waits for never arrives.
+STOP_SEQUENCES = [')```', ')\n```']
+
 
 def get_error_prefix(last_browser_action: str) -> str:
     return f'IMPORTANT! Last action is incorrect:\n{last_browser_action}\nThink again with the current observation of the page.\n'
 
 
-def get_system_message(goal: str, action_space: str) -> str:
-    current_datetime = datetime.now().strftime('%a, %b %d, %Y %H:%M:%S')
+CONCISE_INSTRUCTION = """\
 
-    return f"""\
+Here is another example with chain of thought of a valid action when providing a concise answer to user:
+"
+In order to accomplish my goal I need to send the information asked back to the user. This page list the information of HP Inkjet Fax Machine, which is the product identified in the objective. Its price is $279.49. I will send a message back to user with the answer.
+```send_msg_to_user("$279.49")```
+"
+"""
+
+
+# The system message holds everything that is the same for every step and
+# session, so it forms a stable prompt prefix the provider can cache. The goal,
+# the date and the page state go in the user message after it.
+def get_system_message(action_space: str) -> str:
+    prompt = f"""\
 # Instructions
 Review the current state of the page and all other information to find the best
 possible next action to accomplish your goal. Use Google Flights for questions \
 related to flight search. Your answer will be interpreted
 and executed by a program, make sure to follow the formatting instructions.
 
-# Goal:
-{goal}
-
 # Action Space
 {action_space}
 
-# Current Date and Time:
-{current_datetime}
-"""
-
-
-CONCISE_INSTRUCTION = """\
-
-Here is another example with chain of thought of a valid action when providing a concise answer to user:
+Here is an example with chain of thought of a valid action when clicking on a button:
 "
-In order to accomplish my goal I need to send the information asked back to the user. This page list the information of HP Inkjet Fax Machine, which is the product identified in the objective. Its price is $279.49. I will send a message back to user with the answer.
-```send_msg_to_user("$279.49")```
+In order to accomplish my goal I need to click on the button with bid 12
+```click("12")```
 "
 """
+    if USE_CONCISE_ANSWER:
+        prompt += CONCISE_INSTRUCTION
+    return prompt
 
 
 def get_prompt(
-    error_prefix: str, cur_url: str, cur_axtree_txt: str, prev_action_str: str
+    goal: str,
+    error_prefix: str,
+    cur_url: str,
+    cur_axtree_txt: str,
+    prev_action_str: str,
 ) -> str:
-    prompt = f"""\
+    current_datetime = datetime.now().strftime('%a, %b %d, %Y %H:%M:%S')
+
+    return f"""\
+# Goal:
+{goal}
+
+# Current Date and Time:
+{current_datetime}
+
 {error_prefix}
 
 # Current Page URL:
@@ -87,16 +107,7 @@ def get_prompt(
 
 # Previous Actions
 {prev_action_str}
-
-Here is an example with chain of thought of a valid action when clicking on a button:
-"
-In order to accomplish my goal I need to click on the button with bid 12
-```click("12")```
-"
 """.strip()
-    if USE_CONCISE_ANSWER:
-        prompt += CONCISE_INSTRUCTION
-    return prompt
 
 
 class BrowsingAgent(Agent):
@@ -130,6 +141,10 @@ class BrowsingAgent(Agent):
             multiaction=True,  # enable to agent to take multiple actions at once
         )
         self.max_steps = 30
+        # identical for every step, built once
+        self.system_message = get_system_message(
+            self.action_space.describe(with_long_description=False, with_examples=True)
+        )
 
         self.reset()
 
@@ -152,6 +167,58 @@ class BrowsingAgent(Agent):
         - MessageAction(content) - Message action to run (e.g. ask for clarification)
         - AgentFinishAction() - end the interaction
         """
+        prepared = self._prepare_step(state)
+        if isinstance(prepared, Action):
+            return prepared
+
+        if self.llm.streaming:
+            response = self.llm.stream_completion(
+                messages=prepared,
+                on_partial=self._on_partial_response,
+                is_complete=self.response_parser.is_complete,
+            )
+        else:
+            response = self.llm.completion(messages=prepared, stop=STOP_SEQUENCES)
+
+        self.log_cost(response)
+
+        return self.response_parser.parse(response)
+
+    async def astep(self, state: State) -> Action:
+        """
+        Async version of `step`: waits on the LLM without holding a worker thread.
+        """
+        loop = asyncio.get_running_loop()
+        # flattening the accessibility tree of a large page takes a while
+        prepared = await loop.run_in_executor(
+            None, contextvars.copy_context().run, self._prepare_step, state
+        )
+        if isinstance(prepared, Action):
+            return prepared
+
+        if self.llm.streaming:
+            response = await self.llm.astream_completion(
+                messages=prepared,
+                on_partial=self._on_partial_response,
+                is_complete=self.response_parser.is_complete,
+            )
+        else:
+            response = await self.llm.acompletion(
+                messages=prepared, stop=STOP_SEQUENCES
+            )
+
+        self.log_cost(response)
+
+        return self.response_parser.parse(response)
+
+    def _on_partial_response(self, partial_response: str):
+        self.emit_partial_thought(self.response_parser.get_thought(partial_response))
+
+    def _prepare_step(self, state: State) -> Action | list[dict]:
+        """
+        Builds the LLM messages for this step, or returns the action to take
+        directly when no LLM call is needed.
+        """
         messages = []
         prev_actions = []
         cur_url = ''
@@ -160,12 +227,6 @@ class BrowsingAgent(Agent):
         last_obs = None
         last_action = None
 
-        if len(state.history) == 1:
-            logger.info('Sleeping')
-            time.sleep(10 + 5 * random.random())
-        else:
-            time.sleep(5 + random.random() * 5)
-
         if EVAL_MODE and len(state.history) == 1:
             # for webarena and miniwob++ eval, we need to retrieve the initial observation already in browser env
             # initialize and retrieve the first observation by issuing an noop OP
@@ -231,24 +292,13 @@ class BrowsingAgent(Agent):
         if goal is None:
             goal = state.inputs['task']
 
-        system_msg = get_system_message(
-            goal,
-            self.action_space.describe(with_long_description=False, with_examples=True),
-        )
-
-        messages.append({'role': 'system', 'content': system_msg})
-
-        prompt = get_prompt(error_prefix, cur_url, cur_axtree_txt, prev_action_str)
-        messages.append({'role': 'user', 'content': prompt})
+        messages.append({'role': 'system', 'content': self.system_message})
 
-        response = self.llm.completion(
-            messages=messages,
-            stop=[')```', ')\n```'],
+        prompt = get_prompt(
+            goal, error_prefix, cur_url, cur_axtree_txt, prev_action_str
         )
-
-        self.log_cost(response)
-
-        return self.response_parser.parse(response)
+        messages.append({'role': 'user', 'content': prompt})
+        return messages
 
     def search_memory(self, query: str) -> list[str]:
         raise NotImplementedError('Implement this abstract method')
@@ -19,6 +19,23 @@ class BrowsingResponseParser:
         action_str = self.parse_response(response)
         return self.parse_action(action_str)
 
+    def is_complete(self, partial_response: str) -> bool:
+        """
+        Whether a streamed response already holds a complete action, i.e. a
+        closed code block. Anything the model writes after it is ignored by
+        `parse` anyway.
+
+        The action block may hold several calls, so an open block is not
+        complete even if its last call is: only the closing fence tells.
+        """
+        return partial_response.count('```') >= 2
+
+    def get_thought(self, partial_response: str) -> str:
+        """
+        Returns the thought part of a (partial) response, i.e. the text before the action.
+        """
+        return partial_response.split('```')[0].strip()
+
     def parse_response(self, response) -> str:
         action_str = response['choices'][0]['message']['content']
         if action_str is None:
@@ -256,6 +256,11 @@ class BeamSearch(SearchAlgorithm, Generic[State, Action]):
         terminal_beam = []
 
         for depth in range(self.max_depth + 1):
+            if self.should_stop():
+                if self.early_terminate:
+                    # keep the partial beam so the caller still gets a result
+                    terminal_beam.extend(cur_beam)
+                break
             # when depth == max_depth, we need to add the cur_beam to terminal_beam
             new_beam = []
             cache_for_dedup = set()
@@ -114,6 +114,8 @@ class DFS(SearchAlgorithm, Generic[State, Action]):
         # Stop if max_terminal_nodes is reached
         if len(self.terminals) >= self.max_terminal_nodes:
             return
+        if self.should_stop() and self.terminals:
+            return
 
         ## if it's terminal state
         if world.is_terminal(cur_node.state) or cur_node.depth == self.depth:
@@ -286,6 +286,8 @@ class MCTS(SearchAlgorithm, Generic[State, Action, Example]):
     def _simulate(self, path: list[MCTSNode]):
         node = path[-1]
         while True:
+            if self.should_stop():
+                return
             if node.state is None:
                 self._expand(node)
             if self._is_terminal_with_depth_limit(node) or len(node.children) == 0:
@@ -334,6 +336,8 @@ class MCTS(SearchAlgorithm, Generic[State, Action, Example]):
         for _ in trange(
             self.n_iters, disable=self.disable_tqdm, desc='MCTS iteration', leave=False
         ):
+            if self.should_stop():
+                break
             path = self.iterate(self.root)
             if self.output_trace_in_each_iter:
                 self.trace_in_each_iter.append(deepcopy(path))
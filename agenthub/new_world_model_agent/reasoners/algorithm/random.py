@@ -24,6 +24,8 @@ class RandomShooting(SearchAlgorithm, Generic[State, Action]):
     def __call__(self, world, config):
         trajectories = []
         for _ in range(self.n_shoot):
+            if self.should_stop() and trajectories:
+                break
             trajectory = []
             state = world.init_state()
             for _ in range(self.max_depth):
@@ -1,10 +1,12 @@
 # from transformers import StoppingCriteriaList
+import copy
 import os
 import pickle
 import sys
 from abc import ABC, abstractmethod
 from datetime import datetime
 from typing import (
+    Callable,
     Generic,
     NamedTuple,
     Optional,
@@ -16,8 +18,9 @@ from typing import (
 )
 
 import numpy as np
-import torch
-from tqdm import tqdm
+
+from easyweb.core.cancellation import get_current_token
+from easyweb.llm.batch import run_batch
 
 State = TypeVar('State')
 Action = TypeVar('Action')
@@ -174,8 +177,20 @@ class AlgorithmOutput(Protocol[State]):
 
 
 class SearchAlgorithm(ABC):
+    # Cooperative cancellation: search loops poll should_stop() between
+    # expansions and stop early (returning the best result so far). It follows
+    # stop_check when set, and otherwise the cancellation token of the agent
+    # step the search runs in, so stop/pause interrupts it without any wiring.
+    stop_check: Optional[Callable[[], bool]] = None
+
     def __init__(self, **kwargs): ...
 
+    def should_stop(self) -> bool:
+        if self.stop_check is not None:
+            return self.stop_check()
+        token = get_current_token()
+        return token is not None and token.cancelled
+
     @abstractmethod
     def __call__(
         self, world_model: WorldModel, search_config: SearchConfig, **kwargs
@@ -200,6 +215,23 @@ class Reasoner(ABC, Generic[State, Action, Example]):
         self.search_config.update_example(example, prompt=prompt)
         return self.search_algo(self.world_model, self.search_config, **kwargs)
 
+    def fork(self) -> 'Reasoner':
+        """
+        A copy that can run concurrently with this reasoner: the per-example and
+        per-search state lives on its own deep copies, the language models are shared.
+        """
+        memo = {
+            id(value): value
+            for component in (self.world_model, self.search_config, self.search_algo)
+            for value in getattr(component, '__dict__', {}).values()
+            if isinstance(value, LanguageModel)
+        }
+        return Reasoner(
+            copy.deepcopy(self.world_model, memo),
+            copy.deepcopy(self.search_config, memo),
+            copy.deepcopy(self.search_algo, memo),
+        )
+
 
 class Evaluator:
     @abstractmethod
@@ -213,6 +245,10 @@ class Evaluator:
     def evaluate(
         self, reasoner, shuffle_prompt=True, num_shot=4, resume=0, log_dir=None
     ):
+        # only evaluation needs these; importing torch costs seconds and memory
+        import torch
+        from tqdm import tqdm
+
         self.dataset = list(self.full_dataset)[resume:]
         try:
             algo_name = reasoner.search_algo.__class__.__name__
@@ -279,8 +315,25 @@ class Evaluator:
         return accuracy
 
     def evaluate_sc(
-        self, reasoner, shuffle_prompt=True, num_shot=4, resume=0, n_sc=10, log_dir=None
+        self,
+        reasoner,
+        shuffle_prompt=True,
+        num_shot=4,
+        resume=0,
+        n_sc=10,
+        log_dir=None,
+        sc_concurrency=1,
     ):
+        """
+        Self-consistency evaluation: runs the reasoner n_sc times per example and
+        takes the majority answer. With sc_concurrency > 1 the runs of an example
+        go out as one batch on forked reasoners, like the samples of
+        `LLM.batch_completion`, so their LLM calls overlap instead of being n_sc
+        serial round trips; runs that fail are left out of the vote.
+        """
+        import torch
+        from tqdm import tqdm
+
         self.dataset = list(self.full_dataset)[resume:]
         try:
             algo_name = reasoner.search_algo.__class__.__name__
@@ -319,8 +372,9 @@ class Evaluator:
             )
             output_list = []
             save_list = []
-            for j in range(n_sc):
-                algo_output = reasoner(self.input_processor(example), prompt=prompt)
+            for algo_output in self._run_sc(
+                reasoner, example, prompt, n_sc, sc_concurrency
+            ):
                 terminal_state = algo_output.terminal_state
                 path = ''
                 for k in range(len(terminal_state)):
@@ -357,6 +411,27 @@ class Evaluator:
 
         return accuracy
 
+    def _run_sc(self, reasoner, example, prompt, n_sc, sc_concurrency):
+        """
+        Runs the reasoner n_sc times on the example and returns the outputs in
+        run order, skipping failed runs unless all of them fail.
+        """
+        if sc_concurrency <= 1:
+            return [
+                reasoner(self.input_processor(example), prompt=prompt)
+                for _ in range(n_sc)
+            ]
+
+        def run():
+            return reasoner.fork()(self.input_processor(example), prompt=prompt)
+
+        # the runs see the step's cancellation token, so a stop ends them all
+        results = run_batch([run] * n_sc, sc_concurrency, 'reasoner-sc')
+        outputs = [result for result in results if not isinstance(result, Exception)]
+        if not outputs:
+            raise results[0]
+        return outputs
+
     @abstractmethod
     def eval_output(self, answer, output):
         pass
@@ -0,0 +1,82 @@
+from typing import Optional, Union
+
+import numpy as np
+
+from easyweb.core.logger import easyweb_logger as logger
+from easyweb.llm.llm import LLM
+
+from .. import GenerateOutput, LanguageModel
+
+
+class EasyWebModel(LanguageModel):
+    """
+    A language model backed by an easyweb LLM, so reasoner calls share its
+    retries, rate limiter, response cache and metrics.
+
+    The samples of `num_return_sequences` go out as concurrent requests through
+    `LLM.batch_completion` rather than as one request with `n`, which many
+    providers ignore.
+    """
+
+    def __init__(
+        self,
+        llm: LLM,
+        max_tokens: int = 2048,
+        temperature=0.0,
+        max_concurrency: Optional[int] = None,
+    ):
+        self.llm = llm
+        self.max_tokens = max_tokens
+        self.temperature = temperature
+        self.max_concurrency = max_concurrency
+
+    def generate(
+        self,
+        prompt: Optional[Union[str, list[str]]],
+        max_tokens: int = None,
+        top_p: float = 1.0,
+        num_return_sequences: int = 1,
+        stop: Optional[Union[str, list[str]]] = None,
+        temperature=None,
+        **kwargs,
+    ) -> GenerateOutput:
+        prompts = [prompt] if isinstance(prompt, str) else list(prompt)
+        request = {
+            'max_tokens': self.max_tokens if max_tokens is None else max_tokens,
+            'temperature': self.temperature if temperature is None else temperature,
+            'top_p': top_p,
+        }
+        if stop is not None:
+            request['stop'] = stop
+        requests = [
+            {**request, 'messages': [{'role': 'user', 'content': p}]}
+            for p in prompts
+            for _ in range(num_return_sequences)
+        ]
+        responses = self.llm.batch_completion(requests, self.max_concurrency)
+        text = []
+        for response in responses:
+            if isinstance(response, Exception):
+                continue
+            text.append(response['choices'][0]['message']['content'])
+        if not text:
+            # every sample failed; surface the first error
+            raise responses[0]
+        if len(text) < len(responses):
+            logger.warning(
+                f'{len(responses) - len(text)} of {len(responses)} samples failed'
+            )
+        return GenerateOutput(text=text, log_prob=None)
+
+    def get_next_token_logits(
+        self,
+        prompt: Union[str, list[str]],
+        candidates: Union[list[str], list[list[str]]],
+        **kwargs,
+    ) -> list[np.ndarray]:
+        raise NotImplementedError('EasyWebModel does not support get_next_token_logits')
+
+    def get_loglikelihood(
+        self, prompt: Union[str, list[str]], **kwargs
+    ) -> list[np.ndarray]:
+        raise NotImplementedError('EasyWebModel does not support get_loglikelihood')
@@ -39,7 +39,12 @@ class ReasonerAgentFast(Agent):
         if 'o1' in llm.model_name or 'o3-mini' in llm.model_name:
             llm = {
                 'default': LLM(
-                    model='gpt-4o', api_key=llm.api_key, base_url=llm.base_url
+                    model='gpt-4o',
+                    api_key=llm.api_key,
+                    base_url=llm.base_url,
+                    # the controller reports the first LLM's metrics, so both
+                    # LLMs must account into the same object
+                    metrics=llm.metrics,
                 ),
                 'policy': llm,
             }
@@ -49,6 +54,7 @@ class ReasonerAgentFast(Agent):
                     model='deepseek/deepseek-chat',
                     api_key=llm.api_key,
                     base_url=llm.base_url,
+                    metrics=llm.metrics,
                 ),
                 'policy': llm,
             }
@@ -0,0 +1,12 @@
+from .log import MessageLog, load_messages
+from .screenshots import ScreenshotRef, ScreenshotWindow, decode_screenshot
+from .session import SessionClient
+
+__all__ = [
+    'MessageLog',
+    'load_messages',
+    'ScreenshotRef',
+    'ScreenshotWindow',
+    'decode_screenshot',
+    'SessionClient',
+]
@@ -0,0 +1,56 @@
+import json
+import os
+
+__all__ = ['MessageLog', 'load_messages']
+
+
+class MessageLog:
+    """
+    Appends the raw messages of a session to a JSONL file as they arrive.
+
+    Only the offset of each event in the file is kept, so a message can be
+    read back, e.g. to decode an old screenshot, without being held in memory.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.offsets: dict[int, int] = {}
+        self._file = open(path, 'ab')
+        self._file.seek(0, os.SEEK_END)
+
+    def write(self, message: dict) -> None:
+        if self._file.closed:
+            return
+        event_id = message.get('id')
+        if isinstance(event_id, int):
+            self.offsets[event_id] = self._file.tell()
+        self._file.write(json.dumps(message).encode() + b'\n')
+        # readable by read() and by the log visualizer right away
+        self._file.flush()
+
+    def read(self, event_id: int) -> dict | None:
+        offset = self.offsets.get(event_id)
+        if offset is None:
+            return None
+        with open(self.path, 'rb') as f:
+            f.seek(offset)
+            return json.loads(f.readline())
+
+    def screenshot(self, event_id: int) -> str | None:
+        message = self.read(event_id)
+        if message is None:
+            return None
+        return message.get('extras', {}).get('screenshot')
+
+    def close(self) -> None:
+        self._file.close()
+
+
+def load_messages(path: str) -> list[dict]:
+    """
+    Loads a message log, either JSONL or the JSON list written by older versions.
+    """
+    with open(path, 'r') as f:
+        if path.endswith('.json'):
+            return json.load(f)
+        return [json.loads(line) for line in f if line.strip()]
@@ -0,0 +1,97 @@
+import base64
+from collections import OrderedDict
+from dataclasses import dataclass
+from io import BytesIO
+from typing import Callable
+
+from PIL import Image
+
+__all__ = ['ScreenshotRef', 'ScreenshotWindow', 'decode_screenshot']
+
+
+@dataclass
+class ScreenshotRef:
+    """
+    A screenshot received by the client.
+
+    Attributes:
+        event_id: The id of the browser observation carrying it, None if it had none.
+        url: The URL of the page.
+    """
+
+    event_id: int | None
+    url: str
+
+
+def decode_screenshot(screenshot: str) -> Image.Image:
+    """
+    Decodes a screenshot, either a data URL or plain base64.
+
+    Raises PIL.UnidentifiedImageError if it is not an image.
+    """
+    if screenshot.startswith('data:'):
+        screenshot = screenshot.partition(',')[2]
+    image = Image.open(BytesIO(base64.b64decode(screenshot)))
+    image.load()
+    return image
+
+
+class ScreenshotWindow:
+    """
+    The screenshots of a session: a reference to each, and the last `size` decoded.
+
+    A screenshot that left the window is decoded again on demand from what
+    `load` returns for its event id, e.g. from the message log, so a long
+    session holds a bounded number of images.
+    """
+
+    def __init__(self, size: int = 8, load: Callable[[int], str | None] | None = None):
+        self.size = size
+        self.refs: list[ScreenshotRef] = []
+        self._load = load
+        # by index in refs, least recently used first
+        self._decoded: OrderedDict[int, Image.Image] = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self.refs)
+
+    def __getitem__(self, index: int) -> tuple[Image.Image | None, str]:
+        return self.get(index), self.refs[index].url
+
+    def _keep(self, index: int, image: Image.Image) -> None:
+        self._decoded[index] = image
+        self._decoded.move_to_end(index)
+        while len(self._decoded) > self.size:
+            self._decoded.popitem(last=False)
+
+    def add(
+        self, screenshot: str, url: str, event_id: int | None = None
+    ) -> Image.Image:
+        image = decode_screenshot(screenshot)
+        self.refs.append(ScreenshotRef(event_id, url))
+        self._keep(len(self.refs) - 1, image)
+        return image
+
+    def get(self, index: int) -> Image.Image | None:
+        """
+        Gets the screenshot at `index`, negative from the latest.
+
+        Returns None if it left the window and cannot be loaded again.
+        """
+        index = range(len(self.refs))[index]
+        image = self._decoded.get(index)
+        if image is not None:
+            self._decoded.move_to_end(index)
+            return image
+        event_id = self.refs[index].event_id
+        if self._load is None or event_id is None:
+            return None
+        screenshot = self._load(event_id)
+        if not screenshot:
+            return None
+        image = decode_screenshot(screenshot)
+        self._keep(index, image)
+        return image
+
+    def urls(self) -> list[str]:
+        return [ref.url for ref in self.refs]
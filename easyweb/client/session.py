@@ -0,0 +1,128 @@
+import asyncio
+import json
+
+import aiohttp
+from PIL import UnidentifiedImageError
+
+from .log import MessageLog
+from .screenshots import ScreenshotWindow
+
+__all__ = ['SessionClient']
+
+
+class SessionClient:
+    """
+    An asyncio websocket client for a session on an easyweb backend.
+
+    Each message received is appended to `log` as it arrives instead of being
+    kept, and its screenshot goes to the bounded `screenshots` window. The
+    token and the latest event id are tracked, so `connect` resumes the
+    session, e.g. on another backend.
+
+    Attributes:
+        url: The HTTP URL of the backend.
+        log: The log the raw messages are streamed to.
+        screenshots: The screenshots received, the last ones decoded.
+        token: The session token, once the backend has sent it.
+        latest_event_id: The id of the latest event received.
+    """
+
+    def __init__(
+        self, url: str, log: MessageLog | None = None, screenshot_window: int = 8
+    ):
+        self.url = url
+        self.log = log
+        self.screenshots = ScreenshotWindow(
+            screenshot_window, log.screenshot if log is not None else None
+        )
+        self.token: str | None = None
+        self.latest_event_id = -1
+        self._session: aiohttp.ClientSession | None = None
+        self._ws: aiohttp.ClientWebSocketResponse | None = None
+
+    async def connect(self, url: str | None = None) -> None:
+        """
+        Connects to the backend at `url`, by default the current one, resuming the session if it has a token.
+        """
+        if url is not None:
+            self.url = url
+        if self._ws is not None:
+            await self._ws.close()
+        if self._session is None:
+            self._session = aiohttp.ClientSession()
+        params = {}
+        if self.token is not None:
+            params = {
+                'token': self.token,
+                'latest_event_id': str(self.latest_event_id),
+            }
+        # screenshots exceed the default 4 MB message size
+        self._ws = await self._session.ws_connect(
+            self.url.replace('http', 'ws', 1) + '/ws', params=params, max_msg_size=0
+        )
+
+    async def send(self, payload: dict) -> None:
+        if self._ws is None:
+            raise ConnectionError('Not connected')
+        await self._ws.send_json(payload)
+
+    async def recv(self) -> dict:
+        """
+        Receives the next message.
+
+        A screenshot is moved out of the message into `screenshots`; the
+        message gets its `screenshot_index` there, None if it could not be decoded.
+        """
+        if self._ws is None:
+            raise ConnectionError('Not connected')
+        response = await self._ws.receive()
+        if response.type == aiohttp.WSMsgType.ERROR:
+            raise ConnectionError(f'Websocket error: {self._ws.exception()}')
+        if response.type != aiohttp.WSMsgType.TEXT:
+            raise ConnectionError(f'Websocket closed by the backend: {response.type}')
+        try:
+            message = json.loads(response.data)
+        except json.decoder.JSONDecodeError:
+            message = {
+                'action': 'error',
+                'message': 'Received JSON response cannot be parsed. Skipping..',
+                'response': response.data,
+            }
+        await self._record(message)
+        return message
+
+    async def _record(self, message: dict) -> None:
+        if message.get('token'):
+            self.token = message['token']
+        event_id = message.get('id')
+        if isinstance(event_id, int):
+            self.latest_event_id = max(self.latest_event_id, event_id)
+        # writing the log and decoding the screenshot would stall the loop
+        # the other sessions of the client share
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(None, self._store, message)
+
+    def _store(self, message: dict) -> None:
+        event_id = message.get('id')
+        if self.log is not None:
+            self.log.write(message)
+        extras = message.get('extras')
+        if not isinstance(extras, dict) or not extras.get('screenshot'):
+            return
+        screenshot = extras.pop('screenshot')
+        message['screenshot_index'] = None
+        try:
+            self.screenshots.add(screenshot, extras.get('url', ''), event_id)
+            message['screenshot_index'] = len(self.screenshots) - 1
+        except (UnidentifiedImageError, ValueError):
+            pass
+
+    async def close(self) -> None:
+        if self._ws is not None:
+            await self._ws.close()
+            self._ws = None
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+        if self.log is not None:
+            self.log.close()
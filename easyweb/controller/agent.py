@@ -1,5 +1,7 @@
+import importlib
+import threading
 from abc import ABC, abstractmethod
-from typing import TYPE_CHECKING, Any, Type
+from typing import TYPE_CHECKING, Any, Callable, Type
 
 if TYPE_CHECKING:
     from easyweb.controller.state.state import State
@@ -22,6 +24,9 @@ class Agent(ABC):
     """
 
     _registry: dict[str, Type['Agent']] = {}
+    # agents whose module is imported on first use: name -> module
+    _lazy_registry: dict[str, str] = {}
+    _lazy_import_lock = threading.Lock()
     sandbox_plugins: list[PluginRequirement] = []
     runtime_tools: list[RuntimeTool] = []
 
@@ -31,6 +36,7 @@ class Agent(ABC):
     ):
         self.llm = llm
         self._complete = False
+        self.partial_thought_callback: Callable[[str], None] | None = None
 
     @property
     def complete(self) -> bool:
@@ -50,6 +56,33 @@ class Agent(ABC):
         """
         pass
 
+    async def astep(self, state: 'State') -> 'Action':
+        """
+        Optional async counterpart of `step`. Agents whose step is mostly
+        waiting on the LLM can override this and use `llm.acompletion`; the
+        controller then awaits it on the event loop instead of running `step`
+        in a worker thread.
+        """
+        raise NotImplementedError
+
+    @property
+    def has_astep(self) -> bool:
+        """
+        Indicates whether this agent implements `astep`.
+        """
+        return type(self).astep is not Agent.astep
+
+    def emit_partial_thought(self, thought: str) -> None:
+        """
+        Forwards the partial reasoning of the step in progress, e.g. while the
+        LLM response is streaming, so the UI can show progress.
+
+        Parameters:
+        - thought (str): The thought generated so far.
+        """
+        if self.partial_thought_callback is not None:
+            self.partial_thought_callback(thought)
+
     @abstractmethod
     def search_memory(self, query: str) -> list[str]:
         """
@@ -86,6 +119,26 @@ class Agent(ABC):
         if name in cls._registry:
             raise AgentAlreadyRegisteredError(name)
         cls._registry[name] = agent_cls
+        cls._lazy_registry.pop(name, None)
+
+    @classmethod
+    def register_lazy(cls, name: str, module: str):
+        """
+        Registers an agent by the module that registers its class, without importing it yet.
+
+        The module is imported on the first `get_cls(name)`, so starting the server
+        does not pay for the dependencies of agents that are never used.
+
+        Parameters:
+        - name (str): The name the module registers the class under.
+        - module (str): The module to import, e.g. 'agenthub.browsing_agent'.
+
+        Raises:
+        - AgentAlreadyRegisteredError: If name already registered
+        """
+        if name in cls._registry or name in cls._lazy_registry:
+            raise AgentAlreadyRegisteredError(name)
+        cls._lazy_registry[name] = module
 
     @classmethod
     def get_cls(cls, name: str) -> Type['Agent']:
@@ -101,6 +154,11 @@ class Agent(ABC):
         Raises:
         - AgentNotRegisteredError: If name not registered
         """
+        if name not in cls._registry and name in cls._lazy_registry:
+            with cls._lazy_import_lock:
+                if name in cls._lazy_registry:
+                    # the module registers the class on import
+                    importlib.import_module(cls._lazy_registry[name])
         if name not in cls._registry:
             raise AgentNotRegisteredError(name)
         return cls._registry[name]
@@ -113,6 +171,6 @@ class Agent(ABC):
         Raises:
         - AgentNotRegisteredError: If no agent is registered
         """
-        if not bool(cls._registry):
+        if not bool(cls._registry) and not bool(cls._lazy_registry):
             raise AgentNotRegisteredError()
-        return list(cls._registry.keys())
+        return list(cls._registry.keys()) + list(cls._lazy_registry.keys())
@@ -1,19 +1,26 @@
 import asyncio
+import contextvars
+import time
 import traceback
 from concurrent.futures import ThreadPoolExecutor
 from typing import Optional, Type
 
 from easyweb.controller.agent import Agent
 from easyweb.controller.state.state import State
+from easyweb.core.cancellation import CancellationToken, use_token
 from easyweb.core.config import config
 from easyweb.core.exceptions import (
     AgentMalformedActionError,
     AgentNoActionError,
+    AgentStepCancelledError,
     LLMOutputError,
     MaxCharsExceedError,
 )
 from easyweb.core.logger import easyweb_logger as logger
+from easyweb.core.metrics import Metrics
+from easyweb.core.prometheus import controller_step_seconds
 from easyweb.core.schema import AgentState
+from easyweb.core.tracing import Tracer, current_trace_id, span, trace_context
 from easyweb.events import EventSource, EventStream, EventStreamSubscriber
 from easyweb.events.action import (
     Action,
@@ -31,6 +38,7 @@ from easyweb.events.event import Event
 from easyweb.events.observation import (
     AgentDelegateObservation,
     AgentStateChangedObservation,
+    AgentThoughtObservation,
     CmdOutputObservation,
     ErrorObservation,
     NullObservation,
@@ -40,6 +48,8 @@ from easyweb.events.observation import (
 MAX_ITERATIONS = config.max_iterations
 MAX_CHARS = config.llm.max_chars
 MAX_BUDGET_PER_TASK = config.max_budget_per_task
+# minimum seconds between two partial thoughts sent to the event stream
+PARTIAL_THOUGHT_INTERVAL = 0.5
 
 executor = ThreadPoolExecutor(max_workers=20)
 
@@ -54,6 +64,12 @@ class AgentController:
     parent: 'AgentController | None' = None
     delegate: 'AgentController | None' = None
     _pending_action: Action | None = None
+    _step_token: CancellationToken | None = None
+    _step_task: asyncio.Task | None = None
+    _stepping: bool = False
+    _held: bool = False
+    _step_loop: asyncio.AbstractEventLoop | None = None
+    _last_partial_thought: float = 0.0
 
     def __init__(
         self,
@@ -81,12 +97,14 @@ class AgentController:
         self._step_lock = asyncio.Lock()
         self.id = sid
         self.agent = agent
+        self.agent.partial_thought_callback = self._on_partial_thought
         self.max_chars = max_chars
         if initial_state is None:
             self.state = State(inputs={}, max_iterations=max_iterations)
         else:
             self.state = initial_state
         self.event_stream = event_stream
+        self.tracer = Tracer(sid)
         self.event_stream.subscribe(
             EventStreamSubscriber.AGENT_CONTROLLER, self.on_event, append=is_delegate
         )
@@ -94,22 +112,26 @@ class AgentController:
         if not is_delegate:
             self.agent_task = asyncio.create_task(self._start_step_loop())
 
-    async def close(self):
+    async def close(self, set_stop_state: bool = True):
+        self.cancel_step('controller closed')
         if self.agent_task is not None:
             self.agent_task.cancel()
-        await self.set_agent_state_to(AgentState.STOPPED)
+        if set_stop_state:
+            await self.set_agent_state_to(AgentState.STOPPED)
         self.event_stream.unsubscribe(EventStreamSubscriber.AGENT_CONTROLLER)
 
     def update_state_before_step(self):
         self.state.iteration += 1
 
+    def _get_llm_metrics(self) -> Metrics:
+        if isinstance(self.agent.llm, dict):
+            return list(self.agent.llm.values())[0].metrics
+        return self.agent.llm.metrics
+
     async def update_state_after_step(self):
         self.state.updated_info = []
         # update metrics especially for cost
-        if isinstance(self.agent.llm, dict):
-            self.state.metrics = list(self.agent.llm.values())[0].metrics
-        else:
-            self.state.metrics = self.agent.llm.metrics
+        self.state.metrics = self._get_llm_metrics()
         if self.max_budget_per_task is not None:
             current_cost = self.state.metrics.accumulated_cost
             if current_cost > self.max_budget_per_task:
@@ -130,10 +152,25 @@ class AgentController:
         self.state.history.append((action, observation))
         self.state.updated_info.append((action, observation))
 
+    def hold_steps(self):
+        """Lets the running step finish but starts no new one, e.g. while draining the server."""
+        self._held = True
+
+    @property
+    def step_in_progress(self) -> bool:
+        """Whether a step or the action it returned is still running."""
+        if self.delegate is not None and self.delegate.step_in_progress:
+            return True
+        return self._stepping or self._pending_action is not None
+
     async def _start_step_loop(self):
         logger.info(f'[Agent Controller {self.id}] Starting step loop...')
         while True:
+            if self._held:
+                await asyncio.sleep(0.1)
+                continue
             try:
+                self._stepping = True
                 await self._step()
             except asyncio.CancelledError:
                 logger.info('AgentController task was cancelled')
@@ -147,6 +184,8 @@ class AgentController:
                 )
                 await self.set_agent_state_to(AgentState.ERROR)
                 break
+            finally:
+                self._stepping = False
 
             # yield self.state
             await asyncio.sleep(0.1)
@@ -191,6 +230,45 @@ class AgentController:
     def reset_task(self):
         self.agent.reset()
 
+    def cancel_step(self, reason: str):
+        """Asks the in-flight agent step, if any, to stop as soon as possible."""
+        if self._step_token is not None and not self._step_token.cancelled:
+            logger.info(f'[Agent Controller {self.id}] Cancelling agent step: {reason}')
+            self._step_token.cancel(reason)
+            if self._step_task is not None and self.agent.has_astep:
+                # async steps can be interrupted right away at their current await
+                self._step_task.cancel()
+
+    def _on_partial_thought(self, thought: str):
+        """Sends the partial thought of the running step to the client; may be called from the executor thread."""
+        now = time.monotonic()
+        if not thought or now - self._last_partial_thought < PARTIAL_THOUGHT_INTERVAL:
+            return
+        if self._step_loop is None or self._step_loop.is_closed():
+            return
+        self._last_partial_thought = now
+        # shown while the step runs only, so not persisted
+        coro = self.event_stream.publish(
+            AgentThoughtObservation(content=thought), EventSource.AGENT
+        )
+        try:
+            running_loop = asyncio.get_running_loop()
+        except RuntimeError:
+            running_loop = None
+        if running_loop is self._step_loop:
+            running_loop.create_task(coro)
+        else:
+            asyncio.run_coroutine_threadsafe(coro, self._step_loop)
+
+    def _record_cancelled_step(self, token: CancellationToken):
+        time_to_cancel = token.time_since_cancel()
+        if time_to_cancel is None:
+            return
+        logger.info(
+            f'[Agent Controller {self.id}] Agent step cancelled after {time_to_cancel:.2f}s ({token.reason})'
+        )
+        self._get_llm_metrics().add_cancel_latency(time_to_cancel)
+
     async def set_agent_state_to(self, new_state: AgentState):
         logger.info(
             f'[Agent Controller {self.id}] Setting agent({type(self.agent).__name__}) state from {self.state.agent_state} to {new_state}'
@@ -200,6 +278,8 @@ class AgentController:
             return
 
         self.state.agent_state = new_state
+        if new_state == AgentState.STOPPED or new_state == AgentState.PAUSED:
+            self.cancel_step(f'agent {new_state.value}')
         if new_state == AgentState.STOPPED or new_state == AgentState.ERROR:
             self.reset_task()
 
@@ -235,6 +315,7 @@ class AgentController:
             initial_state=state,
             is_delegate=True,
         )
+        self.delegate.tracer = self.tracer
         await self.delegate.set_agent_state_to(AgentState.RUNNING)
 
     async def _step(self):
@@ -297,22 +378,73 @@ class AgentController:
             await self.set_agent_state_to(AgentState.ERROR)
             return
 
+        start = time.monotonic()
+        with trace_context(self.tracer, self.tracer.start_trace()):
+            with span('controller.step', iteration=self.state.iteration + 1):
+                await self._run_agent_step()
+        controller_step_seconds.observe(
+            time.monotonic() - start, agent=type(self.agent).__name__
+        )
+
+    async def _run_agent_step(self):
+        token = CancellationToken()
+        self._step_token = token
+        self._step_loop = asyncio.get_running_loop()
+
+        def run_agent_step(state: State) -> Action:
+            with use_token(token), span('agent.step'):
+                return self.agent.step(state)
+
         async def run_blocking_function(state: State):
             loop = asyncio.get_running_loop()
-            result = await loop.run_in_executor(executor, self.agent.step, state)
+            # executor threads don't inherit our context; carry the active trace over
+            ctx = contextvars.copy_context()
+            result = await loop.run_in_executor(
+                executor, ctx.run, run_agent_step, state
+            )
             return result
 
+        async def run_async_agent_step(state: State) -> Action:
+            # no thread hop needed: the token and trace live in this task's context
+            with use_token(token), span('agent.step'):
+                return await self.agent.astep(state)
+
         self.update_state_before_step()
         action: Action = NullAction()
         try:
-            task = asyncio.create_task(run_blocking_function(self.state))
+            if self.agent.has_astep:
+                task = asyncio.create_task(run_async_agent_step(self.state))
+            else:
+                task = asyncio.create_task(run_blocking_function(self.state))
+            self._step_task = task
             action = await task
             # action = self.agent.step(self.state)
             if action is None:
                 raise AgentNoActionError('No action was returned')
+        except AgentStepCancelledError:
+            self._step_token = None
+            self._record_cancelled_step(token)
+            return
+        except asyncio.CancelledError:
+            # only swallow the cancellation we caused in cancel_step, not our own
+            current = asyncio.current_task()
+            if not token.cancelled or (current is not None and current.cancelling()):
+                raise
+            self._step_token = None
+            self._record_cancelled_step(token)
+            return
         except (AgentMalformedActionError, AgentNoActionError, LLMOutputError) as e:
+            self._step_token = None
             await self.report_error(str(e))
             return
+        finally:
+            self._step_task = None
+
+        if token.cancelled:
+            # the step finished without noticing the stop request; drop its action
+            self._step_token = None
+            self._record_cancelled_step(token)
+            return
 
         logger.info(action, extra={'msg_type': 'ACTION'})
 
@@ -323,8 +455,20 @@ class AgentController:
             await self.add_history(action, NullObservation(''))
 
         if not isinstance(action, NullAction):
+            trace_id = current_trace_id()
+            if trace_id is not None:
+                action._trace_id = trace_id  # type: ignore[attr-defined]
+            # the runtime runs the action under the step's token, so a stop interrupts it
+            action._cancel_token = token  # type: ignore[attr-defined]
             await self.event_stream.add_event(action, EventSource.AGENT)
+            if token.cancelled and self._pending_action is action:
+                # the action was interrupted; no observation will come for it
+                self._pending_action = None
+                self._step_token = None
+                self._record_cancelled_step(token)
+                return
             # yield action
+        self._step_token = None
 
         if self._is_stuck():
             await self.report_error('Agent got stuck in a loop')
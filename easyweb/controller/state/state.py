@@ -39,7 +39,7 @@ class State:
     error: str | None = None
     agent_state: AgentState = AgentState.LOADING
     resume_state: AgentState | None = None
-    metrics: Metrics = Metrics()
+    metrics: Metrics = field(default_factory=Metrics)
     # root agent has level 0, and every delegate increases the level by one
     delegate_level: int = 0
 
@@ -0,0 +1,95 @@
+import contextvars
+import threading
+import time
+from contextlib import contextmanager
+
+from easyweb.core.exceptions import AgentStepCancelledError
+
+
+class CancellationToken:
+    """
+    A cooperative cancellation token for a single agent step.
+
+    The controller creates one token per step and cancels it when the user
+    stops or pauses the agent. Long-running code (LLM calls, retry waits, search
+    loops, browser IPC) checks the token and unwinds by raising
+    AgentStepCancelledError.
+    """
+
+    def __init__(self) -> None:
+        self._event = threading.Event()
+        self.reason: str | None = None
+        self.cancelled_at: float | None = None
+
+    @property
+    def cancelled(self) -> bool:
+        return self._event.is_set()
+
+    def cancel(self, reason: str = 'cancelled') -> None:
+        if self._event.is_set():
+            return
+        self.reason = reason
+        self.cancelled_at = time.monotonic()
+        self._event.set()
+
+    def raise_if_cancelled(self) -> None:
+        if self._event.is_set():
+            raise AgentStepCancelledError(self.reason)
+
+    def wait(self, timeout: float) -> bool:
+        """
+        Sleeps for up to `timeout` seconds, waking up early on cancellation.
+
+        Returns:
+        - bool: True if the token was cancelled while waiting.
+        """
+        return self._event.wait(timeout)
+
+    def time_since_cancel(self) -> float | None:
+        if self.cancelled_at is None:
+            return None
+        return time.monotonic() - self.cancelled_at
+
+
+_current_token: contextvars.ContextVar[CancellationToken | None] = (
+    contextvars.ContextVar('easyweb_cancellation_token', default=None)
+)
+
+
+def get_current_token() -> CancellationToken | None:
+    return _current_token.get()
+
+
+@contextmanager
+def use_token(token: CancellationToken | None):
+    """
+    Makes `token` the current cancellation token for the enclosed block.
+    """
+    reset_token = _current_token.set(token)
+    try:
+        yield token
+    finally:
+        _current_token.reset(reset_token)
+
+
+def raise_if_cancelled() -> None:
+    """
+    Raises AgentStepCancelledError if the current step has been cancelled.
+    This is a no-op outside of an agent step.
+    """
+    token = _current_token.get()
+    if token is not None:
+        token.raise_if_cancelled()
+
+
+def cancellable_sleep(seconds: float) -> None:
+    """
+    time.sleep replacement that returns early and raises if the current step
+    is cancelled while sleeping.
+    """
+    token = _current_token.get()
+    if token is None:
+        time.sleep(seconds)
+        return
+    if token.wait(seconds):
+        token.raise_if_cancelled()
@@ -47,6 +47,17 @@ class LLMConfig(metaclass=Singleton):
         max_output_tokens: The maximum number of output tokens. This is sent to the LLM.
         input_cost_per_token: The cost per input token. This will available in logs for the user to check.
         output_cost_per_token: The cost per output token. This will available in logs for the user to check.
+        response_cache: The LLM response cache backend, 'memory' or 'sqlite'. Disabled by default.
+        response_cache_path: The sqlite cache file. Defaults to llm_response_cache.db in the app cache_dir.
+        response_cache_ttl: How long cached responses stay valid, in seconds. None keeps them until evicted.
+        response_cache_max_bytes: The size cap of the cached responses, in bytes.
+        response_cache_nondeterministic: Whether to also cache requests with temperature > 0.
+        requests_per_minute: Client-side request rate limit per model endpoint, shared by all sessions. Learned from the x-ratelimit headers if unset.
+        tokens_per_minute: Client-side token rate limit per model endpoint, shared by all sessions. Learned from the x-ratelimit headers if unset.
+        max_concurrent_requests: The maximum number of in-flight requests per model endpoint.
+        hedge_budget: The fraction of requests that may send a hedged duplicate to a fallback endpoint (see model_port_config.json "fallbacks") when the first endpoint is slower than its p95.
+        prompt_caching: Whether to mark the static prompt prefix (the leading system messages) cacheable for providers that need explicit cache_control markers.
+        streaming: Whether agents that support it stream completions, forwarding partial thoughts and stopping as soon as the action is complete.
     """
 
     model: str = 'gpt-4o'
@@ -72,6 +83,17 @@ class LLMConfig(metaclass=Singleton):
     max_output_tokens: int | None = None
     input_cost_per_token: float | None = None
     output_cost_per_token: float | None = None
+    response_cache: str | None = None
+    response_cache_path: str | None = None
+    response_cache_ttl: int | None = None
+    response_cache_max_bytes: int = 256 * 1024 * 1024
+    response_cache_nondeterministic: bool = False
+    requests_per_minute: int | None = None
+    tokens_per_minute: int | None = None
+    max_concurrent_requests: int | None = None
+    hedge_budget: float = 0.1
+    streaming: bool = False
+    prompt_caching: bool = True
 
     def defaults_to_dict(self) -> dict:
         """
@@ -153,6 +175,23 @@ class AppConfig(metaclass=Singleton):
         sandbox_timeout: The timeout for the sandbox.
         debug: Whether to enable debugging.
         enable_auto_lint: Whether to enable auto linting. This is False by default, for regular runs of the app. For evaluation, please set this to True.
+        trace_sample_rate: The fraction of controller iterations whose per-stage latency spans are recorded. 0 disables tracing.
+        llm_log_sample_rate: The fraction of LLM calls whose prompt and response are logged in debug mode.
+        llm_log_max_bytes: The size at which a session's LLM log file is rotated.
+        session_registry: Where workers record which sessions they own: 'memory' for a single backend, 'sqlite' to share it between the workers behind the router.
+        session_registry_path: The sqlite registry file. Defaults to session_registry.db in the app cache_dir.
+        worker_url: The address the router reaches this backend at, e.g. http://127.0.0.1:5001.
+        worker_ttl: Seconds without a heartbeat after which a worker is considered dead.
+        max_sessions: The number of concurrent sessions this backend admits, 0 for no limit. The frontend places one session per backend when unset.
+        max_browsers: The number of browser processes this backend runs at once, 0 for no limit.
+        min_free_memory_mb: New sessions are rejected while the host has less memory available, 0 to disable.
+        max_cpu_load: New sessions are rejected while the load average per core is higher, 0 to disable.
+        admission_retry_after: The seconds rejected clients are told to wait before retrying.
+        options_cache_ttl: The seconds after which the model, agent and default options are rebuilt in the background.
+        drain_timeout: The seconds running agent steps get to finish when the server is drained for a restart.
+        admin_token: The bearer token the admin endpoints, such as /admin/drain, require. They are disabled when unset.
+        max_upload_bytes: The size limit of each uploaded file, 0 for no limit.
+        hibernate_after: The seconds a session may sit idle before its browser and sandbox are released, 0 to keep them.
     """
 
     llm: LLMConfig = field(default_factory=LLMConfig)
@@ -189,6 +228,23 @@ class AppConfig(metaclass=Singleton):
     enable_auto_lint: bool = (
         False  # once enabled, OpenDevin would lint files after editing
     )
+    trace_sample_rate: float = 0.0
+    llm_log_sample_rate: float = 1.0
+    llm_log_max_bytes: int = 20 * 1024 * 1024
+    session_registry: str = 'memory'
+    session_registry_path: str | None = None
+    worker_url: str | None = None
+    worker_ttl: int = 30
+    max_sessions: int = 0
+    max_browsers: int = 0
+    min_free_memory_mb: int = 0
+    max_cpu_load: float = 0.0
+    admission_retry_after: int = 30
+    options_cache_ttl: int = 600
+    drain_timeout: int = 60
+    admin_token: str | None = None
+    max_upload_bytes: int = 512 * 1024 * 1024
+    hibernate_after: int = 0
 
     defaults_dict: ClassVar[dict] = {}
 
@@ -219,7 +275,7 @@ class AppConfig(metaclass=Singleton):
             attr_name = f.name
             attr_value = getattr(self, f.name)
 
-            if attr_name in ['e2b_api_key', 'github_token']:
+            if attr_name in ['e2b_api_key', 'github_token', 'admin_token']:
                 attr_value = '******' if attr_value else None
 
             attr_str.append(f'{attr_name}={repr(attr_value)}')
@@ -458,33 +514,45 @@ def get_llm_config_arg(llm_config_arg: str):
     return None
 
 
-def get_model_port_arg(model_port_config_file: str, model_name: str):
-    def _get_model_full_name(v):
-        if 'model' in v:
-            model = v['model']
-        else:
-            model = model_name
-        if 'provider' in v:
-            return v['provider'] + '/' + model
-        else:
-            return model
-
-    def _get_api_base(v, model_name):
-        if 'base_url' in v:
-            return v['base_url']
-        else:
-            if 'port' not in v:
-                raise Exception(
-                    'One of API base URL and local port need to be provided for model {} in model_port_config.json'.format(
-                        model_name
-                    )
-                )
-            return 'http://localhost:{}/v1/'.format(v['port'])
+def _get_model_endpoint(entry: dict, model_name: str) -> tuple[str, str]:
+    model = entry.get('model', model_name)
+    if 'provider' in entry:
+        model = entry['provider'] + '/' + model
+    if 'base_url' in entry:
+        return model, entry['base_url']
+    if 'port' not in entry:
+        raise Exception(
+            'One of API base URL and local port need to be provided for model {} in model_port_config.json'.format(
+                model_name
+            )
+        )
+    return model, 'http://localhost:{}/v1/'.format(entry['port'])
+
+
+def load_model_port_config(model_port_config_file: str, model_name: str):
+    """
+    Reads the entry of `model_name` in model_port_config.json.
 
+    Returns:
+    - tuple[str, str, list[tuple[str, str]]]: The model and its api_base, and
+      the (model, api_base) pairs listed under "fallbacks". Each fallback takes
+      the same keys as a model entry (base_url or port, and optionally model and
+      provider) and inherits the model and provider it does not set.
+    """
     with open(model_port_config_file) as f:
         model_port_config = json.load(f)[model_name]
-    api_base = _get_api_base(model_port_config, model_name)
-    model = _get_model_full_name(model_port_config)
+    model, api_base = _get_model_endpoint(model_port_config, model_name)
+    fallbacks = []
+    for fallback in model_port_config.get('fallbacks', []):
+        fallback = {'model': model_port_config.get('model', model_name), **fallback}
+        if 'provider' in model_port_config:
+            fallback.setdefault('provider', model_port_config['provider'])
+        fallbacks.append(_get_model_endpoint(fallback, model_name))
+    return model, api_base, fallbacks
+
+
+def get_model_port_arg(model_port_config_file: str, model_name: str):
+    model, api_base, _ = load_model_port_config(model_port_config_file, model_name)
     return model, api_base
 
 
@@ -49,6 +49,15 @@ class SandboxInvalidBackgroundCommandError(Exception):
         super().__init__(message)
 
 
+class AgentStepCancelledError(Exception):
+    def __init__(self, reason=None):
+        if reason is not None:
+            message = f'Agent step cancelled: {reason}'
+        else:
+            message = 'Agent step cancelled'
+        super().__init__(message)
+
+
 class TaskInvalidStateError(Exception):
     def __init__(self, state=None):
         if state is not None:
@@ -71,6 +80,21 @@ class BrowserUnavailableException(Exception):
         super().__init__(message)
 
 
+class SessionCapacityError(Exception):
+    def __init__(self, reason='Server is at capacity', retry_after=30):
+        self.retry_after = retry_after
+        super().__init__(f'Server is at capacity: {reason}')
+
+
+class UploadTooLargeError(Exception):
+    def __init__(self, filename=None, max_bytes=None):
+        if filename is not None and max_bytes is not None:
+            message = f'{filename} exceeds the upload limit of {max_bytes} bytes'
+        else:
+            message = 'Upload exceeds the size limit'
+        super().__init__(message)
+
+
 # These exceptions get sent back to the LLM
 class AgentMalformedActionError(Exception):
     def __init__(self, message='Malformed response'):
@@ -1,10 +1,16 @@
+import atexit
+import json
 import logging
 import os
+import queue
+import random
 import re
 import sys
 import traceback
+from collections import OrderedDict
 from datetime import datetime
-from typing import Literal, Mapping
+from logging.handlers import QueueHandler, QueueListener
+from typing import Literal, Mapping, TextIO
 
 from termcolor import colored
 
@@ -72,35 +78,87 @@ file_formatter = logging.Formatter(
 llm_formatter = logging.Formatter('%(message)s')
 
 
+# attributes whose values are masked in log messages, plus their env var names
+# and some special cases
+SENSITIVE_KEYS = [
+    'api_key',
+    'aws_access_key_id',
+    'aws_secret_access_key',
+    'e2b_api_key',
+    'github_token',
+]
+SENSITIVE_KEYS += [key.upper() for key in SENSITIVE_KEYS]
+SENSITIVE_KEYS += ['LLM_API_KEY', 'SANDBOX_ENV_GITHUB_TOKEN']
+
+# one pass over the message; longer keys first so e.g. LLM_API_KEY wins over API_KEY
+SENSITIVE_PATTERN = re.compile(
+    '(?P<key>'
+    + '|'.join(re.escape(key) for key in sorted(SENSITIVE_KEYS, key=len, reverse=True))
+    + r")='?[\w-]+'?"
+)
+# substrings every key contains; a message without any of them needs no redaction
+SENSITIVE_NEEDLES = sorted(
+    {
+        key
+        for key in SENSITIVE_KEYS
+        if not any(other != key and other in key for other in SENSITIVE_KEYS)
+    }
+)
+# above this size only the text around key occurrences is run through the regex
+MAX_REDACT_SCAN_CHARS = 64 * 1024
+# how far past a key occurrence a value is looked for in large messages; a value
+# running past the window is still matched to its end
+REDACT_WINDOW_CHARS = 4096
+MAX_KEY_CHARS = max(len(key) for key in SENSITIVE_KEYS)
+REDACTED = r"\g<key>='******'"
+
+
+def redact_sensitive(msg: str) -> str:
+    """
+    Masks the values of sensitive keys, e.g. api_key='sk-...' becomes api_key='******'.
+    """
+    if not any(needle in msg for needle in SENSITIVE_NEEDLES):
+        return msg
+    if len(msg) <= MAX_REDACT_SCAN_CHARS:
+        return SENSITIVE_PATTERN.sub(REDACTED, msg)
+    # large observations: find the keys with str.find and scan only near them
+    windows = []
+    for needle in SENSITIVE_NEEDLES:
+        pos = msg.find(needle)
+        while pos != -1:
+            windows.append(
+                (
+                    max(0, pos - MAX_KEY_CHARS),
+                    min(len(msg), pos + len(needle) + REDACT_WINDOW_CHARS),
+                )
+            )
+            pos = msg.find(needle, pos + len(needle))
+    merged: list[list[int]] = []
+    for start, end in sorted(windows):
+        if merged and start <= merged[-1][1]:
+            merged[-1][1] = max(merged[-1][1], end)
+        else:
+            merged.append([start, end])
+    parts = []
+    last_end = 0
+    for start, end in merged:
+        for match in SENSITIVE_PATTERN.finditer(msg, max(start, last_end), end):
+            if match.end() == end:
+                match = SENSITIVE_PATTERN.match(msg, match.start())
+            parts.append(msg[last_end : match.start()])
+            parts.append(match.expand(REDACTED))
+            last_end = match.end()
+    parts.append(msg[last_end:])
+    return ''.join(parts)
+
+
 class SensitiveDataFilter(logging.Filter):
     def filter(self, record):
-        # start with attributes
-        sensitive_patterns = [
-            'api_key',
-            'aws_access_key_id',
-            'aws_secret_access_key',
-            'e2b_api_key',
-            'github_token',
-        ]
-
-        # add env var names
-        env_vars = [attr.upper() for attr in sensitive_patterns]
-        sensitive_patterns.extend(env_vars)
-
-        # and some special cases
-        sensitive_patterns.append('LLM_API_KEY')
-        sensitive_patterns.append('SANDBOX_ENV_GITHUB_TOKEN')
-
         # this also formats the message with % args
         msg = record.getMessage()
         record.args = ()
-
-        for attr in sensitive_patterns:
-            pattern = rf"{attr}='?([\w-]+)'?"
-            msg = re.sub(pattern, f"{attr}='******'", msg)
-
         # passed with msg
-        record.msg = msg
+        record.msg = redact_sensitive(msg)
         return True
 
 
@@ -166,100 +224,130 @@ logging.getLogger('LiteLLM Router').disabled = True
 logging.getLogger('LiteLLM Proxy').disabled = True
 
 
-class LlmFileHandler(logging.FileHandler):
+class LlmJsonlHandler(logging.Handler):
     """
-    # LLM prompt and response logging
+    Writes LLM prompts and responses as JSON lines, one file per session.
+
+    Runs on the background thread of the LLM log queue, so it may do the JSON
+    serialization and disk I/O the agent threads skip. Files stay open between
+    records and are rotated to `<session>.jsonl.1` .. `.<backup_count>` once
+    they exceed `max_bytes`.
     """
 
-    def __init__(self, filename, mode='a', encoding='utf-8', delay=False):
-        """
-        Initializes an instance of LlmFileHandler.
-
-        Args:
-            filename (str): The name of the log file.
-            mode (str, optional): The file mode. Defaults to 'a'.
-            encoding (str, optional): The file encoding. Defaults to None.
-            delay (bool, optional): Whether to delay file opening. Defaults to False.
-        """
-        self.filename = filename
-        self.message_counter = 1
-        if config.debug:
-            self.session = datetime.now().strftime('%y-%m-%d_%H-%M')
+    def __init__(
+        self,
+        log_directory: str,
+        max_bytes: int,
+        backup_count: int = 3,
+        max_open_files: int = 64,
+    ):
+        super().__init__()
+        self.log_directory = log_directory
+        self.max_bytes = max_bytes
+        self.backup_count = backup_count
+        self.max_open_files = max_open_files
+        self._files: OrderedDict[str, TextIO] = OrderedDict()
+
+    def _get_file(self, session_id: str) -> TextIO:
+        f = self._files.get(session_id)
+        if f is None:
+            os.makedirs(self.log_directory, exist_ok=True)
+            f = open(self._path(session_id), 'a', encoding='utf-8')
+            self._files[session_id] = f
+            if len(self._files) > self.max_open_files:
+                _, oldest = self._files.popitem(last=False)
+                oldest.close()
         else:
-            self.session = 'default'
-        self.log_directory = os.path.join(os.getcwd(), 'logs', 'llm', self.session)
-        os.makedirs(self.log_directory, exist_ok=True)
-        if not config.debug:
-            # Clear the log directory if not in debug mode
-            for file in os.listdir(self.log_directory):
-                file_path = os.path.join(self.log_directory, file)
-                try:
-                    os.unlink(file_path)
-                except Exception as e:
-                    easyweb_logger.error(
-                        'Failed to delete %s. Reason: %s', file_path, e
-                    )
-        filename = f'{self.filename}_{self.message_counter:03}.log'
-        self.baseFilename = os.path.join(self.log_directory, filename)
-        super().__init__(self.baseFilename, mode, encoding, delay)
+            self._files.move_to_end(session_id)
+        return f
+
+    def _path(self, session_id: str) -> str:
+        # session ids come from clients; keep them inside the log directory
+        safe_id = re.sub(r'[^\w.-]', '_', session_id)
+        return os.path.join(self.log_directory, f'{safe_id}.jsonl')
+
+    def _rotate(self, session_id: str) -> None:
+        self._files.pop(session_id).close()
+        path = self._path(session_id)
+        for i in range(self.backup_count - 1, 0, -1):
+            if os.path.exists(f'{path}.{i}'):
+                os.replace(f'{path}.{i}', f'{path}.{i + 1}')
+        if self.backup_count > 0:
+            os.replace(path, f'{path}.1')
+        else:
+            os.remove(path)
 
     def emit(self, record):
-        """
-        Emits a log record.
-
-        Args:
-            record (logging.LogRecord): The log record to emit.
-        """
-        filename = f'{self.filename}_{self.message_counter:03}.log'
-        self.baseFilename = os.path.join(self.log_directory, filename)
-        self.stream = self._open()
-        super().emit(record)
-        self.stream.close()
-        easyweb_logger.debug('Logging to %s', self.baseFilename)
-        self.message_counter += 1
-
-
-def get_llm_prompt_file_handler():
+        try:
+            session_id = getattr(record, 'session_id', None) or 'default'
+            entry = {
+                'time': record.created,
+                'kind': record.name,
+                **getattr(record, 'llm', {'content': record.getMessage()}),
+            }
+            f = self._get_file(session_id)
+            f.write(json.dumps(entry, default=str) + '\n')
+            f.flush()
+            if f.tell() > self.max_bytes:
+                self._rotate(session_id)
+        except Exception:
+            self.handleError(record)
+
+    def close(self):
+        for f in self._files.values():
+            f.close()
+        self._files.clear()
+        super().close()
+
+
+class LlmQueueHandler(QueueHandler):
     """
-    Returns a file handler for LLM prompt logging.
+    Hands LLM log records to the background writer without formatting them:
+    the payload is serialized on the writer thread.
     """
-    llm_prompt_file_handler = LlmFileHandler('prompt', delay=True)
-    llm_prompt_file_handler.setFormatter(llm_formatter)
-    llm_prompt_file_handler.setLevel(logging.DEBUG)
-    return llm_prompt_file_handler
+
+    def prepare(self, record):
+        return record
 
 
-def get_llm_response_file_handler():
+def get_llm_log_listener() -> QueueListener:
     """
-    Returns a file handler for LLM response logging.
+    Returns the background writer of the LLM prompt/response logs.
     """
-    llm_response_file_handler = LlmFileHandler('response', delay=True)
-    llm_response_file_handler.setFormatter(llm_formatter)
-    llm_response_file_handler.setLevel(logging.DEBUG)
-    return llm_response_file_handler
+    session = datetime.now().strftime('%y-%m-%d_%H-%M')
+    handler = LlmJsonlHandler(
+        os.path.join(os.getcwd(), 'logs', 'llm', session),
+        max_bytes=config.llm_log_max_bytes,
+    )
+    return QueueListener(llm_log_queue, handler)
 
 
-def get_llm_output_file_handler():
+def is_llm_log_sampled() -> bool:
     """
-    Returns a file handler for LLM output logging.
+    Whether to log the prompt and response of the next LLM call. Callers check
+    this before building the log payload, so unlogged calls cost nothing.
     """
-    llm_output_file_handler = LlmFileHandler('output', delay=True)
-    llm_output_file_handler.setFormatter(llm_formatter)
-    llm_output_file_handler.setLevel(logging.INFO)
-    return llm_output_file_handler
+    if not llm_prompt_logger.isEnabledFor(logging.DEBUG):
+        return False
+    return random.random() < config.llm_log_sample_rate
 
 
-llm_prompt_logger = logging.getLogger('prompt')
-llm_prompt_logger.propagate = False
-llm_prompt_logger.setLevel(logging.DEBUG)
-llm_prompt_logger.addHandler(get_llm_prompt_file_handler())
+# prompts and responses are a debugging aid: like the debug log, they are only
+# written with DEBUG enabled (see Development.md)
+llm_log_level = logging.DEBUG if config.debug else logging.WARNING
+llm_log_queue: queue.SimpleQueue = queue.SimpleQueue()
 
+llm_prompt_logger = logging.getLogger('prompt')
 llm_response_logger = logging.getLogger('response')
-llm_response_logger.propagate = False
-llm_response_logger.setLevel(logging.DEBUG)
-llm_response_logger.addHandler(get_llm_response_file_handler())
-
 llm_output_logger = logging.getLogger('output')
-llm_output_logger.propagate = False
-llm_output_logger.setLevel(logging.INFO)
-llm_output_logger.addHandler(get_llm_output_file_handler())
+for llm_logger in (llm_prompt_logger, llm_response_logger, llm_output_logger):
+    llm_logger.propagate = False
+    llm_logger.setLevel(llm_log_level)
+
+if config.debug:
+    for llm_logger in (llm_prompt_logger, llm_response_logger, llm_output_logger):
+        llm_logger.addHandler(LlmQueueHandler(llm_log_queue))
+    llm_log_listener = get_llm_log_listener()
+    llm_log_listener.start()
+    # flush the queue on exit
+    atexit.register(llm_log_listener.stop)
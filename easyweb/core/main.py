@@ -7,7 +7,11 @@ import agenthub  # noqa F401 (we import this to get the agents registered)
 from easyweb.controller import AgentController
 from easyweb.controller.agent import Agent
 from easyweb.controller.state.state import State
-from easyweb.core.config import args, get_llm_config_arg, get_model_port_arg
+from easyweb.core.config import (
+    args,
+    get_llm_config_arg,
+    load_model_port_config,
+)
 from easyweb.core.logger import easyweb_logger as logger
 from easyweb.core.schema import AgentState
 from easyweb.events import EventSource, EventStream, EventStreamSubscriber
@@ -72,10 +76,10 @@ async def main(
             logger.info(
                 f'Running agent {args.agent_cls} (model: {args.model_name}, llm_config: {args.llm_config}) with task: "{task}"'
             )
-            model, api_base = get_model_port_arg(
+            model, api_base, fallbacks = load_model_port_config(
                 llm_config.model_port_config_file, args.model_name
             )
-            llm = LLM(model=model, base_url=api_base)
+            llm = LLM(model=model, base_url=api_base, fallbacks=fallbacks)
         else:
             logger.info(
                 f'Running agent {args.agent_cls} (model: {llm_config.model}, llm_config: {args.llm_config}) with task: "{task}"'
@@ -1,13 +1,35 @@
+import threading
+from dataclasses import dataclass
+
+
 class Metrics:
     """
     Metrics class can record various metrics during running and evaluation.
     Currently we define the following metrics:
         accumulated_cost: the total cost (USD $) of the current LLM.
+        cancel_latencies: seconds between a stop/pause request and the in-flight agent step unwinding.
+        cache_hits / cache_misses: LLM requests answered from / missing in the response cache.
+        cache_bytes: the size of the responses served from the response cache.
+        time_to_first_action: seconds until a streamed completion contained a complete action.
+        tokens_saved: estimated output tokens not generated because a stream stopped early.
+        completions: one CompletionRecord per LLM completion (model, tokens, latency, retries).
     """
 
     def __init__(self) -> None:
         self._accumulated_cost: float = 0.0
         self._costs: list[float] = []
+        self._cancel_latencies: list[float] = []
+        self._cache_hits: int = 0
+        self._cache_misses: int = 0
+        self._cache_bytes: int = 0
+        self._time_to_first_action: list[float] = []
+        self._tokens_saved: list[int] = []
+        self._completions: list[CompletionRecord] = []
+
+    def __setstate__(self, state: dict) -> None:
+        # metrics pickled by older versions may miss newer fields
+        self.__init__()  # type: ignore[misc]
+        self.__dict__.update(state)
 
     @property
     def accumulated_cost(self) -> float:
@@ -29,11 +51,77 @@ class Metrics:
         self._accumulated_cost += value
         self._costs.append(value)
 
+    @property
+    def cancel_latencies(self) -> list:
+        return self._cancel_latencies
+
+    def add_cancel_latency(self, value: float) -> None:
+        if value < 0:
+            raise ValueError('Cancel latency cannot be negative.')
+        self._cancel_latencies.append(value)
+
+    @property
+    def cache_hits(self) -> int:
+        return self._cache_hits
+
+    @property
+    def cache_misses(self) -> int:
+        return self._cache_misses
+
+    @property
+    def cache_bytes(self) -> int:
+        return self._cache_bytes
+
+    def add_cache_hit(self, num_bytes: int) -> None:
+        self._cache_hits += 1
+        self._cache_bytes += num_bytes
+
+    def add_cache_miss(self) -> None:
+        self._cache_misses += 1
+
+    @property
+    def time_to_first_action(self) -> list:
+        return self._time_to_first_action
+
+    @property
+    def tokens_saved(self) -> list:
+        return self._tokens_saved
+
+    def add_stream_result(self, time_to_first_action: float, tokens_saved: int) -> None:
+        self._time_to_first_action.append(time_to_first_action)
+        self._tokens_saved.append(tokens_saved)
+
+    @property
+    def completions(self) -> list:
+        return self._completions
+
+    def add_completion(self, record: 'CompletionRecord') -> None:
+        self._completions.append(record)
+
+    def completion_summary(self) -> dict:
+        """
+        Aggregates the completions of this session per model.
+        """
+        by_model: dict[str, list[CompletionRecord]] = {}
+        for record in self._completions:
+            by_model.setdefault(record.model, []).append(record)
+        return {model: _summarize(records) for model, records in by_model.items()}
+
     def get(self):
         """
         Return the metrics in a dictionary.
         """
-        return {'accumulated_cost': self._accumulated_cost, 'costs': self._costs}
+        return {
+            'accumulated_cost': self._accumulated_cost,
+            'costs': self._costs,
+            'cancel_latencies': self._cancel_latencies,
+            'cache_hits': self._cache_hits,
+            'cache_misses': self._cache_misses,
+            'cache_bytes': self._cache_bytes,
+            'time_to_first_action': self._time_to_first_action,
+            'tokens_saved': self._tokens_saved,
+            'completions': self.completion_summary(),
+        }
 
     def log(self):
         """
@@ -44,3 +132,167 @@ class Metrics:
         for key, value in metrics.items():
             logs += f'{key}: {value}\n'
         return logs
+
+
+@dataclass
+class CompletionRecord:
+    """
+    Accounting of a single LLM completion.
+
+    Attributes:
+        model: The model that answered.
+        prompt_tokens: The input tokens, including cached ones.
+        completion_tokens: The output tokens.
+        cached_tokens: The input tokens served from the provider's prompt cache.
+        latency: Wall-clock seconds of the whole call, including retries.
+        retries: The number of extra attempts (retries and hedges).
+    """
+
+    model: str
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
+    cached_tokens: int = 0
+    latency: float = 0.0
+    retries: int = 0
+
+
+def _percentile(values: list[float], q: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+def _summarize(records: list[CompletionRecord]) -> dict:
+    latencies = [record.latency for record in records]
+    completion_tokens = sum(record.completion_tokens for record in records)
+    total_latency = sum(latencies)
+    return {
+        'requests': len(records),
+        'prompt_tokens': sum(record.prompt_tokens for record in records),
+        'completion_tokens': completion_tokens,
+        'cached_tokens': sum(record.cached_tokens for record in records),
+        'retries': sum(record.retries for record in records),
+        'tokens_per_second': completion_tokens / total_latency
+        if total_latency
+        else 0.0,
+        'latency_p50': _percentile(latencies, 0.5),
+        'latency_p99': _percentile(latencies, 0.99),
+    }
+
+
+# upper bounds of the latency histogram buckets, in seconds
+LATENCY_BUCKETS = (0.1, 0.25, 0.5, 1, 2, 3, 5, 7.5, 10, 15, 20, 30, 45, 60, 90, 120)
+
+
+class Histogram:
+    """
+    Fixed-bucket histogram; percentiles are reported as bucket upper bounds.
+
+    A percentile in the overflow bucket is reported as the last bound, a lower
+    bound of the true value, so it stays JSON serializable.
+    """
+
+    def __init__(self, buckets: tuple = LATENCY_BUCKETS):
+        self.buckets = buckets
+        # the last count is the overflow bucket (+Inf)
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        index = len(self.buckets)
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                index = i
+                break
+        self.counts[index] += 1
+        self.sum += value
+        self.count += 1
+
+    def percentile(self, q: float) -> float | None:
+        if self.count == 0:
+            return None
+        rank = q * self.count
+        seen = 0
+        for i, count in enumerate(self.counts):
+            seen += count
+            if seen >= rank and count:
+                break
+        return self.buckets[min(i, len(self.buckets) - 1)]
+
+    @classmethod
+    def from_dict(cls, data: dict) -> 'Histogram':
+        histogram = cls(tuple(data['buckets']))
+        histogram.counts = list(data['counts'])
+        histogram.sum = data['sum']
+        histogram.count = data['count']
+        return histogram
+
+    def to_dict(self) -> dict:
+        return {
+            'buckets': list(self.buckets),
+            'counts': list(self.counts),
+            'sum': self.sum,
+            'count': self.count,
+        }
+
+
+class LLMStats:
+    """
+    Process-wide LLM accounting per model, across all sessions.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._models: dict[str, dict] = {}
+
+    def _stats(self, model: str) -> dict:
+        stats = self._models.get(model)
+        if stats is None:
+            stats = {
+                'latency': Histogram(),
+                'requests': 0,
+                'prompt_tokens': 0,
+                'completion_tokens': 0,
+                'cached_tokens': 0,
+                'retries': 0,
+                'cost': 0.0,
+            }
+            self._models[model] = stats
+        return stats
+
+    def record(self, record: CompletionRecord) -> None:
+        with self._lock:
+            stats = self._stats(record.model)
+            stats['latency'].observe(record.latency)
+            stats['requests'] += 1
+            stats['prompt_tokens'] += record.prompt_tokens
+            stats['completion_tokens'] += record.completion_tokens
+            stats['cached_tokens'] += record.cached_tokens
+            stats['retries'] += record.retries
+
+    def add_cost(self, model: str, cost: float) -> None:
+        with self._lock:
+            self._stats(model)['cost'] += cost
+
+    def get(self) -> dict:
+        with self._lock:
+            result = {}
+            for model, stats in self._models.items():
+                latency: Histogram = stats['latency']
+                result[model] = {
+                    key: value for key, value in stats.items() if key != 'latency'
+                }
+                result[model].update(
+                    {
+                        'tokens_per_second': stats['completion_tokens'] / latency.sum
+                        if latency.sum
+                        else 0.0,
+                        'latency_p50': latency.percentile(0.5),
+                        'latency_p99': latency.percentile(0.99),
+                        'latency_histogram': latency.to_dict(),
+                    }
+                )
+            return result
+
+
+llm_stats = LLMStats()
@@ -0,0 +1,230 @@
+"""
+Metrics in the Prometheus text exposition format, without the client library.
+
+Hot paths update counters, gauges and histograms in place (a lock and a
+dict lookup); values that are cheaper to read than to track, like the
+number of sessions, come from collectors called at scrape time.
+"""
+
+import threading
+from typing import Callable, Iterable, TypeVar
+
+from easyweb.core.metrics import Histogram as BucketCounts
+
+__all__ = [
+    'Counter',
+    'Gauge',
+    'Histogram',
+    'Registry',
+    'registry',
+    'FAST_BUCKETS',
+    'controller_step_seconds',
+    'websocket_send_seconds',
+    'file_store_write_seconds',
+    'event_stream_pending_events',
+    'session_rehydrate_seconds',
+]
+
+# upper bounds for sub-second operations: websocket sends, file writes
+FAST_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+# upper bounds for agent steps, which include LLM calls and browser actions
+STEP_BUCKETS = (0.5, 1, 2, 3, 5, 7.5, 10, 15, 20, 30, 45, 60, 90, 120, 180, 300)
+
+
+def _escape(value: object) -> str:
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(names: tuple, values: tuple, extra: str = '') -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+def _format_value(value: float) -> str:
+    if value == float('inf'):
+        return '+Inf'
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+class _Metric:
+    type = ''
+
+    def __init__(self, name: str, help: str, labelnames: Iterable[str] = ()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: dict) -> tuple:
+        return tuple(labels.get(name, '') for name in self.labelnames)
+
+    def _samples(self) -> list[str]:
+        raise NotImplementedError
+
+    def render(self) -> str:
+        lines = [f'# HELP {self.name} {self.help}', f'# TYPE {self.name} {self.type}']
+        lines.extend(self._samples())
+        return '\n'.join(lines)
+
+
+class Counter(_Metric):
+    type = 'counter'
+
+    def __init__(self, name: str, help: str, labelnames: Iterable[str] = ()):
+        super().__init__(name, help, labelnames)
+        self._values: dict[tuple, float] = {}
+
+    def inc(self, amount: float = 1, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def get(self, **labels) -> float:
+        with self._lock:
+            return self._values.get(self._key(labels), 0)
+
+    def _samples(self) -> list[str]:
+        with self._lock:
+            values = dict(self._values)
+        return [
+            f'{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}'
+            for key, value in values.items()
+        ]
+
+
+class Gauge(Counter):
+    type = 'gauge'
+
+    def set(self, value: float, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def dec(self, amount: float = 1, **labels) -> None:
+        self.inc(-amount, **labels)
+
+
+class Histogram(_Metric):
+    type = 'histogram'
+
+    def __init__(
+        self,
+        name: str,
+        help: str,
+        labelnames: Iterable[str] = (),
+        buckets: tuple = FAST_BUCKETS,
+    ):
+        super().__init__(name, help, labelnames)
+        self.buckets = buckets
+        self._values: dict[tuple, BucketCounts] = {}
+
+    def observe(self, value: float, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            counts = self._values.get(key)
+            if counts is None:
+                counts = self._values[key] = BucketCounts(self.buckets)
+            counts.observe(value)
+
+    def set_counts(self, counts: BucketCounts, **labels) -> None:
+        """
+        Exports bucket counts kept elsewhere, e.g. by a collector.
+        """
+        with self._lock:
+            self._values[self._key(labels)] = counts
+
+    def _samples(self) -> list[str]:
+        with self._lock:
+            values = {
+                key: (list(counts.counts), counts.sum, counts.count)
+                for key, counts in self._values.items()
+            }
+        lines = []
+        for key, (counts, total, count) in values.items():
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float('inf'),), counts):
+                cumulative += bucket_count
+                le = f'le="{_format_value(bound)}"'
+                lines.append(
+                    f'{self.name}_bucket{_format_labels(self.labelnames, key, le)} {cumulative}'
+                )
+            labels = _format_labels(self.labelnames, key)
+            lines.append(f'{self.name}_sum{labels} {_format_value(total)}')
+            lines.append(f'{self.name}_count{labels} {count}')
+        return lines
+
+
+MetricT = TypeVar('MetricT', bound=_Metric)
+
+
+class Registry:
+    """
+    The metrics served on /metrics: registered metrics, plus the metrics
+    built by collectors at scrape time.
+    """
+
+    def __init__(self):
+        self._metrics: dict[str, _Metric] = {}
+        self._collectors: list[Callable[[], Iterable[_Metric]]] = []
+        self._lock = threading.Lock()
+
+    def register(self, metric: MetricT) -> MetricT:
+        with self._lock:
+            if metric.name in self._metrics:
+                raise ValueError(f'Metric already registered: {metric.name}')
+            self._metrics[metric.name] = metric
+        return metric
+
+    def register_collector(self, collector: Callable[[], Iterable[_Metric]]) -> None:
+        with self._lock:
+            self._collectors.append(collector)
+
+    def render(self) -> str:
+        with self._lock:
+            metrics = list(self._metrics.values())
+            collectors = list(self._collectors)
+        for collector in collectors:
+            metrics.extend(collector())
+        return '\n'.join(metric.render() for metric in metrics) + '\n'
+
+
+registry = Registry()
+
+controller_step_seconds = registry.register(
+    Histogram(
+        'easyweb_controller_step_seconds',
+        'Duration of controller steps, including the LLM call.',
+        ['agent'],
+        STEP_BUCKETS,
+    )
+)
+websocket_send_seconds = registry.register(
+    Histogram(
+        'easyweb_websocket_send_seconds',
+        'Time to send an event to the client over the websocket.',
+    )
+)
+file_store_write_seconds = registry.register(
+    Histogram(
+        'easyweb_file_store_write_seconds',
+        'Latency of persisting an event to the file store.',
+        ['store'],
+    )
+)
+event_stream_pending_events = registry.register(
+    Gauge(
+        'easyweb_event_stream_pending_events',
+        'Events being persisted or dispatched to subscribers.',
+    )
+)
+session_rehydrate_seconds = registry.register(
+    Histogram(
+        'easyweb_session_rehydrate_seconds',
+        'Time to bring back the browser, sandbox and agent of a hibernated session.',
+        buckets=STEP_BUCKETS,
+    )
+)
@@ -44,5 +44,9 @@ class ObservationTypeSchema(BaseModel):
 
     AGENT_STATE_CHANGED: str = Field(default='agent_state_changed')
 
+    AGENT_THOUGHT: str = Field(default='agent_thought')
+    """The partial reasoning of the agent, while the LLM is still generating
+    """
+
 
 ObservationType = ObservationTypeSchema()
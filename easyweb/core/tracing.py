@@ -0,0 +1,161 @@
+import contextvars
+import json
+import os
+import random
+import threading
+import time
+import uuid
+from collections import deque
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass, field
+
+from easyweb.core.config import config
+
+
+@dataclass
+class Span:
+    """
+    A timed stage of a controller iteration, e.g. the LLM wait or the browser IPC.
+    Times are wall-clock seconds so spans from the browser process line up.
+    """
+
+    name: str
+    trace_id: str
+    start: float
+    end: float
+    thread_id: int
+    attributes: dict = field(default_factory=dict)
+
+    @property
+    def duration(self) -> float:
+        return self.end - self.start
+
+
+class Tracer:
+    """
+    Collects spans for one session.
+
+    Every controller iteration starts a trace; only a `sample_rate` fraction of
+    them is actually recorded, so unsampled iterations cost a context variable
+    lookup per stage. Spans are kept in a bounded buffer and can be exported as
+    plain JSON or in the Chrome trace event format (chrome://tracing, Perfetto).
+    """
+
+    def __init__(
+        self,
+        sid: str = 'default',
+        sample_rate: float | None = None,
+        max_spans: int = 10_000,
+    ):
+        self.sid = sid
+        self.sample_rate = (
+            sample_rate if sample_rate is not None else config.trace_sample_rate
+        )
+        self._spans: deque[Span] = deque(maxlen=max_spans)
+        self._lock = threading.Lock()
+
+    def start_trace(self) -> str | None:
+        """
+        Returns a new trace id, or None if this iteration is not sampled.
+        """
+        if self.sample_rate <= 0 or random.random() >= self.sample_rate:
+            return None
+        return uuid.uuid4().hex[:16]
+
+    def record(
+        self, name: str, trace_id: str, start: float, end: float, **attributes
+    ) -> None:
+        span = Span(
+            name=name,
+            trace_id=trace_id,
+            start=start,
+            end=end,
+            thread_id=threading.get_ident(),
+            attributes=attributes,
+        )
+        with self._lock:
+            self._spans.append(span)
+
+    @property
+    def spans(self) -> list[Span]:
+        with self._lock:
+            return list(self._spans)
+
+    def to_json(self) -> list[dict]:
+        return [asdict(span) for span in self.spans]
+
+    def to_chrome_trace(self) -> dict:
+        pid = os.getpid()
+        events = []
+        for span in self.spans:
+            events.append(
+                {
+                    'name': span.name,
+                    'cat': self.sid,
+                    'ph': 'X',
+                    'ts': int(span.start * 1_000_000),
+                    'dur': int(span.duration * 1_000_000),
+                    'pid': pid,
+                    'tid': span.thread_id,
+                    'args': {'trace_id': span.trace_id, **span.attributes},
+                }
+            )
+        return {'traceEvents': events, 'displayTimeUnit': 'ms'}
+
+    def export(self, format: str = 'json') -> str:
+        if format == 'chrome':
+            return json.dumps(self.to_chrome_trace())
+        return json.dumps(self.to_json())
+
+
+_current_trace: contextvars.ContextVar[tuple[Tracer, str] | None] = (
+    contextvars.ContextVar('easyweb_current_trace', default=None)
+)
+
+
+def current_trace_id() -> str | None:
+    current = _current_trace.get()
+    return current[1] if current is not None else None
+
+
+@contextmanager
+def trace_context(tracer: Tracer, trace_id: str | None):
+    """
+    Makes `trace_id` the active trace for the enclosed block. Spans opened in
+    this context (and in contexts copied from it) are recorded on `tracer`.
+    """
+    reset_token = _current_trace.set(
+        (tracer, trace_id) if trace_id is not None else None
+    )
+    try:
+        yield trace_id
+    finally:
+        _current_trace.reset(reset_token)
+
+
+@contextmanager
+def span(name: str, **attributes):
+    """
+    Times the enclosed block as a span of the active trace, if any.
+    """
+    current = _current_trace.get()
+    if current is None:
+        yield
+        return
+    start = time.time()
+    try:
+        yield
+    finally:
+        tracer, trace_id = current
+        tracer.record(name, trace_id, start, time.time(), **attributes)
+
+
+def record_span(name: str, start: float, end: float, **attributes) -> None:
+    """
+    Records an already-timed stage (e.g. measured in another process) on the active trace.
+    """
+    current = _current_trace.get()
+    if current is None:
+        return
+    tracer, trace_id = current
+    tracer.record(name, trace_id, start, end, **attributes)
@@ -1,9 +1,17 @@
 from dataclasses import dataclass
 from typing import ClassVar
 
+from easyweb.core.cancellation import CancellationToken
 from easyweb.events.event import Event
 
 
 @dataclass
 class Action(Event):
     runnable: ClassVar[bool] = False
+
+    @property
+    def cancel_token(self) -> CancellationToken | None:
+        """The cancellation token of the agent step that returned this action."""
+        if hasattr(self, '_cancel_token'):
+            return self._cancel_token  # type: ignore [attr-defined]
+        return None
@@ -39,3 +39,9 @@ class Event:
         if hasattr(self, '_cause'):
             return self._cause  # type: ignore [attr-defined]
         return None
+
+    @property
+    def trace_id(self) -> str | None:
+        if hasattr(self, '_trace_id'):
+            return self._trace_id  # type: ignore [attr-defined]
+        return None
@@ -1,4 +1,4 @@
-from .agent import AgentStateChangedObservation
+from .agent import AgentStateChangedObservation, AgentThoughtObservation
 from .browse import BrowserOutputObservation
 from .commands import CmdOutputObservation, IPythonRunCellObservation
 from .delegate import AgentDelegateObservation
@@ -20,6 +20,7 @@ __all__ = [
     'AgentRecallObservation',
     'ErrorObservation',
     'AgentStateChangedObservation',
+    'AgentThoughtObservation',
     'AgentDelegateObservation',
     'SuccessObservation',
 ]
@@ -17,3 +17,16 @@ class AgentStateChangedObservation(Observation):
     @property
     def message(self) -> str:
         return ''
+
+
+@dataclass
+class AgentThoughtObservation(Observation):
+    """
+    This data class represents the partial thought of an agent step in progress
+    """
+
+    observation: str = ObservationType.AGENT_THOUGHT
+
+    @property
+    def message(self) -> str:
+        return ''
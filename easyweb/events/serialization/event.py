@@ -8,8 +8,17 @@ from .observation import observation_from_dict
 from .utils import remove_fields
 
 # TODO: move `content` into `extras`
-TOP_KEYS = ['id', 'timestamp', 'source', 'message', 'cause', 'action', 'observation']
-UNDERSCORE_KEYS = ['id', 'timestamp', 'source', 'cause']
+TOP_KEYS = [
+    'id',
+    'timestamp',
+    'source',
+    'message',
+    'cause',
+    'trace_id',
+    'action',
+    'observation',
+]
+UNDERSCORE_KEYS = ['id', 'timestamp', 'source', 'cause', 'trace_id']
 
 DELETE_FROM_MEMORY_EXTRAS = {
     'screenshot',
@@ -72,6 +81,7 @@ def event_to_memory(event: 'Event') -> dict:
     d = event_to_dict(event)
     d.pop('id', None)
     d.pop('cause', None)
+    d.pop('trace_id', None)
     d.pop('timestamp', None)
     d.pop('message', None)
     if 'extras' in d:
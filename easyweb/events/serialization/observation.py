@@ -1,4 +1,7 @@
-from easyweb.events.observation.agent import AgentStateChangedObservation
+from easyweb.events.observation.agent import (
+    AgentStateChangedObservation,
+    AgentThoughtObservation,
+)
 from easyweb.events.observation.browse import BrowserOutputObservation
 from easyweb.events.observation.commands import (
     CmdOutputObservation,
@@ -24,6 +27,7 @@ observations = (
     SuccessObservation,
     ErrorObservation,
     AgentStateChangedObservation,
+    AgentThoughtObservation,
 )
 
 OBSERVATION_TYPE_TO_CLASS = {
@@ -1,10 +1,16 @@
 import asyncio
 import json
+import time
 from datetime import datetime
 from enum import Enum
 from typing import Callable, Iterable
 
 from easyweb.core.logger import easyweb_logger as logger
+from easyweb.core.prometheus import (
+    event_stream_pending_events,
+    file_store_write_seconds,
+)
+from easyweb.core.tracing import span
 from easyweb.events.serialization.event import event_from_dict, event_to_dict
 from easyweb.storage import FileStore, get_file_store
 
@@ -58,7 +64,15 @@ class EventStream:
             logger.warning(f'get id from filename ({filename}) failed.')
             return -1
 
-    def get_events(self, start_id=0, end_id=None) -> Iterable[Event]:
+    @property
+    def latest_id(self) -> int:
+        """The id of the last event added, -1 if there is none."""
+        return self._cur_id - 1
+
+    def get_events(self, start_id=0, end_id=None, reverse=False) -> Iterable[Event]:
+        if reverse:
+            yield from self._get_events_reversed(start_id, end_id)
+            return
         event_id = start_id
         while True:
             if end_id is not None and event_id > end_id:
@@ -70,6 +84,16 @@ class EventStream:
             yield event
             event_id += 1
 
+    def _get_events_reversed(self, start_id=0, end_id=None) -> Iterable[Event]:
+        event_id = self.latest_id if end_id is None else min(end_id, self.latest_id)
+        while event_id >= start_id:
+            try:
+                event = self.get_event(event_id)
+            except FileNotFoundError:
+                break
+            yield event
+            event_id -= 1
+
     def get_event(self, id: int) -> Event:
         filename = self._get_filename_for_id(id)
         content = self._file_store.read(filename)
@@ -95,6 +119,13 @@ class EventStream:
 
     # TODO: make this not async
     async def add_event(self, event: Event, source: EventSource):
+        event_stream_pending_events.inc()
+        try:
+            await self._add_event(event, source)
+        finally:
+            event_stream_pending_events.dec()
+
+    async def _add_event(self, event: Event, source: EventSource):
         async with self._lock:
             event._id = self._cur_id  # type: ignore [attr-defined]
             self._cur_id += 1
@@ -102,9 +133,30 @@ class EventStream:
         event._source = source  # type: ignore [attr-defined]
         data = event_to_dict(event)
         if event.id is not None:
-            self._file_store.write(
-                self._get_filename_for_id(event.id), json.dumps(data)
-            )
+            with span('event_stream.persist'):
+                start = time.monotonic()
+                self._file_store.write(
+                    self._get_filename_for_id(event.id), json.dumps(data)
+                )
+                file_store_write_seconds.observe(
+                    time.monotonic() - start, store=type(self._file_store).__name__
+                )
         for key, stack in self._subscribers.items():
             callback = stack[-1]
             await callback(event)
+
+    async def publish(
+        self,
+        event: Event,
+        source: EventSource,
+        subscriber: EventStreamSubscriber = EventStreamSubscriber.SERVER,
+    ):
+        """
+        Passes an event to one subscriber only, without an id and without
+        persisting it, e.g. a partial thought that only matters while shown.
+        """
+        event._timestamp = datetime.now()  # type: ignore [attr-defined]
+        event._source = source  # type: ignore [attr-defined]
+        stack = self._subscribers.get(subscriber)
+        if stack:
+            await stack[-1](event)
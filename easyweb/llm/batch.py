@@ -0,0 +1,50 @@
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable
+
+from easyweb.core.exceptions import AgentStepCancelledError
+from easyweb.core.logger import easyweb_logger as logger
+
+__all__ = ['run_batch']
+
+
+def run_batch(
+    calls: list[Callable[[], object]],
+    max_concurrency: int | None = None,
+    thread_name_prefix: str = 'llm-batch',
+) -> list:
+    """
+    Runs independent calls concurrently and returns their results in order.
+
+    Each call runs in a copy of the caller's context, so it sees the agent
+    step's cancellation token and trace. A failed call yields its exception in
+    place of the result; a cancelled step cancels the whole batch.
+
+    Parameters:
+    - calls (list): The calls to run, each without arguments
+    - max_concurrency (int, optional): The maximum number of calls in flight. Defaults to all of them.
+    - thread_name_prefix (str): The name prefix of the worker threads
+
+    Returns:
+    - list: The result or exception of each call, in the order of `calls`
+    """
+    if not calls:
+        return []
+    workers = min(max_concurrency or len(calls), len(calls))
+    executor = ThreadPoolExecutor(
+        max_workers=workers, thread_name_prefix=thread_name_prefix
+    )
+    futures = [executor.submit(contextvars.copy_context().run, call) for call in calls]
+    results: list = []
+    try:
+        for future in futures:
+            try:
+                results.append(future.result())
+            except AgentStepCancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f'Batch call failed: {e}')
+                results.append(e)
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
+    return results
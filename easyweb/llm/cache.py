@@ -0,0 +1,240 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+
+from easyweb.core.logger import easyweb_logger as logger
+
+__all__ = [
+    'ResponseCache',
+    'InMemoryResponseCache',
+    'SQLiteResponseCache',
+    'get_response_cache',
+    'make_cache_key',
+]
+
+# request parameters that cannot change the completion; every other one (n,
+# seed, tools, response_format, base_url, ...) is part of the key
+IGNORED_PARAMS = {
+    'api_key',
+    'timeout',
+    'client',
+    'stream',
+    'num_retries',
+    'metadata',
+}
+
+
+def make_cache_key(params: dict) -> str:
+    """
+    Hashes the normalized request parameters into a cache key.
+    """
+    normalized = {
+        name: value
+        for name, value in params.items()
+        if name not in IGNORED_PARAMS and value is not None
+    }
+    if isinstance(normalized.get('stop'), str):
+        normalized['stop'] = [normalized['stop']]
+    payload = json.dumps(normalized, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+class ResponseCache(ABC):
+    """
+    Stores serialized LLM responses by request key.
+
+    Keeps process-wide hit/miss counters; per-LLM numbers are recorded in Metrics.
+    """
+
+    def __init__(self) -> None:
+        self.hits = 0
+        self.misses = 0
+        self.bytes_served = 0
+        self._stats_lock = threading.Lock()
+
+    def get(self, key: str) -> str | None:
+        value = self._get(key)
+        with self._stats_lock:
+            if value is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+                self.bytes_served += len(value)
+        return value
+
+    def set(self, key: str, value: str) -> None:
+        self._set(key, value)
+
+    @abstractmethod
+    def _get(self, key: str) -> str | None:
+        pass
+
+    @abstractmethod
+    def _set(self, key: str, value: str) -> None:
+        pass
+
+    @abstractmethod
+    def clear(self) -> None:
+        pass
+
+    def stats(self) -> dict:
+        with self._stats_lock:
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'bytes_served': self.bytes_served,
+            }
+
+
+class InMemoryResponseCache(ResponseCache):
+    """
+    LRU cache bounded by the total size of the stored responses.
+    """
+
+    def __init__(self, max_bytes: int, ttl: int | None = None) -> None:
+        super().__init__()
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._entries: OrderedDict[str, tuple[str, float]] = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+
+    def _get(self, key: str) -> str | None:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            value, created = entry
+            if self.ttl is not None and time.time() - created > self.ttl:
+                del self._entries[key]
+                self._size -= len(value)
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def _set(self, key: str, value: str) -> None:
+        if len(value) > self.max_bytes:
+            return
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._size -= len(old[0])
+            self._entries[key] = (value, time.time())
+            self._size += len(value)
+            while self._size > self.max_bytes:
+                _, (evicted, _) = self._entries.popitem(last=False)
+                self._size -= len(evicted)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._size = 0
+
+
+class SQLiteResponseCache(ResponseCache):
+    """
+    On-disk cache that survives restarts, so evaluation reruns can reuse responses.
+    Entries older than `ttl` seconds are ignored; least recently used entries are
+    evicted once the stored responses exceed `max_bytes`.
+    """
+
+    def __init__(self, path: str, max_bytes: int, ttl: int | None = None) -> None:
+        super().__init__()
+        self.path = path
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        dirname = os.path.dirname(path)
+        if dirname:
+            os.makedirs(dirname, exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        with self._lock, self._conn:
+            self._conn.execute(
+                'CREATE TABLE IF NOT EXISTS responses ('
+                'key TEXT PRIMARY KEY, value TEXT NOT NULL, size INTEGER NOT NULL, '
+                'created REAL NOT NULL, accessed REAL NOT NULL)'
+            )
+            self._conn.execute(
+                'CREATE INDEX IF NOT EXISTS responses_accessed ON responses (accessed)'
+            )
+
+    def _get(self, key: str) -> str | None:
+        now = time.time()
+        with self._lock, self._conn:
+            row = self._conn.execute(
+                'SELECT value, created FROM responses WHERE key = ?', (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            value, created = row
+            if self.ttl is not None and now - created > self.ttl:
+                self._conn.execute('DELETE FROM responses WHERE key = ?', (key,))
+                return None
+            self._conn.execute(
+                'UPDATE responses SET accessed = ? WHERE key = ?', (now, key)
+            )
+            return value
+
+    def _set(self, key: str, value: str) -> None:
+        now = time.time()
+        with self._lock, self._conn:
+            self._conn.execute(
+                'INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?)',
+                (key, value, len(value), now, now),
+            )
+            self._evict()
+
+    def _evict(self) -> None:
+        (total,) = self._conn.execute(
+            'SELECT COALESCE(SUM(size), 0) FROM responses'
+        ).fetchone()
+        if total <= self.max_bytes:
+            return
+        rows = self._conn.execute(
+            'SELECT key, size FROM responses ORDER BY accessed'
+        ).fetchall()
+        evicted = []
+        for key, size in rows:
+            if total <= self.max_bytes:
+                break
+            evicted.append((key,))
+            total -= size
+        self._conn.executemany('DELETE FROM responses WHERE key = ?', evicted)
+
+    def clear(self) -> None:
+        with self._lock, self._conn:
+            self._conn.execute('DELETE FROM responses')
+
+
+_caches: dict[tuple, ResponseCache] = {}
+_caches_lock = threading.Lock()
+
+
+def get_response_cache(
+    backend: str, path: str, max_bytes: int, ttl: int | None = None
+) -> ResponseCache:
+    """
+    Returns the process-wide cache for the given backend, so all LLM instances share it.
+
+    Parameters:
+    - backend (str): 'memory' or 'sqlite'
+    - path (str): The database file, used by the sqlite backend
+    - max_bytes (int): The size cap of the stored responses
+    - ttl (int | None): How long entries stay valid, in seconds
+    """
+    if backend not in ('memory', 'sqlite'):
+        raise ValueError(f'Invalid response cache backend: {backend}')
+    cache_key = (backend, path if backend == 'sqlite' else None)
+    with _caches_lock:
+        if cache_key not in _caches:
+            logger.info(f'Using {backend} LLM response cache')
+            if backend == 'memory':
+                _caches[cache_key] = InMemoryResponseCache(max_bytes, ttl)
+            else:
+                _caches[cache_key] = SQLiteResponseCache(path, max_bytes, ttl)
+        return _caches[cache_key]
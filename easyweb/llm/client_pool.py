@@ -0,0 +1,197 @@
+import asyncio
+import os
+import threading
+import warnings
+import weakref
+from dataclasses import dataclass, field
+
+import httpx
+
+with warnings.catch_warnings():
+    warnings.simplefilter('ignore')
+    import litellm
+from openai import AsyncOpenAI, OpenAI
+
+from easyweb.core.logger import easyweb_logger as logger
+
+__all__ = ['LLMClientPool', 'llm_client_pool']
+
+# providers whose litellm handler accepts a pre-built OpenAI client
+POOLED_PROVIDERS = ['openai', 'custom_openai']
+
+
+@dataclass
+class PooledClient:
+    """
+    Keep-alive HTTP clients for one (provider, base_url, api_key).
+    Async clients are per event loop, since httpx connections can't move between loops,
+    and are dropped once their loop is closed or collected.
+    """
+
+    sync_client: OpenAI
+    async_clients: weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, AsyncOpenAI] = (
+        field(default_factory=weakref.WeakKeyDictionary)
+    )
+    requests: int = 0
+
+
+class LLMClientPool:
+    """
+    Process-wide registry of LLM HTTP clients and model metadata.
+
+    Each session creates its own LLM, but LLMs talking to the same endpoint with
+    the same key share one connection pool, so steps reuse warm TLS connections
+    instead of opening new ones. Model info lookups are memoized for the same
+    reason: they would otherwise run on every LLM (i.e. every session) init.
+    """
+
+    def __init__(
+        self,
+        max_connections: int = 100,
+        max_keepalive_connections: int = 20,
+        keepalive_expiry: float = 60,
+    ):
+        self.limits = httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive_connections,
+            keepalive_expiry=keepalive_expiry,
+        )
+        self._clients: dict[tuple, PooledClient] = {}
+        self._model_info: dict[str, dict | None] = {}
+        self._model_info_hits = 0
+        self._model_info_misses = 0
+        self._lock = threading.Lock()
+
+    def _get_key(
+        self,
+        model: str,
+        base_url: str | None,
+        api_key: str | None,
+        custom_llm_provider: str | None = None,
+    ) -> tuple | None:
+        try:
+            _, provider, _, _ = litellm.get_llm_provider(
+                model=model, custom_llm_provider=custom_llm_provider, api_base=base_url
+            )
+        except Exception:
+            return None
+        if provider not in POOLED_PROVIDERS:
+            return None
+        api_key = api_key or os.environ.get('OPENAI_API_KEY')
+        if not api_key:
+            return None
+        return (provider, base_url, api_key)
+
+    def _get_pooled_client(self, key: tuple) -> PooledClient:
+        with self._lock:
+            pooled = self._clients.get(key)
+            if pooled is None:
+                _, base_url, api_key = key
+                logger.debug(f'Creating pooled LLM client for {base_url or "default"}')
+                pooled = PooledClient(
+                    sync_client=OpenAI(
+                        api_key=api_key,
+                        base_url=base_url,
+                        http_client=httpx.Client(limits=self.limits),
+                    )
+                )
+                self._clients[key] = pooled
+            pooled.requests += 1
+            return pooled
+
+    def get_client(
+        self,
+        model: str,
+        base_url: str | None,
+        api_key: str | None,
+        custom_llm_provider: str | None = None,
+    ) -> OpenAI | None:
+        """
+        Returns the shared sync client for this endpoint, or None if litellm
+        should create its own (providers that don't take an OpenAI client).
+        """
+        key = self._get_key(model, base_url, api_key, custom_llm_provider)
+        if key is None:
+            return None
+        return self._get_pooled_client(key).sync_client
+
+    def get_async_client(
+        self,
+        model: str,
+        base_url: str | None,
+        api_key: str | None,
+        custom_llm_provider: str | None = None,
+    ) -> AsyncOpenAI | None:
+        """
+        Returns the shared async client for this endpoint and the running event loop.
+        """
+        key = self._get_key(model, base_url, api_key, custom_llm_provider)
+        if key is None:
+            return None
+        pooled = self._get_pooled_client(key)
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            # a client may keep its loop alive through its connections
+            closed = [other for other in pooled.async_clients if other.is_closed()]
+            for other in closed:
+                del pooled.async_clients[other]
+            client = pooled.async_clients.get(loop)
+            if client is None:
+                _, base_url, api_key = key
+                client = AsyncOpenAI(
+                    api_key=api_key,
+                    base_url=base_url,
+                    http_client=httpx.AsyncClient(limits=self.limits),
+                )
+                pooled.async_clients[loop] = client
+            return client
+
+    def get_model_info(self, model_name: str) -> dict | None:
+        """
+        Memoized litellm.get_model_info. Unknown models are remembered as None.
+        """
+        with self._lock:
+            if model_name in self._model_info:
+                self._model_info_hits += 1
+                return self._model_info[model_name]
+            self._model_info_misses += 1
+        # litellm actually uses base Exception here for unknown model
+        try:
+            if not model_name.startswith('openrouter'):
+                model_info = litellm.get_model_info(model_name.split(':')[0])
+            else:
+                model_info = litellm.get_model_info(model_name)
+        # noinspection PyBroadException
+        except Exception:
+            logger.warning(f'Could not get model info for {model_name}')
+            model_info = None
+        with self._lock:
+            self._model_info[model_name] = model_info
+        return model_info
+
+    def stats(self) -> dict:
+        """
+        Returns the number of pooled endpoints, requests served per endpoint and model info cache counters.
+        """
+        with self._lock:
+            return {
+                'clients': len(self._clients),
+                'async_clients': sum(
+                    len(pooled.async_clients) for pooled in self._clients.values()
+                ),
+                'requests': {
+                    f'{provider}:{base_url or "default"}': pooled.requests
+                    for (provider, base_url, _), pooled in self._clients.items()
+                },
+                'model_info_hits': self._model_info_hits,
+                'model_info_misses': self._model_info_misses,
+            }
+
+    def close(self) -> None:
+        with self._lock:
+            for pooled in self._clients.values():
+                pooled.sync_client.close()
+            self._clients.clear()
+
+
+llm_client_pool = LLMClientPool()
@@ -1,9 +1,17 @@
+import asyncio
+import contextvars
+import json
+import os
+import time
+import uuid
 import warnings
+from collections import deque
 from functools import partial
 
 with warnings.catch_warnings():
     warnings.simplefilter('ignore')
     import litellm
+from litellm import acompletion as litellm_acompletion
 from litellm import completion as litellm_completion
 from litellm import completion_cost as litellm_completion_cost
 from litellm.exceptions import (
@@ -20,16 +28,51 @@ from tenacity import (
     wait_random_exponential,
 )
 
+from easyweb.core.cancellation import (
+    cancellable_sleep,
+    get_current_token,
+    raise_if_cancelled,
+)
 from easyweb.core.config import config
+from easyweb.core.exceptions import AgentStepCancelledError, LLMOutputError
 from easyweb.core.logger import easyweb_logger as logger
-from easyweb.core.logger import llm_prompt_logger, llm_response_logger
-from easyweb.core.metrics import Metrics
+from easyweb.core.logger import (
+    is_llm_log_sampled,
+    llm_prompt_logger,
+    llm_response_logger,
+)
+from easyweb.core.metrics import CompletionRecord, Metrics, llm_stats
+from easyweb.core.tracing import span
+from easyweb.llm.batch import run_batch
+from easyweb.llm.cache import get_response_cache, make_cache_key
+from easyweb.llm.client_pool import llm_client_pool
+from easyweb.llm.prompt_cache import add_cache_control, supports_cache_control
+from easyweb.llm.rate_limiter import EndpointLimiter, rate_limiter
+from easyweb.llm.router import Endpoint, EndpointRouter
+from easyweb.llm.streaming import StreamCollector, aclose_stream, close_stream
 
 __all__ = ['LLM']
 
 litellm.drop_params = True
 message_separator = '\n\n----------\n\n'
 
+# attempts made for the completion in progress (retries and hedges included)
+_attempt_counter: contextvars.ContextVar[list[int] | None] = contextvars.ContextVar(
+    'easyweb_llm_attempt_counter', default=None
+)
+
+
+def get_cached_tokens(usage) -> int:
+    """
+    Returns the prompt tokens served from the provider's prompt cache.
+    """
+    details = getattr(usage, 'prompt_tokens_details', None)
+    cached_tokens = getattr(details, 'cached_tokens', None) if details else None
+    if cached_tokens is None:
+        # anthropic reports cache reads separately
+        cached_tokens = getattr(usage, 'cache_read_input_tokens', None)
+    return cached_tokens or 0
+
 
 class LLM:
     """
@@ -63,6 +106,8 @@ class LLM:
         max_output_tokens=None,
         llm_config=None,
         metrics=None,
+        fallbacks=None,
+        session_id=None,
     ):
         """
         Initializes the LLM. If LLMConfig is passed, its values will be the fallback.
@@ -83,6 +128,8 @@ class LLM:
             llm_timeout (int, optional): The maximum time to wait for a response in seconds. Defaults to LLM_TIMEOUT.
             llm_temperature (float, optional): The temperature for LLM sampling. Defaults to LLM_TEMPERATURE.
             metrics (Metrics, optional): The metrics object to use. Defaults to None.
+            fallbacks (list[tuple[str, str]], optional): Equivalent (model, base_url) endpoints to hedge and fail over to. Defaults to None.
+            session_id (str, optional): The session whose LLM log file the prompts and responses go to. Defaults to None.
         """
         if llm_config is None:
             llm_config = config.llm
@@ -129,17 +176,20 @@ class LLM:
         self.llm_timeout = llm_timeout
         self.custom_llm_provider = custom_llm_provider
         self.metrics = metrics
+        self.session_id = session_id
 
-        # litellm actually uses base Exception here for unknown model
-        self.model_info = None
-        try:
-            if not self.model_name.startswith('openrouter'):
-                self.model_info = litellm.get_model_info(self.model_name.split(':')[0])
-            else:
-                self.model_info = litellm.get_model_info(self.model_name)
-        # noinspection PyBroadException
-        except Exception:
-            logger.warning(f'Could not get model info for {self.model_name}')
+        self.model_info = llm_client_pool.get_model_info(self.model_name)
+
+        self._custom_cost_per_token = None
+        if (
+            config.llm.input_cost_per_token is not None
+            and config.llm.output_cost_per_token is not None
+        ):
+            self._custom_cost_per_token = CostPerToken(
+                input_cost_per_token=config.llm.input_cost_per_token,
+                output_cost_per_token=config.llm.output_cost_per_token,
+            )
+            logger.info(f'Using custom cost per token: {self._custom_cost_per_token}')
 
         if self.max_input_tokens is None:
             if self.model_info is not None and 'max_input_tokens' in self.model_info:
@@ -172,9 +222,43 @@ class LLM:
             completion_params['temperature'] = llm_temperature
             completion_params['top_p'] = llm_top_p
 
+        self._completion_params = completion_params
+
+        self.response_cache = None
+        if llm_config.response_cache:
+            self.response_cache = get_response_cache(
+                llm_config.response_cache,
+                llm_config.response_cache_path
+                or os.path.join(config.cache_dir, 'llm_response_cache.db'),
+                llm_config.response_cache_max_bytes,
+                llm_config.response_cache_ttl,
+            )
+        self.cache_nondeterministic = llm_config.response_cache_nondeterministic
+        self.streaming = llm_config.streaming
+        self.prompt_caching = llm_config.prompt_caching
+        self._rate_limits = (
+            llm_config.requests_per_minute,
+            llm_config.tokens_per_minute,
+            llm_config.max_concurrent_requests,
+        )
+
+        self.router = None
+        if fallbacks:
+            endpoints = [Endpoint(self.model_name, self.base_url)] + [
+                Endpoint(fallback_model, fallback_base_url)
+                for fallback_model, fallback_base_url in fallbacks
+            ]
+            self.router = EndpointRouter(
+                endpoints, hedge_budget=llm_config.hedge_budget
+            )
+        # completion lengths of streams that ran to the end, to estimate what an early stop saves
+        self._full_stream_tokens: deque[int] = deque(maxlen=50)
+
         self._completion = partial(litellm_completion, **completion_params)
+        self._acompletion = partial(litellm_acompletion, **completion_params)
 
         completion_unwrapped = self._completion
+        acompletion_unwrapped = self._acompletion
 
         def attempt_on_error(retry_state):
             logger.error(
@@ -183,35 +267,325 @@ class LLM:
             )
             return True
 
+        retry_on = retry_if_exception_type(
+            (
+                RateLimitError,
+                APIConnectionError,
+                ServiceUnavailableError,
+                BadRequestError,
+            )
+        )
+
+        def attempt(*args, **kwargs):
+            raise_if_cancelled()
+            self._count_attempt()
+            log_id = self._sample_log()
+            self._log_prompt(args, kwargs, log_id)
+            model = kwargs.get('model', self.model_name)
+            base_url = kwargs.get('base_url', self.base_url)
+            # reuse the process-wide keep-alive connections to this endpoint
+            client = llm_client_pool.get_client(
+                model, base_url, self.api_key, self.custom_llm_provider
+            )
+            if client is not None:
+                kwargs.setdefault('client', client)
+            self._mark_cacheable_prefix(model, kwargs)
+            limiter = self._get_rate_limiter(model, base_url)
+            with span('llm.rate_limit_wait', model=model):
+                ticket = limiter.acquire(id(self), self._estimate_tokens(kwargs))
+            try:
+                with span('llm.attempt', model=model):
+                    resp = completion_unwrapped(*args, **kwargs)
+            except Exception as e:
+                self._release_rate_limit(limiter, ticket, error=e)
+                raise
+            if kwargs.get('stream'):
+                # consumed and logged by stream_completion, which also
+                # releases the slot once the stream is done
+                resp._easyweb_rate_limit = (limiter, ticket)
+                resp._easyweb_log_id = log_id
+                return resp
+            self._release_rate_limit(limiter, ticket, resp=resp)
+            self._check_cancelled_after_response(resp)
+            self._log_response(resp['choices'][0]['message']['content'], log_id)
+            return resp
+
+        async def async_attempt(*args, **kwargs):
+            raise_if_cancelled()
+            self._count_attempt()
+            log_id = self._sample_log()
+            self._log_prompt(args, kwargs, log_id)
+            model = kwargs.get('model', self.model_name)
+            base_url = kwargs.get('base_url', self.base_url)
+            client = llm_client_pool.get_async_client(
+                model, base_url, self.api_key, self.custom_llm_provider
+            )
+            if client is not None:
+                kwargs.setdefault('client', client)
+            self._mark_cacheable_prefix(model, kwargs)
+            limiter = self._get_rate_limiter(model, base_url)
+            with span('llm.rate_limit_wait', model=model):
+                ticket = await limiter.aacquire(id(self), self._estimate_tokens(kwargs))
+            try:
+                with span('llm.attempt', model=model):
+                    resp = await acompletion_unwrapped(*args, **kwargs)
+            except BaseException as e:
+                self._release_rate_limit(limiter, ticket, error=e)
+                raise
+            if kwargs.get('stream'):
+                resp._easyweb_rate_limit = (limiter, ticket)
+                resp._easyweb_log_id = log_id
+                return resp
+            self._release_rate_limit(limiter, ticket, resp=resp)
+            self._check_cancelled_after_response(resp)
+            self._log_response(resp['choices'][0]['message']['content'], log_id)
+            return resp
+
         @retry(
             reraise=True,
             stop=stop_after_attempt(num_retries),
             wait=wait_random_exponential(min=retry_min_wait, max=retry_max_wait),
-            retry=retry_if_exception_type(
-                (
-                    RateLimitError,
-                    APIConnectionError,
-                    ServiceUnavailableError,
-                    BadRequestError,
-                )
-            ),
+            # wake up early from the backoff wait if the agent step is cancelled
+            sleep=cancellable_sleep,
+            retry=retry_on,
             after=attempt_on_error,
         )
         def wrapper(*args, **kwargs):
-            if 'messages' in kwargs:
-                messages = kwargs['messages']
-            else:
-                messages = args[1]
-            debug_message = ''
-            for message in messages:
-                debug_message += message_separator + message['content']
-            llm_prompt_logger.debug(debug_message)
-            resp = completion_unwrapped(*args, **kwargs)
-            message_back = resp['choices'][0]['message']['content']
-            llm_response_logger.debug(message_back)
-            return resp
+            # streams are not hedged: there is no single response to race
+            if self.router is None or kwargs.get('stream'):
+                return attempt(*args, **kwargs)
+            return self.router.call(
+                lambda endpoint: attempt(*args, **{**kwargs, **endpoint.params}),
+                on_discarded=self.completion_cost,
+            )
+
+        # tenacity waits with asyncio.sleep for coroutines, so the backoff
+        # wait does not hold a thread and is interrupted by task cancellation
+        @retry(
+            reraise=True,
+            stop=stop_after_attempt(num_retries),
+            wait=wait_random_exponential(min=retry_min_wait, max=retry_max_wait),
+            retry=retry_on,
+            after=attempt_on_error,
+        )
+        async def async_wrapper(*args, **kwargs):
+            if self.router is None or kwargs.get('stream'):
+                return await async_attempt(*args, **kwargs)
+            return await self.router.acall(
+                lambda endpoint: async_attempt(*args, **{**kwargs, **endpoint.params}),
+                on_discarded=self.completion_cost,
+            )
+
+        def traced_wrapper(*args, **kwargs):
+            # one span for the whole call, including retries and backoff waits
+            with span('llm.completion', model=self.model_name):
+                cache_key = self._get_cache_key(kwargs)
+                if cache_key is not None:
+                    cached = self._get_cached_response(cache_key, args, kwargs)
+                    if cached is not None:
+                        return cached
+                start = time.time()
+                attempts = [0]
+                reset_token = _attempt_counter.set(attempts)
+                try:
+                    resp = wrapper(*args, **kwargs)
+                finally:
+                    _attempt_counter.reset(reset_token)
+                if not kwargs.get('stream'):
+                    self._record_completion(resp, time.time() - start, attempts[0])
+                if cache_key is not None:
+                    self._cache_response(cache_key, resp)
+                return resp
+
+        async def async_traced_wrapper(*args, **kwargs):
+            with span('llm.completion', model=self.model_name):
+                cache_key = self._get_cache_key(kwargs)
+                if cache_key is not None:
+                    cached = self._get_cached_response(cache_key, args, kwargs)
+                    if cached is not None:
+                        return cached
+                start = time.time()
+                attempts = [0]
+                reset_token = _attempt_counter.set(attempts)
+                try:
+                    resp = await async_wrapper(*args, **kwargs)
+                finally:
+                    _attempt_counter.reset(reset_token)
+                if not kwargs.get('stream'):
+                    self._record_completion(resp, time.time() - start, attempts[0])
+                if cache_key is not None:
+                    self._cache_response(cache_key, resp)
+                return resp
+
+        self._completion = traced_wrapper  # type: ignore
+        self._acompletion = async_traced_wrapper  # type: ignore
+
+    def _count_attempt(self) -> None:
+        attempts = _attempt_counter.get()
+        if attempts is not None:
+            attempts[0] += 1
+
+    def _record_completion(self, resp, latency: float, attempts: int) -> None:
+        """
+        Accounts tokens and latency of a completion, per session and process-wide.
+        """
+        usage = getattr(resp, 'usage', None)
+        if usage is None:
+            return
+        hidden_params = getattr(resp, '_hidden_params', None) or {}
+        record = CompletionRecord(
+            # the endpoint that answered may differ from the configured one after a failover
+            model=hidden_params.get('litellm_model_name') or self.model_name,
+            prompt_tokens=usage.prompt_tokens or 0,
+            completion_tokens=usage.completion_tokens or 0,
+            cached_tokens=get_cached_tokens(usage),
+            latency=latency,
+            retries=max(0, attempts - 1),
+        )
+        if record.cached_tokens:
+            logger.debug(
+                f'{record.model}: {record.cached_tokens} of {record.prompt_tokens} prompt tokens served from the prompt cache'
+            )
+        self.metrics.add_completion(record)
+        llm_stats.record(record)
+
+    def _mark_cacheable_prefix(self, model: str, kwargs) -> None:
+        # per attempt: a failover may switch to a provider without markers
+        if (
+            self.prompt_caching
+            and kwargs.get('messages')
+            and supports_cache_control(model, self.custom_llm_provider)
+        ):
+            kwargs['messages'] = add_cache_control(kwargs['messages'])
+
+    def _estimate_tokens(self, kwargs) -> int:
+        """
+        Rough token estimate of a request for the rate limiter; corrected with the actual usage afterwards.
+        """
+        messages = kwargs.get('messages') or []
+        prompt_chars = sum(
+            len(str(message.get('content') or '')) for message in messages
+        )
+        max_tokens = kwargs.get('max_tokens') or self.max_output_tokens or 0
+        return prompt_chars // 4 + max_tokens
+
+    def _get_rate_limiter(self, model: str, base_url: str | None) -> EndpointLimiter:
+        return rate_limiter.get(model, base_url, *self._rate_limits)
+
+    def _release_rate_limit(
+        self, limiter: EndpointLimiter, ticket, resp=None, error=None
+    ) -> None:
+        if error is not None:
+            response = getattr(error, 'response', None)
+            headers = getattr(error, 'headers', None) or getattr(
+                response, 'headers', None
+            )
+            limiter.release(
+                ticket,
+                used_tokens=0,
+                headers=dict(headers) if headers else None,
+                rate_limited=isinstance(error, RateLimitError),
+            )
+            return
+        hidden_params = getattr(resp, '_hidden_params', None) or {}
+        usage = getattr(resp, 'usage', None)
+        limiter.release(
+            ticket,
+            # streams report usage at the end; keep the estimate for them
+            used_tokens=usage.total_tokens if usage else None,
+            headers=hidden_params.get('additional_headers'),
+        )
+
+    def _release_stream(self, stream, resp=None) -> None:
+        """
+        Releases the rate limiter slot the attempt handed over to `stream`, once it is consumed or closed.
+        """
+        rate_limit = getattr(stream, '_easyweb_rate_limit', None)
+        if rate_limit is None:
+            return
+        del stream._easyweb_rate_limit
+        limiter, ticket = rate_limit
+        self._release_rate_limit(limiter, ticket, resp=resp)
+
+    def _get_cache_key(self, kwargs) -> str | None:
+        """
+        Returns the response cache key for this request, or None if it should not be cached.
+        """
+        if self.response_cache is None or 'messages' not in kwargs:
+            return None
+        if kwargs.get('stream'):
+            return None
+        params = {**self._completion_params, **kwargs}
+        # without an explicit temperature the provider default (usually 1) applies
+        temperature = params.get('temperature')
+        if (temperature is None or temperature > 0) and not self.cache_nondeterministic:
+            return None
+        return make_cache_key(params)
+
+    def _get_cached_response(self, cache_key: str, args, kwargs):
+        assert self.response_cache is not None
+        value = self.response_cache.get(cache_key)
+        if value is None:
+            self.metrics.add_cache_miss()
+            return None
+        self.metrics.add_cache_hit(len(value))
+        resp = litellm.ModelResponse(**json.loads(value))
+        # completion_cost checks this, so cache hits are free
+        resp._hidden_params['cache_hit'] = True
+        log_id = self._sample_log()
+        self._log_prompt(args, kwargs, log_id)
+        self._log_response(resp['choices'][0]['message']['content'], log_id)
+        return resp
 
-        self._completion = wrapper  # type: ignore
+    def _cache_response(self, cache_key: str, resp) -> None:
+        assert self.response_cache is not None
+        try:
+            self.response_cache.set(cache_key, resp.model_dump_json())
+        except Exception as e:
+            logger.warning(f'Could not cache LLM response: {e}')
+
+    def _sample_log(self) -> str | None:
+        """
+        Returns the id pairing a prompt with its response in the LLM log, or
+        None if this call is not logged.
+        """
+        return uuid.uuid4().hex if is_llm_log_sampled() else None
+
+    def _log_prompt(self, args, kwargs, log_id: str | None) -> None:
+        if log_id is None:
+            return
+        messages = kwargs['messages'] if 'messages' in kwargs else args[1]
+        # serialized by the background log writer, not here
+        llm_prompt_logger.debug(
+            'prompt',
+            extra={
+                'session_id': self.session_id,
+                'llm': {
+                    'id': log_id,
+                    'model': kwargs.get('model', self.model_name),
+                    'messages': list(messages),
+                },
+            },
+        )
+
+    def _log_response(self, content: str, log_id: str | None) -> None:
+        if log_id is None:
+            return
+        llm_response_logger.debug(
+            'response',
+            extra={
+                'session_id': self.session_id,
+                'llm': {'id': log_id, 'content': content},
+            },
+        )
+
+    def _check_cancelled_after_response(self, resp):
+        # the user may have stopped the agent while we were waiting on the LLM;
+        # account for the tokens we already paid for before unwinding
+        token = get_current_token()
+        if token is not None and token.cancelled:
+            self.completion_cost(resp)
+            token.raise_if_cancelled()
 
     @property
     def completion(self):
@@ -220,6 +594,101 @@ class LLM:
         """
         return self._completion
 
+    @property
+    def acompletion(self):
+        """
+        Decorator for the litellm async completion function.
+
+        Same retry policy and logging as `completion`, but awaitable, so a
+        waiting agent does not hold a thread.
+        """
+        return self._acompletion
+
+    def stream_completion(self, *args, on_partial=None, is_complete=None, **kwargs):
+        """
+        Streams a completion and returns the assembled response, like `completion`.
+
+        Args:
+            on_partial (Callable[[str], None], optional): Called with the text generated so far after every chunk.
+            is_complete (Callable[[str], bool], optional): Returns True once the text holds a complete action; the stream is closed right away.
+        """
+        collector = StreamCollector(on_partial, is_complete)
+        with span('llm.stream', model=self.model_name):
+            stream = self._completion(*args, stream=True, **kwargs)
+            resp = None
+            try:
+                for chunk in stream:
+                    raise_if_cancelled()
+                    if collector.add(chunk):
+                        break
+                resp = self._build_stream_response(
+                    collector, kwargs, getattr(stream, '_easyweb_log_id', None)
+                )
+            finally:
+                close_stream(stream)
+                self._release_stream(stream, resp)
+        return resp
+
+    async def astream_completion(
+        self, *args, on_partial=None, is_complete=None, **kwargs
+    ):
+        """
+        Async version of `stream_completion`.
+        """
+        collector = StreamCollector(on_partial, is_complete)
+        with span('llm.stream', model=self.model_name):
+            stream = await self._acompletion(*args, stream=True, **kwargs)
+            resp = None
+            try:
+                async for chunk in stream:
+                    raise_if_cancelled()
+                    if collector.add(chunk):
+                        break
+                resp = self._build_stream_response(
+                    collector, kwargs, getattr(stream, '_easyweb_log_id', None)
+                )
+            finally:
+                await aclose_stream(stream)
+                self._release_stream(stream, resp)
+        return resp
+
+    def _build_stream_response(
+        self, collector: StreamCollector, kwargs, log_id: str | None
+    ):
+        collector.finish()
+        messages = kwargs.get('messages')
+        resp = litellm.stream_chunk_builder(collector.chunks, messages=messages)
+        if resp is None:
+            raise LLMOutputError('The LLM stream returned no chunks')
+        if not resp.usage or not resp.usage.total_tokens:
+            # providers only report usage in the final chunk, which an early stop never receives
+            prompt_tokens = self.get_token_count(messages) if messages else 0
+            completion_tokens = litellm.token_counter(
+                model=self.model_name, text=collector.text
+            )
+            resp.usage = litellm.Usage(
+                prompt_tokens=prompt_tokens,
+                completion_tokens=completion_tokens,
+                total_tokens=prompt_tokens + completion_tokens,
+            )
+        completion_tokens = resp.usage.completion_tokens
+
+        tokens_saved = 0
+        if not collector.stopped_early:
+            self._full_stream_tokens.append(completion_tokens)
+        elif self._full_stream_tokens:
+            average = sum(self._full_stream_tokens) / len(self._full_stream_tokens)
+            tokens_saved = max(0, int(average) - completion_tokens)
+        self.metrics.add_stream_result(collector.time_to_action, tokens_saved)
+        self._record_completion(resp, time.time() - collector.start, 1)
+        logger.debug(
+            f'Streamed completion: first action after {collector.time_to_action:.2f}s, '
+            f'stopped early: {collector.stopped_early}, ~{tokens_saved} tokens saved'
+        )
+        # the id the attempt logged the prompt with
+        self._log_response(collector.text, log_id)
+        return resp
+
     def do_completion(self, *args, **kwargs):
         """
         Wrapper for the litellm completion function.
@@ -230,6 +699,60 @@ class LLM:
         self.post_completion(resp)
         return resp
 
+    async def ado_completion(self, *args, **kwargs):
+        """
+        Async counterpart of `do_completion`.
+        """
+        resp = await self._acompletion(*args, **kwargs)
+        self.post_completion(resp)
+        return resp
+
+    def batch_completion(
+        self, requests: list[dict], max_concurrency: int | None = None
+    ) -> list:
+        """
+        Sends independent completion requests concurrently, e.g. n samples of one
+        prompt for providers that ignore `n`, and returns the results in order.
+
+        Every request still goes through the shared rate limiter of its endpoint.
+        A failed request yields its exception in place of the response, so one
+        failure does not discard the other samples; cancelling the agent step
+        cancels the whole batch.
+
+        Args:
+            requests (list[dict]): The keyword arguments of each `do_completion` call.
+            max_concurrency (int, optional): The maximum number of requests of this batch in flight. Defaults to all of them.
+        """
+        return run_batch(
+            [partial(self.do_completion, **request) for request in requests],
+            max_concurrency,
+        )
+
+    async def abatch_completion(
+        self, requests: list[dict], max_concurrency: int | None = None
+    ) -> list:
+        """
+        Async counterpart of `batch_completion`.
+        """
+        semaphore = asyncio.Semaphore(max_concurrency or max(len(requests), 1))
+
+        async def run(request: dict):
+            async with semaphore:
+                return await self.ado_completion(**request)
+
+        tasks = [asyncio.ensure_future(run(request)) for request in requests]
+        try:
+            results = await asyncio.gather(*tasks, return_exceptions=True)
+        finally:
+            for task in tasks:
+                task.cancel()
+        for result in results:
+            if isinstance(result, (AgentStepCancelledError, asyncio.CancelledError)):
+                raise result
+            if isinstance(result, Exception):
+                logger.warning(f'Batch completion request failed: {result}')
+        return results
+
     def post_completion(self, response: str) -> None:
         """
         Post-process the completion response.
@@ -283,17 +806,13 @@ class LLM:
         Returns:
             number: The cost of the response.
         """
+        if getattr(response, '_hidden_params', {}).get('cache_hit'):
+            self.metrics.add_cost(0.0)
+            return 0.0
+
         extra_kwargs = {}
-        if (
-            config.llm.input_cost_per_token is not None
-            and config.llm.output_cost_per_token is not None
-        ):
-            cost_per_token = CostPerToken(
-                input_cost_per_token=config.llm.input_cost_per_token,
-                output_cost_per_token=config.llm.output_cost_per_token,
-            )
-            logger.info(f'Using custom cost per token: {cost_per_token}')
-            extra_kwargs['custom_cost_per_token'] = cost_per_token
+        if self._custom_cost_per_token is not None:
+            extra_kwargs['custom_cost_per_token'] = self._custom_cost_per_token
 
         if not self.is_local():
             try:
@@ -301,6 +820,10 @@ class LLM:
                     completion_response=response, **extra_kwargs
                 )
                 self.metrics.add_cost(cost)
+                hidden_params = getattr(response, '_hidden_params', None) or {}
+                llm_stats.add_cost(
+                    hidden_params.get('litellm_model_name') or self.model_name, cost
+                )
                 return cost
             except Exception:
                 logger.warning('Cost calculation not supported for this model.')
@@ -0,0 +1,62 @@
+import warnings
+from functools import lru_cache
+
+with warnings.catch_warnings():
+    warnings.simplefilter('ignore')
+    import litellm
+
+__all__ = ['supports_cache_control', 'add_cache_control']
+
+CACHE_CONTROL = {'type': 'ephemeral'}
+
+# providers that only reuse a prompt prefix marked with cache_control; openai,
+# azure and deepseek cache the longest repeated prefix automatically
+CACHE_CONTROL_PROVIDERS = ['anthropic']
+# providers that serve anthropic models with the same markers
+CLAUDE_HOSTING_PROVIDERS = ['bedrock', 'vertex_ai', 'vertex_ai_beta']
+
+
+@lru_cache(maxsize=None)
+def supports_cache_control(model: str, custom_llm_provider: str | None = None) -> bool:
+    """
+    Whether the model needs explicit cache_control markers to cache its prompt prefix.
+    """
+    try:
+        _, provider, _, _ = litellm.get_llm_provider(
+            model=model, custom_llm_provider=custom_llm_provider
+        )
+    except Exception:
+        return False
+    if provider in CACHE_CONTROL_PROVIDERS:
+        return True
+    return provider in CLAUDE_HOSTING_PROVIDERS and 'claude' in model
+
+
+def add_cache_control(messages: list[dict]) -> list[dict]:
+    """
+    Marks the end of the static prompt prefix as cacheable.
+
+    Agents put the content that is identical across steps and sessions
+    (instructions, action space, examples) in the leading system messages, and
+    everything that changes per step (goal, date, page, history) after them. The
+    last leading system message becomes the cache breakpoint. The input is not modified.
+    """
+    prefix_end = None
+    for i, message in enumerate(messages):
+        if message.get('role') != 'system':
+            break
+        prefix_end = i
+    if prefix_end is None:
+        return messages
+    message = messages[prefix_end]
+    content = message.get('content')
+    if isinstance(content, str):
+        content = [{'type': 'text', 'text': content}]
+    elif isinstance(content, list) and content:
+        content = [dict(part) for part in content]
+    else:
+        return messages
+    content[-1]['cache_control'] = CACHE_CONTROL
+    marked = list(messages)
+    marked[prefix_end] = {**message, 'content': content}
+    return marked
@@ -0,0 +1,326 @@
+import asyncio
+import re
+import threading
+import time
+from collections import OrderedDict, deque
+from dataclasses import dataclass, field
+
+from easyweb.core.cancellation import raise_if_cancelled
+from easyweb.core.logger import easyweb_logger as logger
+
+__all__ = ['RateLimiter', 'EndpointLimiter', 'rate_limiter']
+
+# how long a waiter sleeps at most before re-checking its turn and cancellation
+MAX_WAIT_INTERVAL = 0.5
+# back-off after a 429 when the provider does not say how long to wait
+DEFAULT_RETRY_AFTER = 2.0
+
+
+def _parse_duration(value: str) -> float | None:
+    """
+    Parses provider reset durations like '1s', '6m0s', '120ms' or plain seconds.
+    """
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        pass
+    if not isinstance(value, str):
+        return None
+    total = 0.0
+    matched = False
+    for amount, unit in re.findall(r'([\d.]+)(ms|h|m|s)', value):
+        matched = True
+        total += float(amount) * {'ms': 0.001, 's': 1, 'm': 60, 'h': 3600}[unit]
+    return total if matched else None
+
+
+class TokenBucket:
+    """
+    Refills `rate_per_minute` units per minute up to a burst of one minute's worth.
+    The level may go negative when actual usage exceeds the estimate.
+    """
+
+    def __init__(self, rate_per_minute: float | None):
+        self.rate_per_minute = rate_per_minute
+        self.level = rate_per_minute or 0.0
+        self._last_refill = time.monotonic()
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.rate_per_minute)
+
+    def refill(self, now: float) -> None:
+        if not self.enabled:
+            return
+        elapsed = now - self._last_refill
+        self._last_refill = now
+        assert self.rate_per_minute is not None
+        self.level = min(
+            self.rate_per_minute, self.level + elapsed * self.rate_per_minute / 60
+        )
+
+    def time_until(self, amount: float) -> float:
+        if not self.enabled or self.level >= amount:
+            return 0.0
+        assert self.rate_per_minute is not None
+        # a request bigger than the whole bucket only waits for a full bucket
+        amount = min(amount, self.rate_per_minute)
+        return (amount - self.level) * 60 / self.rate_per_minute
+
+
+@dataclass
+class Ticket:
+    owner: int
+    tokens: int
+    enqueued: float = field(default_factory=time.monotonic)
+    # set for async waiters, which a release wakes through their loop
+    wake: asyncio.Event | None = field(default=None, compare=False)
+    loop: asyncio.AbstractEventLoop | None = field(default=None, compare=False)
+
+
+class EndpointLimiter:
+    """
+    Request/token buckets and a concurrency cap for one (model, base_url).
+
+    Waiting requests are queued per owner (one LLM instance, i.e. one session)
+    and served round-robin, so a session firing many requests cannot starve
+    the others.
+    """
+
+    def __init__(
+        self,
+        requests_per_minute: int | None = None,
+        tokens_per_minute: int | None = None,
+        max_concurrent_requests: int | None = None,
+    ):
+        self.requests = TokenBucket(requests_per_minute)
+        self.tokens = TokenBucket(tokens_per_minute)
+        self.max_concurrent_requests = max_concurrent_requests
+        self.in_flight = 0
+        self.blocked_until = 0.0
+        self._queues: OrderedDict[int, deque[Ticket]] = OrderedDict()
+        self._cond = threading.Condition()
+        # stats
+        self.granted = 0
+        self.rate_limited = 0
+        self.total_wait = 0.0
+
+    def _enqueue(self, ticket: Ticket) -> None:
+        self._queues.setdefault(ticket.owner, deque()).append(ticket)
+
+    def _dequeue(self, ticket: Ticket) -> None:
+        queue = self._queues.get(ticket.owner)
+        if queue is None:
+            return
+        if ticket in queue:
+            queue.remove(ticket)
+        if not queue:
+            del self._queues[ticket.owner]
+
+    def _notify(self) -> None:
+        """Wakes the waiters to re-check their turn; called with the condition held."""
+        self._cond.notify_all()
+        for queue in self._queues.values():
+            for ticket in queue:
+                if ticket.wake is None or ticket.loop is None:
+                    continue
+                try:
+                    ticket.loop.call_soon_threadsafe(ticket.wake.set)
+                except RuntimeError:
+                    # the waiter's loop is closed
+                    pass
+
+    def _try_grant(self, ticket: Ticket) -> float | None:
+        """
+        Grants the ticket if it is its turn and capacity allows.
+
+        Returns:
+        - None if granted, otherwise the seconds to wait before trying again.
+        """
+        now = time.monotonic()
+        if now < self.blocked_until:
+            return self.blocked_until - now
+        # round robin: only the oldest ticket of the owner at the front may go
+        owner, queue = next(iter(self._queues.items()))
+        if owner != ticket.owner or queue[0] is not ticket:
+            return MAX_WAIT_INTERVAL
+        if (
+            self.max_concurrent_requests is not None
+            and self.in_flight >= self.max_concurrent_requests
+        ):
+            return MAX_WAIT_INTERVAL
+        self.requests.refill(now)
+        self.tokens.refill(now)
+        wait = max(self.requests.time_until(1), self.tokens.time_until(ticket.tokens))
+        if wait > 0:
+            return wait
+        if self.requests.enabled:
+            self.requests.level -= 1
+        if self.tokens.enabled:
+            self.tokens.level -= ticket.tokens
+        self.in_flight += 1
+        self.granted += 1
+        self.total_wait += now - ticket.enqueued
+        queue.popleft()
+        del self._queues[owner]
+        if queue:
+            # the owner goes to the back of the line with its remaining requests
+            self._queues[owner] = queue
+        # the next owner in line may be able to go right away
+        self._notify()
+        return None
+
+    def acquire(self, owner: int, tokens: int) -> Ticket:
+        """
+        Blocks until the request may be sent. Raises if the agent step is cancelled meanwhile.
+        """
+        ticket = Ticket(owner, tokens)
+        with self._cond:
+            self._enqueue(ticket)
+            try:
+                while True:
+                    wait = self._try_grant(ticket)
+                    if wait is None:
+                        return ticket
+                    self._cond.wait(min(wait, MAX_WAIT_INTERVAL))
+                    raise_if_cancelled()
+            except BaseException:
+                self._dequeue(ticket)
+                self._notify()
+                raise
+
+    async def aacquire(self, owner: int, tokens: int) -> Ticket:
+        """
+        Async version of `acquire`, waiting without blocking the event loop.
+        """
+        wake = asyncio.Event()
+        ticket = Ticket(owner, tokens, wake=wake, loop=asyncio.get_running_loop())
+        with self._cond:
+            self._enqueue(ticket)
+        try:
+            while True:
+                # cleared before the check, so a release right after it still wakes us
+                wake.clear()
+                with self._cond:
+                    wait = self._try_grant(ticket)
+                if wait is None:
+                    return ticket
+                try:
+                    await asyncio.wait_for(wake.wait(), min(wait, MAX_WAIT_INTERVAL))
+                except asyncio.TimeoutError:
+                    pass
+                raise_if_cancelled()
+        except BaseException:
+            with self._cond:
+                self._dequeue(ticket)
+                self._notify()
+            raise
+
+    def release(
+        self,
+        ticket: Ticket,
+        used_tokens: int | None = None,
+        headers: dict | None = None,
+        rate_limited: bool = False,
+    ) -> None:
+        """
+        Frees the concurrency slot and feeds the outcome back into the buckets.
+
+        Parameters:
+        - used_tokens (int | None): The actual tokens of the request, to correct the estimate
+        - headers (dict | None): Response headers; x-ratelimit-* headers adjust the buckets
+        - rate_limited (bool): Whether the provider answered with a 429
+        """
+        with self._cond:
+            self.in_flight -= 1
+            if used_tokens is not None and self.tokens.enabled:
+                self.tokens.level -= used_tokens - ticket.tokens
+            if headers:
+                self._apply_headers(headers)
+            if rate_limited:
+                self.rate_limited += 1
+                retry_after = None
+                if headers:
+                    retry_after = _parse_duration(
+                        headers.get('retry-after') or headers.get('Retry-After')
+                    )
+                retry_after = retry_after or DEFAULT_RETRY_AFTER
+                self.blocked_until = max(
+                    self.blocked_until, time.monotonic() + retry_after
+                )
+                logger.warning(
+                    f'LLM endpoint rate limited, pausing requests for {retry_after:.1f}s'
+                )
+            self._notify()
+
+    def _apply_headers(self, headers: dict) -> None:
+        normalized = {
+            key.lower().removeprefix('llm_provider-'): value
+            for key, value in headers.items()
+        }
+        for name, bucket in (('requests', self.requests), ('tokens', self.tokens)):
+            limit = normalized.get(f'x-ratelimit-limit-{name}')
+            if limit is not None and not bucket.enabled:
+                # adopt the provider's limit when none is configured
+                try:
+                    bucket.rate_per_minute = float(limit)
+                    bucket.level = bucket.rate_per_minute
+                    bucket._last_refill = time.monotonic()
+                except ValueError:
+                    pass
+            remaining = normalized.get(f'x-ratelimit-remaining-{name}')
+            if remaining is not None and bucket.enabled:
+                try:
+                    bucket.level = min(bucket.level, float(remaining))
+                except ValueError:
+                    pass
+
+    def stats(self) -> dict:
+        with self._cond:
+            return {
+                'waiting': sum(len(queue) for queue in self._queues.values()),
+                'in_flight': self.in_flight,
+                'granted': self.granted,
+                'rate_limited': self.rate_limited,
+                'average_wait': self.total_wait / self.granted if self.granted else 0.0,
+                'requests_per_minute': self.requests.rate_per_minute,
+                'tokens_per_minute': self.tokens.rate_per_minute,
+            }
+
+
+class RateLimiter:
+    """
+    Process-wide registry of endpoint limiters, keyed by (model, base_url), so
+    all sessions talking to one endpoint share its limits.
+    """
+
+    def __init__(self):
+        self._limiters: dict[tuple, EndpointLimiter] = {}
+        self._lock = threading.Lock()
+
+    def get(
+        self,
+        model: str,
+        base_url: str | None,
+        requests_per_minute: int | None = None,
+        tokens_per_minute: int | None = None,
+        max_concurrent_requests: int | None = None,
+    ) -> EndpointLimiter:
+        key = (model, base_url)
+        with self._lock:
+            if key not in self._limiters:
+                self._limiters[key] = EndpointLimiter(
+                    requests_per_minute, tokens_per_minute, max_concurrent_requests
+                )
+            return self._limiters[key]
+
+    def stats(self) -> dict:
+        with self._lock:
+            limiters = dict(self._limiters)
+        return {
+            f'{model}@{base_url or "default"}': limiter.stats()
+            for (model, base_url), limiter in limiters.items()
+        }
+
+
+rate_limiter = RateLimiter()
@@ -0,0 +1,347 @@
+import asyncio
+import contextvars
+import threading
+import time
+from collections import deque
+from concurrent import futures
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Awaitable, Callable
+
+from easyweb.core.exceptions import AgentStepCancelledError
+from easyweb.core.logger import easyweb_logger as logger
+
+__all__ = ['Endpoint', 'EndpointRouter', 'get_endpoint_stats']
+
+# latency/error samples kept per endpoint
+WINDOW_SIZE = 200
+# samples needed before the p95 is trusted for hedging
+MIN_SAMPLES = 20
+
+hedge_executor = ThreadPoolExecutor(max_workers=32, thread_name_prefix='llm-hedge')
+
+
+@dataclass(frozen=True)
+class Endpoint:
+    model: str
+    base_url: str | None
+
+    @property
+    def params(self) -> dict:
+        return {'model': self.model, 'base_url': self.base_url}
+
+    def __str__(self):
+        return f'{self.model}@{self.base_url or "default"}'
+
+
+class EndpointStats:
+    """
+    Latency and error history of one endpoint, shared by all sessions.
+    """
+
+    def __init__(self):
+        self.latencies: deque[float] = deque(maxlen=WINDOW_SIZE)
+        self.errors: deque[bool] = deque(maxlen=WINDOW_SIZE)
+        self.consecutive_failures = 0
+        self.unhealthy_until = 0.0
+        self._lock = threading.Lock()
+
+    def record_success(self, latency: float) -> None:
+        with self._lock:
+            self.latencies.append(latency)
+            self.errors.append(False)
+            self.consecutive_failures = 0
+            self.unhealthy_until = 0.0
+
+    def record_failure(self, failover_after: int, cooldown: float) -> None:
+        with self._lock:
+            self.errors.append(True)
+            self.consecutive_failures += 1
+            if self.consecutive_failures >= failover_after:
+                self.unhealthy_until = time.monotonic() + cooldown
+
+    @property
+    def healthy(self) -> bool:
+        return time.monotonic() >= self.unhealthy_until
+
+    def percentile(self, q: float) -> float | None:
+        with self._lock:
+            if len(self.latencies) < MIN_SAMPLES:
+                return None
+            ordered = sorted(self.latencies)
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+    @property
+    def error_rate(self) -> float:
+        with self._lock:
+            if not self.errors:
+                return 0.0
+            return sum(self.errors) / len(self.errors)
+
+    def to_dict(self) -> dict:
+        return {
+            'samples': len(self.latencies),
+            'p50': self.percentile(0.5),
+            'p95': self.percentile(0.95),
+            'error_rate': self.error_rate,
+            'healthy': self.healthy,
+        }
+
+
+_endpoint_stats: dict[Endpoint, EndpointStats] = {}
+_endpoint_stats_lock = threading.Lock()
+
+
+def get_endpoint_stats(endpoint: Endpoint) -> EndpointStats:
+    with _endpoint_stats_lock:
+        if endpoint not in _endpoint_stats:
+            _endpoint_stats[endpoint] = EndpointStats()
+        return _endpoint_stats[endpoint]
+
+
+class EndpointRouter:
+    """
+    Routes the attempts of one LLM across equivalent endpoints.
+
+    The healthiest endpoint (the configured one first) gets the request. If it
+    has not answered within its own p95 latency, a hedged duplicate goes to the
+    next endpoint and the first answer wins; hedges are capped at
+    `hedge_budget` of all requests. Errors fail over to the next endpoint
+    immediately, and an endpoint failing `failover_after` times in a row is
+    skipped for `cooldown` seconds.
+    """
+
+    def __init__(
+        self,
+        endpoints: list[Endpoint],
+        hedge_budget: float = 0.1,
+        failover_after: int = 3,
+        cooldown: float = 30,
+    ):
+        self.endpoints = endpoints
+        self.hedge_budget = hedge_budget
+        self.failover_after = failover_after
+        self.cooldown = cooldown
+        self.requests = 0
+        self.hedges = 0
+        self.hedge_wins = 0
+        self.failovers = 0
+
+    def _ordered(self) -> list[Endpoint]:
+        # stable sort keeps the configured order among healthy endpoints
+        return sorted(
+            self.endpoints,
+            key=lambda endpoint: not get_endpoint_stats(endpoint).healthy,
+        )
+
+    def _hedge_delay(self, endpoint: Endpoint) -> float | None:
+        if self.hedge_budget <= 0 or len(self.endpoints) < 2:
+            return None
+        if self.hedges >= self.hedge_budget * max(self.requests, 1):
+            return None
+        return get_endpoint_stats(endpoint).percentile(0.95)
+
+    def _record(self, endpoint: Endpoint, start: float, error: Exception | None):
+        stats = get_endpoint_stats(endpoint)
+        if error is None:
+            stats.record_success(time.monotonic() - start)
+        elif not isinstance(error, AgentStepCancelledError):
+            stats.record_failure(self.failover_after, self.cooldown)
+
+    def call(
+        self,
+        attempt: Callable[[Endpoint], object],
+        on_discarded: Callable[[object], None] | None = None,
+    ):
+        """
+        Runs `attempt` against the endpoints and returns the first successful result.
+
+        Without a hedge to race against, the attempts (failovers included) run
+        on the calling thread; only hedged requests use `hedge_executor`.
+
+        Parameters:
+        - attempt: Sends the request to the given endpoint
+        - on_discarded: Called with the result of a losing hedge, e.g. to account its cost
+        """
+        self.requests += 1
+        candidates = self._ordered()
+        primary = candidates.pop(0)
+        if not candidates or self._hedge_delay(primary) is None:
+            return self._call_inline(primary, candidates, attempt)
+        pending: dict[futures.Future, Endpoint] = {}
+        last_error: Exception | None = None
+
+        def submit(endpoint: Endpoint):
+            start = time.monotonic()
+            # run in a copy of our context: cancellation token, trace
+            ctx = contextvars.copy_context()
+
+            def run():
+                try:
+                    result = attempt(endpoint)
+                except Exception as e:
+                    self._record(endpoint, start, e)
+                    raise
+                self._record(endpoint, start, None)
+                return result
+
+            pending[hedge_executor.submit(ctx.run, run)] = endpoint
+
+        submit(primary)
+        hedged = False
+        while pending:
+            timeout = None
+            if not hedged and candidates:
+                timeout = self._hedge_delay(next(iter(pending.values())))
+            done, _ = futures.wait(
+                pending, timeout=timeout, return_when=futures.FIRST_COMPLETED
+            )
+            if not done:
+                # the endpoint is slower than its p95: hedge
+                hedged = True
+                self.hedges += 1
+                endpoint = candidates.pop(0)
+                logger.debug(f'Hedging LLM request to {endpoint}')
+                submit(endpoint)
+                continue
+            for future in done:
+                endpoint = pending.pop(future)
+                error = future.exception()
+                if error is None:
+                    if hedged and endpoint != primary:
+                        self.hedge_wins += 1
+                    # losers keep running in their thread; still pay for them
+                    self._discard(pending, on_discarded)
+                    return future.result()
+                if isinstance(error, AgentStepCancelledError):
+                    raise error
+                last_error = error
+                if not pending and candidates:
+                    self.failovers += 1
+                    next_endpoint = candidates.pop(0)
+                    logger.warning(
+                        f'LLM endpoint {endpoint} failed ({error}), failing over to {next_endpoint}'
+                    )
+                    submit(next_endpoint)
+        assert last_error is not None
+        raise last_error
+
+    def _call_inline(
+        self,
+        endpoint: Endpoint,
+        candidates: list[Endpoint],
+        attempt: Callable[[Endpoint], object],
+    ):
+        while True:
+            start = time.monotonic()
+            try:
+                result = attempt(endpoint)
+            except Exception as e:
+                self._record(endpoint, start, e)
+                if isinstance(e, AgentStepCancelledError) or not candidates:
+                    raise
+                self.failovers += 1
+                next_endpoint = candidates.pop(0)
+                logger.warning(
+                    f'LLM endpoint {endpoint} failed ({e}), failing over to {next_endpoint}'
+                )
+                endpoint = next_endpoint
+                continue
+            self._record(endpoint, start, None)
+            return result
+
+    def _discard(self, pending: dict, on_discarded: Callable | None) -> None:
+        for future in pending:
+
+            def account(f: futures.Future):
+                if on_discarded is not None and f.exception() is None:
+                    on_discarded(f.result())
+
+            future.add_done_callback(account)
+
+    async def acall(
+        self,
+        attempt: Callable[[Endpoint], Awaitable],
+        on_discarded: Callable[[object], None] | None = None,
+    ):
+        """
+        Async version of `call`. Losing hedges are cancelled instead of left running.
+        """
+        self.requests += 1
+        candidates = self._ordered()
+        pending: dict[asyncio.Task, Endpoint] = {}
+        last_error: Exception | None = None
+
+        def submit(endpoint: Endpoint):
+            start = time.monotonic()
+
+            async def run():
+                try:
+                    result = await attempt(endpoint)
+                except Exception as e:
+                    self._record(endpoint, start, e)
+                    raise
+                self._record(endpoint, start, None)
+                return result
+
+            pending[asyncio.ensure_future(run())] = endpoint
+
+        primary = candidates.pop(0)
+        submit(primary)
+        hedged = False
+        try:
+            while pending:
+                timeout = None
+                if not hedged and candidates:
+                    timeout = self._hedge_delay(next(iter(pending.values())))
+                done, _ = await asyncio.wait(
+                    pending, timeout=timeout, return_when=asyncio.FIRST_COMPLETED
+                )
+                if not done:
+                    hedged = True
+                    self.hedges += 1
+                    endpoint = candidates.pop(0)
+                    logger.debug(f'Hedging LLM request to {endpoint}')
+                    submit(endpoint)
+                    continue
+                for task in done:
+                    endpoint = pending.pop(task)
+                    error = task.exception()
+                    if error is None:
+                        if hedged and endpoint != primary:
+                            self.hedge_wins += 1
+                        return task.result()
+                    if isinstance(error, AgentStepCancelledError):
+                        raise error
+                    last_error = error  # type: ignore[assignment]
+                    if not pending and candidates:
+                        self.failovers += 1
+                        next_endpoint = candidates.pop(0)
+                        logger.warning(
+                            f'LLM endpoint {endpoint} failed ({error}), failing over to {next_endpoint}'
+                        )
+                        submit(next_endpoint)
+        finally:
+            for task in pending:
+                if not task.done():
+                    task.cancel()
+                elif (
+                    on_discarded is not None
+                    and not task.cancelled()
+                    and task.exception() is None
+                ):
+                    on_discarded(task.result())
+        assert last_error is not None
+        raise last_error
+
+    def stats(self) -> dict:
+        return {
+            'requests': self.requests,
+            'hedges': self.hedges,
+            'hedge_wins': self.hedge_wins,
+            'failovers': self.failovers,
+            'endpoints': {
+                str(endpoint): get_endpoint_stats(endpoint).to_dict()
+                for endpoint in self.endpoints
+            },
+        }
@@ -0,0 +1,81 @@
+import time
+from typing import Callable
+
+__all__ = ['StreamCollector', 'close_stream', 'aclose_stream']
+
+
+class StreamCollector:
+    """
+    Accumulates the chunks of a streamed completion.
+
+    After every chunk the text generated so far is passed to `on_partial`, and
+    `is_complete` decides whether it already holds a complete action, in which
+    case the caller closes the stream instead of waiting for the model to finish.
+    """
+
+    def __init__(
+        self,
+        on_partial: Callable[[str], None] | None = None,
+        is_complete: Callable[[str], bool] | None = None,
+    ):
+        self.on_partial = on_partial
+        self.is_complete = is_complete
+        self.chunks: list = []
+        self.text = ''
+        self.start = time.time()
+        self.first_token_latency: float | None = None
+        self.time_to_action: float | None = None
+        self.stopped_early = False
+
+    def add(self, chunk) -> bool:
+        """
+        Adds a chunk. Returns True if generation can stop here.
+        """
+        self.chunks.append(chunk)
+        delta = chunk.choices[0].delta.content if chunk.choices else None
+        if not delta:
+            return False
+        if self.first_token_latency is None:
+            self.first_token_latency = time.time() - self.start
+        self.text += delta
+        if self.on_partial is not None:
+            self.on_partial(self.text)
+        if self.is_complete is not None and self.is_complete(self.text):
+            self.time_to_action = time.time() - self.start
+            self.stopped_early = True
+            return True
+        return False
+
+    def finish(self) -> None:
+        if self.time_to_action is None:
+            self.time_to_action = time.time() - self.start
+
+
+def close_stream(stream) -> None:
+    """
+    Closes the underlying HTTP stream, so the provider stops generating.
+    """
+    completion_stream = getattr(stream, 'completion_stream', None)
+    close = getattr(completion_stream, 'close', None)
+    if close is not None:
+        try:
+            close()
+        except Exception:
+            pass
+
+
+async def aclose_stream(stream) -> None:
+    """
+    Async version of `close_stream`.
+    """
+    completion_stream = getattr(stream, 'completion_stream', None)
+    close = getattr(completion_stream, 'aclose', None) or getattr(
+        completion_stream, 'close', None
+    )
+    if close is not None:
+        try:
+            result = close()
+            if hasattr(result, '__await__'):
+                await result
+        except Exception:
+            pass
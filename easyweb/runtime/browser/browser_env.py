@@ -16,8 +16,10 @@ import numpy as np
 from browsergym.utils.obs import flatten_dom_to_str
 from PIL import Image
 
+from easyweb.core.cancellation import get_current_token
 from easyweb.core.exceptions import BrowserInitException
 from easyweb.core.logger import easyweb_logger as logger
+from easyweb.core.tracing import record_span, span
 
 
 class BrowserEnv:
@@ -46,6 +48,8 @@ class BrowserEnv:
         multiprocessing.set_start_method('spawn', force=True)
         self.browser_queue = multiprocessing.Queue()
         self.agent_queue = multiprocessing.Queue()
+        # one request at a time: a response is only read by the caller waiting on it
+        self._request_lock = threading.Lock()
         self.process = multiprocessing.Process(
             target=self.browser_process,
         )
@@ -109,8 +113,19 @@ class BrowserEnv:
                     elif unique_request_id == 'IS_ALIVE':
                         self.agent_queue.put(('ALIVE', None))
                         continue
+                    if 'snapshot' in action_data:
+                        self.agent_queue.put(
+                            (unique_request_id, self._snapshot_pages(env))
+                        )
+                        continue
+                    if 'restore' in action_data:
+                        self._restore_pages(env, action_data['restore'])
+                        self.agent_queue.put((unique_request_id, {}))
+                        continue
                     action = action_data['action']
+                    env_step_start = time.time()
                     obs, reward, terminated, truncated, info = env.step(action)
+                    env_step_end = time.time()
 
                     def get_scroll_position(page):
                         return page.evaluate("""() => {
@@ -141,8 +156,14 @@ class BrowserEnv:
                         ) as f:
                             f.write(json.dumps(rewards))
                     # add text content of the page
+                    html2text_start = time.time()
                     html_str = flatten_dom_to_str(obs['dom_object'])
                     obs['text_content'] = self.html_text_converter.handle(html_str)
+                    # wall-clock timings let the agent side record these as trace spans
+                    obs['timings'] = {
+                        'browser.env_step': (env_step_start, env_step_end),
+                        'browser.html2text': (html2text_start, time.time()),
+                    }
                     # make observation serializable
                     obs['screenshot'] = self.image_to_jpg_base64_url(obs['screenshot'])
                     obs['active_page_index'] = obs['active_page_index'].item()
@@ -169,28 +190,102 @@ class BrowserEnv:
                     pass
                 return
 
+    @staticmethod
+    def _snapshot_pages(env) -> dict:
+        context = env.unwrapped.context
+        pages = context.pages
+        active_page = env.unwrapped.page
+        return {
+            'urls': [page.url for page in pages],
+            'active_page_index': pages.index(active_page)
+            if active_page in pages
+            else 0,
+            # cookies and localStorage of every origin
+            'storage_state': context.storage_state(),
+        }
+
+    @staticmethod
+    def _restore_pages(env, snapshot: dict):
+        context = env.unwrapped.context
+        page = env.unwrapped.page
+        storage_state = snapshot.get('storage_state') or {}
+        if storage_state.get('cookies'):
+            context.add_cookies(storage_state['cookies'])
+        # localStorage can only be written from a page of its origin
+        for origin in storage_state.get('origins', []):
+            try:
+                page.goto(origin['origin'])
+                page.evaluate(
+                    'items => items.forEach(item => localStorage.setItem(item.name, item.value))',
+                    origin.get('localStorage', []),
+                )
+            except Exception as e:
+                logger.warning(f'Failed to restore localStorage of {origin}: {e}')
+        urls = snapshot.get('urls') or []
+        if urls:
+            index = snapshot.get('active_page_index', 0)
+            page.goto(urls[index] if 0 <= index < len(urls) else urls[-1])
+
+    def snapshot(self, timeout: float = 30) -> dict:
+        """
+        Gets the open pages and the cookies and localStorage of the browser, to
+        `restore` them in a new browser.
+        """
+        return self._request({'snapshot': True}, timeout)
+
+    def restore(self, snapshot: dict, timeout: float = 60) -> None:
+        """
+        Restores the cookies and localStorage of a `snapshot`, and reopens its active page.
+        """
+        self._request({'restore': snapshot}, timeout)
+
     def step(self, action_str: str, timeout: float = 30) -> dict:
+        with span('browser.step'):
+            obs = self._step(action_str, timeout)
+        for name, (start, end) in obs.pop('timings', {}).items():
+            record_span(name, start, end)
+        return obs
+
+    def _step(self, action_str: str, timeout: float) -> dict:
+        return self._request({'action': action_str}, timeout)
+
+    def _request(self, action_data: dict, timeout: float) -> dict:
         unique_request_id = str(uuid.uuid4())
-        self.browser_queue.put((unique_request_id, {'action': action_str}))
+        # stop waiting on the browser process if the agent step is cancelled;
+        # a late response is discarded by the request id check below
+        cancel_token = get_current_token()
         start_time = time.time()
-        while True:
-            if time.time() - start_time > timeout:
-                raise TimeoutError('Browser environment took too long to respond.')
-            if not self.agent_queue.empty():
-                response_id, obs = self.agent_queue.get()
-                if response_id == unique_request_id:
-                    return obs
+        if not self._request_lock.acquire(timeout=timeout):
+            raise TimeoutError('Browser environment took too long to respond.')
+        try:
+            self.browser_queue.put((unique_request_id, action_data))
+            while True:
+                if time.time() - start_time > timeout:
+                    raise TimeoutError('Browser environment took too long to respond.')
+                if cancel_token is not None:
+                    cancel_token.raise_if_cancelled()
+                if not self.agent_queue.empty():
+                    response_id, obs = self.agent_queue.get()
+                    if response_id == unique_request_id:
+                        return obs
+        finally:
+            self._request_lock.release()
 
     def check_alive(self, timeout: float = 60):
-        self.browser_queue.put(('IS_ALIVE', None))
         start_time = time.time()
-        while time.time() - start_time < timeout:
-            if not self.agent_queue.empty():
-                response_id, _ = self.agent_queue.get()
-                if response_id == 'ALIVE':
-                    return True
-                logger.info(f'Browser env is not alive. Response ID: {response_id}')
-        return False
+        if not self._request_lock.acquire(timeout=timeout):
+            return False
+        try:
+            self.browser_queue.put(('IS_ALIVE', None))
+            while time.time() - start_time < timeout:
+                if not self.agent_queue.empty():
+                    response_id, _ = self.agent_queue.get()
+                    if response_id == 'ALIVE':
+                        return True
+                    logger.info(f'Browser env is not alive. Response ID: {response_id}')
+            return False
+        finally:
+            self._request_lock.release()
 
     def close(self):
         if not self.process.is_alive():
@@ -2,9 +2,11 @@ import asyncio
 from abc import abstractmethod
 from typing import Any, Optional
 
+from easyweb.core.cancellation import use_token
 from easyweb.core.config import config
-from easyweb.core.exceptions import BrowserInitException
+from easyweb.core.exceptions import AgentStepCancelledError, BrowserInitException
 from easyweb.core.logger import easyweb_logger as logger
+from easyweb.core.tracing import span
 from easyweb.events import EventSource, EventStream, EventStreamSubscriber
 from easyweb.events.action import (
     Action,
@@ -82,11 +84,20 @@ class Runtime:
         self._bg_task = asyncio.create_task(self._start_background_observation_loop())
 
     def close(self):
+        self.detach()
+        self.release()
+
+    def detach(self):
+        """Stops handling the events of the session; runs on the event loop."""
+        self._bg_task.cancel()
+        self.event_stream.unsubscribe(EventStreamSubscriber.RUNTIME)
+
+    def release(self):
+        """Stops the sandbox and the browser; blocks, so it may run in an executor."""
         if not self._is_external_sandbox:
             self.sandbox.close()
         if self.browser is not None:
             self.browser.close()
-        self._bg_task.cancel()
 
     def init_sandbox_plugins(self, plugins: list[PluginRequirement]) -> None:
         self.sandbox.init_plugins(plugins)
@@ -111,8 +122,18 @@ class Runtime:
 
     async def on_event(self, event: Event) -> None:
         if isinstance(event, Action):
-            observation = await self.run_action(event)
+            try:
+                # a stop of the agent step interrupts the action, and only the action
+                with use_token(event.cancel_token), span(
+                    'runtime.run_action', action=event.__class__.__name__
+                ):
+                    observation = await self.run_action(event)
+            except AgentStepCancelledError:
+                # the controller drops the interrupted action; no observation follows
+                return
             observation._cause = event.id  # type: ignore[attr-defined]
+            if event.trace_id is not None:
+                observation._trace_id = event.trace_id  # type: ignore[attr-defined]
             source = event.source if event.source else EventSource.AGENT
             await self.event_stream.add_event(observation, source)
 
@@ -1,6 +1,8 @@
+import asyncio
+import contextvars
 import os
 
-from easyweb.core.exceptions import BrowserUnavailableException
+from easyweb.core.exceptions import AgentStepCancelledError, BrowserUnavailableException
 from easyweb.core.schema import ActionType
 from easyweb.events.observation import BrowserOutputObservation
 from easyweb.runtime.browser.browser_env import BrowserEnv
@@ -23,7 +25,12 @@ async def browse(action, browser: BrowserEnv | None) -> BrowserOutputObservation
         raise ValueError(f'Invalid action type: {action.action}')
     try:
         # obs provided by BrowserGym: see https://github.com/ServiceNow/BrowserGym/blob/main/core/src/browsergym/core/env.py#L396
-        obs = browser.step(action_str)
+        # off the event loop, with the step's cancellation token, so a stop
+        # request can interrupt the wait on the browser process
+        loop = asyncio.get_running_loop()
+        obs = await loop.run_in_executor(
+            None, contextvars.copy_context().run, browser.step, action_str
+        )
         return BrowserOutputObservation(
             content=obs['text_content'],  # text content of the page
             open_pages_urls=obs['open_pages_urls'],  # list of open pages
@@ -43,6 +50,8 @@ async def browse(action, browser: BrowserEnv | None) -> BrowserOutputObservation
             ],  # last browser env action error
             scroll_position=obs['scroll_position'],
         )
+    except AgentStepCancelledError:
+        raise
     except Exception as e:
         return BrowserOutputObservation(
             content=str(e),
@@ -0,0 +1,145 @@
+import os
+import threading
+import time
+from dataclasses import dataclass
+
+from easyweb.core.config import config
+from easyweb.core.exceptions import SessionCapacityError
+from easyweb.core.logger import easyweb_logger as logger
+
+__all__ = ['HostSample', 'AdmissionController', 'sample_host']
+
+# host samples are reused for this long, admission must stay cheap under bursts
+SAMPLE_TTL = 1.0
+
+
+@dataclass
+class HostSample:
+    """
+    Memory and CPU headroom of the host.
+
+    Attributes:
+        free_memory_mb: The memory available to new processes, None where it cannot be read.
+        cpu_load: The 1-minute load average per core, None where it cannot be read.
+    """
+
+    free_memory_mb: float | None
+    cpu_load: float | None
+
+
+def _free_memory_mb() -> float | None:
+    # MemAvailable accounts for reclaimable caches, unlike MemFree
+    try:
+        with open('/proc/meminfo') as f:
+            for line in f:
+                if line.startswith('MemAvailable:'):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return None
+
+
+def sample_host() -> HostSample:
+    cpu_load = None
+    if hasattr(os, 'getloadavg'):
+        cpu_load = os.getloadavg()[0] / (os.cpu_count() or 1)
+    return HostSample(_free_memory_mb(), cpu_load)
+
+
+class AdmissionController:
+    """
+    Decides whether the server takes on another session.
+
+    Every session holds a browser process, a controller task and possibly a
+    sandbox, so sessions are admitted only while below `max_sessions` and
+    `max_browsers` and while the host keeps `min_free_memory_mb` of memory and
+    stays below `max_cpu_load`. A limit of 0 disables it.
+    """
+
+    def __init__(
+        self,
+        max_sessions: int = 0,
+        max_browsers: int = 0,
+        min_free_memory_mb: int = 0,
+        max_cpu_load: float = 0.0,
+        retry_after: int = 30,
+    ):
+        self.max_sessions = max_sessions
+        self.max_browsers = max_browsers
+        self.min_free_memory_mb = min_free_memory_mb
+        self.max_cpu_load = max_cpu_load
+        self.retry_after = retry_after
+        self.admitted = 0
+        self.rejected = 0
+        self._sample: HostSample | None = None
+        self._sampled_at = 0.0
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_config(cls) -> 'AdmissionController':
+        return cls(
+            max_sessions=config.max_sessions,
+            max_browsers=config.max_browsers,
+            min_free_memory_mb=config.min_free_memory_mb,
+            max_cpu_load=config.max_cpu_load,
+            retry_after=config.admission_retry_after,
+        )
+
+    def host(self) -> HostSample:
+        with self._lock:
+            now = time.monotonic()
+            if self._sample is None or now - self._sampled_at > SAMPLE_TTL:
+                self._sample = sample_host()
+                self._sampled_at = now
+            return self._sample
+
+    def _rejection(self, sessions: int, browsers: int) -> str | None:
+        if self.max_sessions and sessions >= self.max_sessions:
+            return f'{sessions} of {self.max_sessions} sessions in use'
+        if self.max_browsers and browsers >= self.max_browsers:
+            return f'{browsers} of {self.max_browsers} browsers in use'
+        host = self.host()
+        if (
+            self.min_free_memory_mb
+            and host.free_memory_mb is not None
+            and host.free_memory_mb < self.min_free_memory_mb
+        ):
+            return f'only {host.free_memory_mb:.0f} MB of memory free'
+        if (
+            self.max_cpu_load
+            and host.cpu_load is not None
+            and host.cpu_load > self.max_cpu_load
+        ):
+            return f'CPU load {host.cpu_load:.2f} per core'
+        return None
+
+    def admit(self, sessions: int, browsers: int) -> None:
+        """
+        Admits a new session or raises SessionCapacityError.
+
+        Parameters:
+        - sessions: The sessions currently held
+        - browsers: The browser processes currently running
+        """
+        reason = self._rejection(sessions, browsers)
+        if reason is not None:
+            self.rejected += 1
+            logger.warning(f'Rejecting new session: {reason}')
+            raise SessionCapacityError(reason, self.retry_after)
+        self.admitted += 1
+
+    def gauges(self, sessions: int, browsers: int) -> dict:
+        host = self.host()
+        return {
+            'sessions': sessions,
+            'max_sessions': self.max_sessions,
+            'browsers': browsers,
+            'max_browsers': self.max_browsers,
+            'free_memory_mb': host.free_memory_mb,
+            'min_free_memory_mb': self.min_free_memory_mb,
+            'cpu_load': host.cpu_load,
+            'max_cpu_load': self.max_cpu_load,
+            'admitting': self._rejection(sessions, browsers) is None,
+            'admitted': self.admitted,
+            'rejected': self.rejected,
+        }
@@ -0,0 +1,144 @@
+import base64
+from dataclasses import dataclass, field
+
+from easyweb.events.action import ChangeAgentStateAction, NullAction
+from easyweb.events.event import Event
+from easyweb.events.observation import (
+    AgentStateChangedObservation,
+    AgentThoughtObservation,
+    BrowserOutputObservation,
+    NullObservation,
+)
+from easyweb.events.serialization import event_to_dict
+from easyweb.events.stream import EventStream
+
+__all__ = [
+    'EventPage',
+    'is_replayed',
+    'to_client_dict',
+    'page_events',
+    'latest_screenshot',
+    'decode_screenshot',
+]
+
+MAX_PAGE_SIZE = 200
+# how far back a snapshot looks for the latest screenshot
+SCREENSHOT_SCAN_LIMIT = 500
+# browser extras that are too large to page through; fetched on demand instead
+HEAVY_EXTRAS = ('screenshot', 'dom_object', 'axtree_object', 'extra_element_properties')
+
+
+def is_replayed(event: Event) -> bool:
+    if isinstance(event, (NullAction, NullObservation)):
+        return False
+    if isinstance(event, (ChangeAgentStateAction, AgentStateChangedObservation)):
+        return False
+    # only useful while the step is running
+    return not isinstance(event, AgentThoughtObservation)
+
+
+def screenshot_ref(event_id: int) -> str:
+    return f'/api/events/{event_id}/screenshot'
+
+
+def to_client_dict(event: Event, full: bool = False) -> dict:
+    """
+    Serializes an event for the client.
+
+    Unless `full`, the heavy browser extras are dropped and a screenshot is
+    replaced by `screenshot_ref`, the URL to fetch it from.
+    """
+    data = event_to_dict(event)
+    extras = data.get('extras')
+    if full or not extras:
+        return data
+    if extras.get('screenshot'):
+        data['screenshot_ref'] = screenshot_ref(event.id)
+    for key in HEAVY_EXTRAS:
+        extras.pop(key, None)
+    return data
+
+
+@dataclass
+class EventPage:
+    """
+    A page of the session history.
+
+    Attributes:
+        events: The events, oldest first.
+        after: The cursor for the next, newer page.
+        before: The cursor for the previous, older page.
+        has_more: Whether there are events past this page in the direction paged.
+    """
+
+    events: list[dict] = field(default_factory=list)
+    after: int = -1
+    before: int = 0
+    has_more: bool = False
+
+
+def page_events(
+    stream: EventStream,
+    after: int | None = None,
+    before: int | None = None,
+    limit: int = 50,
+    full: bool = False,
+) -> EventPage:
+    """
+    Gets up to `limit` replayed events after the `after` cursor, or before the
+    `before` cursor to backfill older history.
+
+    The cursors are event ids; the ones returned skip over the events that are
+    not replayed, so the next page does not read them again.
+    """
+    limit = max(1, min(limit, MAX_PAGE_SIZE))
+    page = EventPage()
+    if before is not None:
+        page.before = before
+        page.after = before - 1
+        for event in stream.get_events(end_id=before - 1, reverse=True):
+            page.before = event.id
+            if is_replayed(event):
+                page.events.append(to_client_dict(event, full))
+                if len(page.events) == limit:
+                    break
+        page.events.reverse()
+        page.has_more = page.before > 0
+        return page
+
+    page.after = -1 if after is None else after
+    page.before = page.after + 1
+    for event in stream.get_events(start_id=page.after + 1):
+        page.after = event.id
+        if is_replayed(event):
+            page.events.append(to_client_dict(event, full))
+            if len(page.events) == limit:
+                break
+    page.has_more = page.after < stream.latest_id
+    return page
+
+
+def latest_screenshot(stream: EventStream) -> dict | None:
+    """
+    Gets a reference to the latest screenshot of the session, if any.
+    """
+    for scanned, event in enumerate(stream.get_events(reverse=True)):
+        if scanned == SCREENSHOT_SCAN_LIMIT:
+            break
+        if isinstance(event, BrowserOutputObservation) and event.screenshot:
+            return {'id': event.id, 'url': event.url, 'ref': screenshot_ref(event.id)}
+    return None
+
+
+def decode_screenshot(screenshot: str) -> tuple[bytes, str]:
+    """
+    Decodes a screenshot, either a data URL or plain base64 PNG.
+
+    Returns:
+    - tuple[bytes, str]: The image and its media type
+    """
+    media_type = 'image/png'
+    if screenshot.startswith('data:'):
+        header, _, screenshot = screenshot.partition(',')
+        media_type = header[len('data:') :].split(';')[0] or media_type
+    return base64.b64decode(screenshot), media_type
@@ -1,28 +1,34 @@
+import hmac
 import uuid
 import warnings
-
-from easyweb.server.data_models.feedback import FeedbackDataModel, store_feedback
-
-with warnings.catch_warnings():
-    warnings.simplefilter('ignore')
-    import litellm
 from pathlib import Path
 
 from fastapi import FastAPI, Request, Response, UploadFile, WebSocket, status
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, PlainTextResponse
 from fastapi.security import HTTPBearer
 
 import agenthub  # noqa F401 (we import this to get the agents registered)
 from easyweb.controller.agent import Agent
 from easyweb.core.config import config
+from easyweb.core.exceptions import SessionCapacityError, UploadTooLargeError
 from easyweb.core.logger import easyweb_logger as logger
-from easyweb.events.action import ChangeAgentStateAction, NullAction
-from easyweb.events.observation import AgentStateChangedObservation, NullObservation
+from easyweb.core.metrics import llm_stats
+from easyweb.core.prometheus import registry as metrics_registry
+from easyweb.events.observation import BrowserOutputObservation
 from easyweb.events.serialization import event_to_dict
-from easyweb.llm import bedrock
 from easyweb.server.auth import get_sid_from_token, sign_token
+from easyweb.server.data_models.feedback import FeedbackDataModel, store_feedback
+from easyweb.server.history import (
+    decode_screenshot,
+    is_replayed,
+    latest_screenshot,
+    page_events,
+)
+from easyweb.server.metrics import register_collectors
+from easyweb.server.options import CachedOptions
 from easyweb.server.session import session_manager
+from easyweb.server.upload import stream_upload
 
 app = FastAPI()
 app.add_middleware(
@@ -34,6 +40,12 @@ app.add_middleware(
 )
 
 security_scheme = HTTPBearer()
+register_collectors(session_manager)
+
+
+@app.on_event('shutdown')
+async def unregister_worker():
+    session_manager.shutdown()
 
 
 @app.middleware('http')
@@ -138,6 +150,10 @@ async def websocket_endpoint(websocket: WebSocket):
         ```json
         {"action": "finish", "args": {}}
         ```
+
+    On connecting, the events after `latest_event_id` are replayed. Clients with
+    a long history should pass `replay=false` instead, render GET /api/snapshot
+    and backfill with GET /api/events.
     """
     await websocket.accept()
 
@@ -154,36 +170,120 @@ async def websocket_endpoint(websocket: WebSocket):
         sid = str(uuid.uuid4())
         token = sign_token({'sid': sid})
 
-    session = session_manager.add_or_restart_session(sid, websocket)
+    try:
+        session = await session_manager.add_or_restart_session(sid, websocket)
+    except SessionCapacityError as e:
+        await websocket.send_json(
+            {'error': str(e), 'error_code': 503, 'retry_after': e.retry_after}
+        )
+        # 1013: try again later
+        await websocket.close(code=1013)
+        return
     await websocket.send_json({'token': token, 'status': 'ok'})
 
     latest_event_id = -1
     if websocket.query_params.get('latest_event_id'):
         latest_event_id = int(websocket.query_params.get('latest_event_id'))
-    for event in session.agent_session.event_stream.get_events(
-        start_id=latest_event_id + 1
-    ):
-        if isinstance(event, NullAction) or isinstance(event, NullObservation):
-            continue
-        if isinstance(event, ChangeAgentStateAction) or isinstance(
-            event, AgentStateChangedObservation
+    if websocket.query_params.get('replay', 'true').lower() != 'false':
+        for event in session.agent_session.event_stream.get_events(
+            start_id=latest_event_id + 1
         ):
-            continue
-        await websocket.send_json(event_to_dict(event))
+            if is_replayed(event):
+                await websocket.send_json(event_to_dict(event))
 
     await session.loop_recv()
 
 
-@app.get('/api/options/models')
-async def get_litellm_models():
+@app.get('/health')
+async def health():
     """
-    Get all models supported by LiteLLM.
+    Get the load and capacity gauges of this backend, for the frontend to
+    pick the least-loaded one.
 
-    To get the models:
+    To check the backend:
     ```sh
-    curl http://localhost:3000/api/litellm-models
+    curl http://localhost:3000/health
+    ```
+    """
+    return {
+        'status': 'ok',
+        'capacity': config.max_sessions or 1,
+        **session_manager.capacity(),
+    }
+
+
+def _is_local(request: Request) -> bool:
+    return request.client is not None and request.client.host in (
+        '127.0.0.1',
+        '::1',
+        'localhost',
+    )
+
+
+def _is_admin(request: Request) -> bool:
+    # behind a proxy every peer is local, so the address alone proves nothing
+    if not config.admin_token or not _is_local(request):
+        return False
+    auth_token = request.headers.get('Authorization', '')
+    if 'Bearer' in auth_token:
+        auth_token = auth_token.split('Bearer')[1].strip()
+    return hmac.compare_digest(auth_token.encode(), config.admin_token.encode())
+
+
+@app.post('/admin/drain')
+async def drain(request: Request, deadline: float | None = None):
+    """
+    Drain this backend before a restart: refuse new sessions, let running
+    steps finish (up to `deadline` seconds, `drain_timeout` by default),
+    checkpoint all sessions and tell their clients to reconnect elsewhere.
+    Only accepted from the local host, with the `admin_token` of the config.
+
+    To drain the backend before restarting it:
+    ```sh
+    curl -X POST -H 'Authorization: Bearer <admin_token>' 'http://localhost:3000/admin/drain?deadline=60'
     ```
     """
+    if not _is_admin(request):
+        return JSONResponse(
+            status_code=status.HTTP_403_FORBIDDEN,
+            content={
+                'error': 'Drain needs the admin token and is only accepted from the local host'
+            },
+        )
+    if session_manager.draining:
+        return JSONResponse(
+            status_code=status.HTTP_409_CONFLICT,
+            content={
+                'error': 'Already draining',
+                'report': session_manager.drain_report,
+            },
+        )
+    return await session_manager.drain(deadline)
+
+
+@app.get('/metrics')
+async def metrics():
+    """
+    Get the metrics of this backend in the Prometheus text format.
+
+    To scrape the metrics:
+    ```sh
+    curl http://localhost:3000/metrics
+    ```
+    """
+    return PlainTextResponse(
+        metrics_registry.render(), media_type='text/plain; version=0.0.4'
+    )
+
+
+def list_models() -> list[str]:
+    # imported on first use: litellm and boto3 take seconds to import
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore')
+        import litellm
+
+    from easyweb.llm import bedrock
+
     litellm_model_list = litellm.model_list + list(litellm.model_cost.keys())
     litellm_model_list_without_bedrock = bedrock.remove_error_modelId(
         litellm_model_list
@@ -194,8 +294,39 @@ async def get_litellm_models():
     return list(sorted(set(model_list)))
 
 
+model_options = CachedOptions('model', list_models, config.options_cache_ttl)
+agent_options = CachedOptions(
+    'agent', lambda: sorted(Agent.list_agents()), config.options_cache_ttl
+)
+default_options = CachedOptions(
+    'default', lambda: config.defaults_dict, config.options_cache_ttl
+)
+
+
+@app.on_event('startup')
+async def warm_options():
+    # the model list takes seconds to build; have it ready for the first page load
+    model_options.refresh_in_background()
+
+
+@app.get('/api/options/models')
+async def get_litellm_models(request: Request):
+    """
+    Get all models supported by LiteLLM.
+
+    The list is cached and rebuilt in the background every `options_cache_ttl`
+    seconds; send the ETag back in If-None-Match to get a 304 if unchanged.
+
+    To get the models:
+    ```sh
+    curl http://localhost:3000/api/litellm-models
+    ```
+    """
+    return await model_options.response(request)
+
+
 @app.get('/api/options/agents')
-async def get_agents():
+async def get_agents(request: Request):
     """
     Get all agents supported by LiteLLM.
 
@@ -204,8 +335,7 @@ async def get_agents():
     curl http://localhost:3000/api/agents
     ```
     """
-    agents = sorted(Agent.list_agents())
-    return agents
+    return await agent_options.response(request)
 
 
 @app.get('/api/list-files')
@@ -218,7 +348,7 @@ def list_files(request: Request, path: str = '/'):
     curl http://localhost:3000/api/list-files
     ```
     """
-    if not request.state.session.agent_session.runtime:
+    if request.state.session.agent_session.file_store is None:
         return JSONResponse(
             status_code=status.HTTP_404_NOT_FOUND,
             content={'error': 'Runtime not yet initialized'},
@@ -249,7 +379,7 @@ def list_files(request: Request, path: str = '/'):
     )
 
     try:
-        entries = request.state.session.agent_session.runtime.file_store.list(path)
+        entries = request.state.session.agent_session.file_store.list(path)
 
         # Filter entries, excluding special folders
         if entries:
@@ -279,7 +409,7 @@ def select_file(file: str, request: Request):
     ```
     """
     try:
-        content = request.state.session.agent_session.runtime.file_store.read(file)
+        content = request.state.session.agent_session.file_store.read(file)
     except Exception as e:
         logger.error(f'Error opening file {file}: {e}', exc_info=False)
         error_msg = f'Error opening file: {e}'
@@ -295,22 +425,38 @@ async def upload_file(request: Request, files: list[UploadFile]):
     """
     Upload files to the workspace.
 
+    Files are streamed to the file store in chunks, each up to
+    `max_upload_bytes`; the progress is sent to the client over the websocket
+    as {"upload": {"filename", "bytes", "total"}} messages.
+
     To upload files:
     ```sh
     curl -X POST -F "file=@<file_path1>" -F "file=@<file_path2>" http://localhost:3000/api/upload-files
     ```
     """
+    session = request.state.session
+
+    async def report_progress(progress: dict):
+        await session.send({'upload': progress})
+
     try:
         for file in files:
-            file_contents = await file.read()
-            request.state.session.agent_session.runtime.file_store.write(
-                file.filename, file_contents
+            await stream_upload(
+                file,
+                session.agent_session.file_store,
+                config.max_upload_bytes,
+                report_progress,
             )
+    except UploadTooLargeError as e:
+        return JSONResponse(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            content={'error': str(e)},
+        )
     except Exception as e:
         logger.error(f'Error saving files: {e}', exc_info=True)
         return JSONResponse(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            content={'error': f'Error saving file:s {e}'},
+            content={'error': f'Error saving files: {e}'},
         )
     return {'message': 'Files uploaded successfully', 'file_count': len(files)}
 
@@ -360,8 +506,144 @@ def get_root_task(request: Request):
     return Response(status_code=status.HTTP_204_NO_CONTENT)
 
 
+@app.get('/api/snapshot')
+def get_snapshot(request: Request, events: int = 20):
+    """
+    Get what a reconnecting client needs to render the session right away:
+    the agent state, the last `events` events, a reference to the latest
+    screenshot and the task tree. Screenshots are left out of the events; fetch
+    them from their `screenshot_ref`. Older events are paged with
+    GET /api/events?before=<before>.
+
+    To get the snapshot:
+    ```sh
+    curl -H "Authorization: Bearer <TOKEN>" "http://localhost:3000/api/snapshot?events=20"
+    ```
+    """
+    agent_session = request.state.session.agent_session
+    event_stream = agent_session.event_stream
+    page = page_events(event_stream, before=event_stream.latest_id + 1, limit=events)
+    agent_state = agent_session.agent_state
+    root_task = None
+    if agent_session.controller is not None:
+        root_task = agent_session.controller.get_state().root_task.to_dict()
+    return {
+        'agent_state': agent_state.value if agent_state is not None else None,
+        'hibernated': agent_session.hibernated,
+        'latest_event_id': event_stream.latest_id,
+        'events': page.events,
+        'before': page.before,
+        'has_more': page.has_more,
+        'latest_screenshot': latest_screenshot(event_stream),
+        'root_task': root_task,
+    }
+
+
+@app.get('/api/events')
+def get_events(
+    request: Request,
+    after: int | None = None,
+    before: int | None = None,
+    limit: int = 50,
+    full: bool = False,
+):
+    """
+    Page through the session history, oldest first.
+
+    Pass the `after` cursor of the previous page to get newer events, or the
+    `before` cursor to get older ones; `limit` is capped at 200. Screenshots
+    and DOM trees are left out unless `full=true`.
+
+    To get the events after event 41:
+    ```sh
+    curl -H "Authorization: Bearer <TOKEN>" "http://localhost:3000/api/events?after=41&limit=50"
+    ```
+    """
+    if after is not None and before is not None:
+        return JSONResponse(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            content={'error': 'Pass either after or before, not both'},
+        )
+    event_stream = request.state.session.agent_session.event_stream
+    page = page_events(event_stream, after, before, limit, full)
+    return {
+        'events': page.events,
+        'after': page.after,
+        'before': page.before,
+        'has_more': page.has_more,
+    }
+
+
+@app.get('/api/events/{event_id}/screenshot')
+def get_screenshot(request: Request, event_id: int):
+    """
+    Get the screenshot of a browser observation.
+
+    To get the screenshot of event 42:
+    ```sh
+    curl -H "Authorization: Bearer <TOKEN>" http://localhost:3000/api/events/42/screenshot -o screenshot.png
+    ```
+    """
+    event_stream = request.state.session.agent_session.event_stream
+    try:
+        event = event_stream.get_event(event_id)
+    except FileNotFoundError:
+        event = None
+    if not isinstance(event, BrowserOutputObservation) or not event.screenshot:
+        return JSONResponse(
+            status_code=status.HTTP_404_NOT_FOUND,
+            content={'error': 'Screenshot not found'},
+        )
+    image, media_type = decode_screenshot(event.screenshot)
+    # events never change once written
+    return Response(
+        content=image,
+        media_type=media_type,
+        headers={'Cache-Control': 'private, max-age=31536000, immutable'},
+    )
+
+
+@app.get('/api/trace')
+def get_trace(request: Request, format: str = 'json'):
+    """
+    Get the sampled step latency spans of the current session.
+
+    Set `trace_sample_rate` in the config to enable tracing. Use `format=chrome`
+    to get a file that can be loaded in chrome://tracing or Perfetto:
+    ```sh
+    curl -H "Authorization: Bearer <TOKEN>" "http://localhost:3000/api/trace?format=chrome"
+    ```
+    """
+    controller = request.state.session.agent_session.controller
+    if controller is None:
+        return Response(status_code=status.HTTP_204_NO_CONTENT)
+    return Response(
+        content=controller.tracer.export(format), media_type='application/json'
+    )
+
+
+@app.get('/api/metrics')
+def get_metrics(request: Request):
+    """
+    Get LLM cost, token and latency metrics of the current session and of the whole process.
+
+    To get the metrics:
+    ```sh
+    curl -H "Authorization: Bearer <TOKEN>" http://localhost:3000/api/metrics
+    ```
+    """
+    session_metrics = None
+    controller = request.state.session.agent_session.controller
+    if controller is not None:
+        session_metrics = controller.get_state().metrics.get()
+    return JSONResponse(
+        status_code=status.HTTP_200_OK,
+        content={'session': session_metrics, 'process': llm_stats.get()},
+    )
+
+
 @app.get('/api/defaults')
-async def appconfig_defaults():
+async def appconfig_defaults(request: Request):
     """
     Get default configurations.
 
@@ -370,7 +652,7 @@ async def appconfig_defaults():
     curl http://localhost:3000/api/defaults
     ```
     """
-    return config.defaults_dict
+    return await default_options.response(request)
 
 
 # app.mount('/', StaticFiles(directory='./frontend/dist', html=True), name='dist')
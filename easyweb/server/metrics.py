@@ -0,0 +1,112 @@
+from concurrent.futures import ThreadPoolExecutor
+
+from easyweb.controller.agent_controller import executor as agent_step_executor
+from easyweb.core.metrics import Histogram as BucketCounts
+from easyweb.core.metrics import llm_stats
+from easyweb.core.prometheus import Counter, Gauge, Histogram, registry
+from easyweb.llm.router import hedge_executor
+from easyweb.server.session import SessionManager
+
+__all__ = ['register_collectors']
+
+
+def _queue_depth(executor: ThreadPoolExecutor) -> int:
+    # tasks submitted but not yet picked up by a worker thread
+    return executor._work_queue.qsize()
+
+
+def collect_sessions(session_manager: SessionManager):
+    sessions = Gauge(
+        'easyweb_sessions', 'Sessions held by this worker, by agent state.', ['state']
+    )
+    for state, count in session_manager.agent_states().items():
+        sessions.set(count, state=state)
+    active = Gauge('easyweb_sessions_active', 'Sessions with a connected client.')
+    active.set(session_manager.active_sessions)
+    browsers = Gauge('easyweb_browsers', 'Running browser processes.')
+    browsers.set(session_manager.browsers)
+    sandboxes = Gauge('easyweb_sandboxes', 'Open sandboxes.')
+    sandboxes.set(session_manager.sandboxes)
+    hibernated = Gauge(
+        'easyweb_sessions_hibernated',
+        'Idle sessions with their browser and sandbox released.',
+    )
+    hibernated.set(session_manager.hibernated)
+
+    capacity = session_manager.capacity()
+    headroom = Gauge(
+        'easyweb_capacity',
+        'Admission limits and host headroom, see /health.',
+        ['gauge'],
+    )
+    for gauge in (
+        'max_sessions',
+        'max_browsers',
+        'free_memory_mb',
+        'min_free_memory_mb',
+        'cpu_load',
+        'max_cpu_load',
+        'admitting',
+    ):
+        if capacity[gauge] is not None:
+            headroom.set(float(capacity[gauge]), gauge=gauge)
+    admissions = Counter(
+        'easyweb_admissions_total', 'Admission decisions for new sessions.', ['result']
+    )
+    admissions.inc(capacity['admitted'], result='admitted')
+    admissions.inc(capacity['rejected'], result='rejected')
+    return [sessions, active, browsers, sandboxes, hibernated, headroom, admissions]
+
+
+def collect_llm():
+    requests = Counter(
+        'easyweb_llm_requests_total', 'LLM completions, by model.', ['model']
+    )
+    tokens = Counter(
+        'easyweb_llm_tokens_total',
+        'LLM tokens by model and type (prompt, completion, cached).',
+        ['model', 'type'],
+    )
+    cost = Counter(
+        'easyweb_llm_cost_usd_total', 'LLM cost in USD, by model.', ['model']
+    )
+    retries = Counter(
+        'easyweb_llm_retries_total', 'Extra LLM attempts (retries, hedges).', ['model']
+    )
+    latency = None
+    for model, stats in llm_stats.get().items():
+        requests.inc(stats['requests'], model=model)
+        for kind in ('prompt', 'completion', 'cached'):
+            tokens.inc(stats[f'{kind}_tokens'], model=model, type=kind)
+        cost.inc(stats['cost'], model=model)
+        retries.inc(stats['retries'], model=model)
+        counts = BucketCounts.from_dict(stats['latency_histogram'])
+        if latency is None:
+            latency = Histogram(
+                'easyweb_llm_latency_seconds',
+                'LLM completion latency including retries, by model.',
+                ['model'],
+                counts.buckets,
+            )
+        latency.set_counts(counts, model=model)
+    return [requests, tokens, cost, retries] + ([latency] if latency else [])
+
+
+def collect_executors():
+    depth = Gauge(
+        'easyweb_executor_queue_depth',
+        'Tasks waiting for a free thread, by executor.',
+        ['executor'],
+    )
+    depth.set(_queue_depth(agent_step_executor), executor='agent_step')
+    depth.set(_queue_depth(hedge_executor), executor='llm_hedge')
+    return [depth]
+
+
+def register_collectors(session_manager: SessionManager) -> None:
+    """
+    Adds the metrics read at scrape time to the /metrics registry.
+    """
+    registry.register_collector(lambda: collect_sessions(session_manager))
+    registry.register_collector(collect_llm)
+    registry.register_collector(collect_executors)
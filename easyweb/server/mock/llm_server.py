@@ -0,0 +1,393 @@
+"""
+OpenAI-compatible mock LLM server for load tests without network access.
+
+Run it standalone:
+
+    python -m easyweb.server.mock.llm_server --port 8765 --latency lognormal:0.8:0.5 --error-rate 0.05
+
+or in-process:
+
+    with MockLLMServer(MockLLMConfig(responses=['```click("12")```'])) as server:
+        llm = LLM(model='openai/mock', base_url=server.base_url, api_key='mock')
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import threading
+import time
+import uuid
+from dataclasses import dataclass, field
+from typing import Callable
+
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+__all__ = ['LatencyDistribution', 'MockLLMConfig', 'MockLLMServer', 'create_app']
+
+DEFAULT_RESPONSE = 'In order to accomplish my goal I need to wait.\n```noop()```'
+
+
+@dataclass
+class LatencyDistribution:
+    """
+    Response latency in seconds.
+
+    Attributes:
+        kind: 'fixed' (a), 'uniform' (a to b), 'exponential' (mean a) or 'lognormal' (median a, sigma b).
+        a: The first parameter of the distribution.
+        b: The second parameter of the distribution.
+    """
+
+    kind: str = 'fixed'
+    a: float = 0.0
+    b: float = 0.0
+
+    @classmethod
+    def parse(cls, spec: str) -> 'LatencyDistribution':
+        """
+        Parses 'kind:a:b', e.g. 'fixed:0.2', 'uniform:0.1:2' or 'lognormal:0.8:0.5'.
+        """
+        kind, *params = spec.split(':')
+        values = [float(param) for param in params] + [0.0, 0.0]
+        distribution = cls(kind, values[0], values[1])
+        distribution.sample(random.Random())
+        return distribution
+
+    def sample(self, rng: random.Random) -> float:
+        if self.kind == 'fixed':
+            return self.a
+        if self.kind == 'uniform':
+            return rng.uniform(self.a, self.b)
+        if self.kind == 'exponential':
+            return rng.expovariate(1 / self.a) if self.a > 0 else 0.0
+        if self.kind == 'lognormal':
+            return rng.lognormvariate(0, self.b) * self.a
+        raise ValueError(f'Invalid latency distribution: {self.kind}')
+
+
+@dataclass
+class MockLLMConfig:
+    """
+    Behavior of the mock LLM server.
+
+    Attributes:
+        responses: Canned responses, served in turn.
+        responder: Scripted responses: called with the request body, returns the response text. Overrides responses.
+        latency: The time to the first token.
+        token_latency: The delay between streamed chunks, in seconds.
+        chunk_size: The number of characters per streamed chunk.
+        rate_limit_rate: The fraction of requests answered with a 429.
+        error_rate: The fraction of requests answered with a 500 or 503.
+        retry_after: The retry-after header of 429 responses, in seconds.
+        cached_prompt_tokens: The prompt tokens reported as served from the prompt cache.
+        seed: Seeds latencies and failure injection, for reproducible runs.
+    """
+
+    responses: list[str] = field(default_factory=lambda: [DEFAULT_RESPONSE])
+    responder: Callable[[dict], str] | None = None
+    latency: LatencyDistribution = field(default_factory=LatencyDistribution)
+    token_latency: float = 0.0
+    chunk_size: int = 8
+    rate_limit_rate: float = 0.0
+    error_rate: float = 0.0
+    retry_after: float = 1.0
+    cached_prompt_tokens: int = 0
+    seed: int | None = None
+
+
+def count_tokens(text: str) -> int:
+    # a rough estimate is enough for usage fields
+    return max(1, len(text) // 4) if text else 0
+
+
+def _prompt_text(body: dict) -> str:
+    parts = []
+    for message in body.get('messages') or []:
+        content = message.get('content')
+        if isinstance(content, list):
+            content = ' '.join(
+                part.get('text', '') for part in content if isinstance(part, dict)
+            )
+        parts.append(str(content or ''))
+    return '\n'.join(parts)
+
+
+class MockLLMState:
+    """
+    Response selection, failure injection and request counters of one server.
+    """
+
+    def __init__(self, config: MockLLMConfig):
+        self.config = config
+        self.rng = random.Random(config.seed)
+        self.lock = threading.Lock()
+        self.requests = 0
+        self.rate_limited = 0
+        self.errors = 0
+        self.streams = 0
+        self.served = 0
+
+    def next_response(self, body: dict) -> str:
+        if self.config.responder is not None:
+            return self.config.responder(body)
+        with self.lock:
+            index = self.served
+            self.served += 1
+        return self.config.responses[index % len(self.config.responses)]
+
+    def draw(self) -> tuple[float, int | None]:
+        """
+        Returns the latency of the next request and the error status to inject, if any.
+        """
+        with self.lock:
+            self.requests += 1
+            latency = self.config.latency.sample(self.rng)
+            roll = self.rng.random()
+            if roll < self.config.rate_limit_rate:
+                self.rate_limited += 1
+                return latency, 429
+            if roll < self.config.rate_limit_rate + self.config.error_rate:
+                self.errors += 1
+                return latency, self.rng.choice([500, 503])
+            return latency, None
+
+    def stats(self) -> dict:
+        with self.lock:
+            return {
+                'requests': self.requests,
+                'rate_limited': self.rate_limited,
+                'errors': self.errors,
+                'streams': self.streams,
+            }
+
+
+def _usage(config: MockLLMConfig, prompt: str, completion: str) -> dict:
+    prompt_tokens = count_tokens(prompt)
+    completion_tokens = count_tokens(completion)
+    return {
+        'prompt_tokens': prompt_tokens,
+        'completion_tokens': completion_tokens,
+        'total_tokens': prompt_tokens + completion_tokens,
+        'prompt_tokens_details': {
+            'cached_tokens': min(config.cached_prompt_tokens, prompt_tokens)
+        },
+    }
+
+
+def _error_response(status: int, config: MockLLMConfig) -> JSONResponse:
+    if status == 429:
+        return JSONResponse(
+            status_code=429,
+            headers={'retry-after': str(config.retry_after)},
+            content={
+                'error': {
+                    'message': 'Rate limit reached (injected by the mock server)',
+                    'type': 'rate_limit_error',
+                    'code': 'rate_limit_exceeded',
+                }
+            },
+        )
+    return JSONResponse(
+        status_code=status,
+        content={
+            'error': {
+                'message': f'Server error {status} (injected by the mock server)',
+                'type': 'server_error',
+            }
+        },
+    )
+
+
+def create_app(config: MockLLMConfig | None = None) -> FastAPI:
+    """
+    Builds the mock server app. Its counters are served at /stats.
+    """
+    config = config or MockLLMConfig()
+    state = MockLLMState(config)
+    app = FastAPI()
+    app.state.mock = state
+
+    @app.get('/v1/models')
+    async def list_models():
+        return {'object': 'list', 'data': [{'id': 'mock', 'object': 'model'}]}
+
+    @app.get('/stats')
+    async def stats():
+        return state.stats()
+
+    @app.post('/v1/chat/completions')
+    @app.post('/chat/completions')
+    async def chat_completions(request: Request):
+        body = await request.json()
+        latency, status = state.draw()
+        await asyncio.sleep(latency)
+        if status is not None:
+            return _error_response(status, config)
+        prompt = _prompt_text(body)
+        text = state.next_response(body)
+        stops = body.get('stop') or []
+        for stop in [stops] if isinstance(stops, str) else stops:
+            if stop and stop in text:
+                text = text[: text.index(stop)]
+        completion_id = f'chatcmpl-{uuid.uuid4().hex}'
+        model = body.get('model', 'mock')
+        created = int(time.time())
+        usage = _usage(config, prompt, text)
+        if not body.get('stream'):
+            return {
+                'id': completion_id,
+                'object': 'chat.completion',
+                'created': created,
+                'model': model,
+                'choices': [
+                    {
+                        'index': 0,
+                        'message': {'role': 'assistant', 'content': text},
+                        'finish_reason': 'stop',
+                    }
+                ],
+                'usage': usage,
+            }
+
+        with state.lock:
+            state.streams += 1
+        include_usage = (body.get('stream_options') or {}).get('include_usage')
+
+        def chunk(delta: dict, finish_reason: str | None = None, **extra) -> str:
+            data = {
+                'id': completion_id,
+                'object': 'chat.completion.chunk',
+                'created': created,
+                'model': model,
+                'choices': [
+                    {'index': 0, 'delta': delta, 'finish_reason': finish_reason}
+                ],
+                **extra,
+            }
+            return f'data: {json.dumps(data)}\n\n'
+
+        async def events():
+            yield chunk({'role': 'assistant', 'content': ''})
+            for start in range(0, len(text), config.chunk_size):
+                if config.token_latency:
+                    await asyncio.sleep(config.token_latency)
+                yield chunk({'content': text[start : start + config.chunk_size]})
+            yield chunk({}, 'stop')
+            if include_usage:
+                yield (
+                    'data: '
+                    + json.dumps(
+                        {
+                            'id': completion_id,
+                            'object': 'chat.completion.chunk',
+                            'created': created,
+                            'model': model,
+                            'choices': [],
+                            'usage': usage,
+                        }
+                    )
+                    + '\n\n'
+                )
+            yield 'data: [DONE]\n\n'
+
+        return StreamingResponse(events(), media_type='text/event-stream')
+
+    return app
+
+
+class MockLLMServer:
+    """
+    Runs the mock server in a background thread, e.g. from a test or a load script.
+    Port 0 picks a free port; `base_url` is the address to pass to LLM.
+    """
+
+    def __init__(
+        self,
+        config: MockLLMConfig | None = None,
+        host: str = '127.0.0.1',
+        port: int = 0,
+    ):
+        self.app = create_app(config)
+        self.host = host
+        self.server = uvicorn.Server(
+            uvicorn.Config(self.app, host=host, port=port, log_level='warning')
+        )
+        self._thread: threading.Thread | None = None
+
+    @property
+    def port(self) -> int:
+        return self.server.servers[0].sockets[0].getsockname()[1]
+
+    @property
+    def base_url(self) -> str:
+        return f'http://{self.host}:{self.port}/v1'
+
+    def stats(self) -> dict:
+        return self.app.state.mock.stats()
+
+    def start(self, timeout: float = 10) -> 'MockLLMServer':
+        self._thread = threading.Thread(
+            target=self.server.run, name='mock-llm-server', daemon=True
+        )
+        self._thread.start()
+        deadline = time.monotonic() + timeout
+        while not self.server.started:
+            if time.monotonic() > deadline or not self._thread.is_alive():
+                raise RuntimeError('Mock LLM server did not start')
+            time.sleep(0.01)
+        return self
+
+    def stop(self) -> None:
+        self.server.should_exit = True
+        if self._thread is not None:
+            self._thread.join(timeout=10)
+
+    def __enter__(self) -> 'MockLLMServer':
+        return self.start()
+
+    def __exit__(self, *exc) -> None:
+        self.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='OpenAI-compatible mock LLM server')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument(
+        '--responses',
+        help='JSON file with a list of response texts, served in turn',
+    )
+    parser.add_argument(
+        '--latency',
+        default='fixed:0',
+        type=LatencyDistribution.parse,
+        help="Time to first token, 'kind:a:b' with kind fixed, uniform, exponential or lognormal",
+    )
+    parser.add_argument('--token-latency', type=float, default=0.0)
+    parser.add_argument('--rate-limit-rate', type=float, default=0.0)
+    parser.add_argument('--error-rate', type=float, default=0.0)
+    parser.add_argument('--retry-after', type=float, default=1.0)
+    parser.add_argument('--cached-prompt-tokens', type=int, default=0)
+    parser.add_argument('--seed', type=int)
+    args = parser.parse_args()
+
+    config = MockLLMConfig(
+        latency=args.latency,
+        token_latency=args.token_latency,
+        rate_limit_rate=args.rate_limit_rate,
+        error_rate=args.error_rate,
+        retry_after=args.retry_after,
+        cached_prompt_tokens=args.cached_prompt_tokens,
+        seed=args.seed,
+    )
+    if args.responses:
+        with open(args.responses) as f:
+            config.responses = json.load(f)
+    uvicorn.run(create_app(config), host=args.host, port=args.port)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,105 @@
+import asyncio
+import hashlib
+import json
+import time
+from dataclasses import dataclass
+from typing import Callable
+
+from fastapi import Request, Response
+from fastapi.encoders import jsonable_encoder
+
+from easyweb.core.logger import easyweb_logger as logger
+
+__all__ = ['OptionsSnapshot', 'CachedOptions']
+
+
+@dataclass
+class OptionsSnapshot:
+    """
+    A precomputed options response.
+
+    Attributes:
+        body: The JSON response body.
+        etag: The strong ETag of the body.
+        built_at: When the snapshot was built, on the monotonic clock.
+    """
+
+    body: bytes
+    etag: str
+    built_at: float
+
+    @classmethod
+    def build(cls, value: object) -> 'OptionsSnapshot':
+        body = json.dumps(jsonable_encoder(value)).encode()
+        etag = f'"{hashlib.sha1(body).hexdigest()[:16]}"'
+        return cls(body, etag, time.monotonic())
+
+
+def _etag_matches(if_none_match: str | None, etag: str) -> bool:
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == '*':
+        return True
+    # weak comparison, as for GET requests
+    candidates = [tag.strip().removeprefix('W/') for tag in if_none_match.split(',')]
+    return etag in candidates
+
+
+class CachedOptions:
+    """
+    Serves an options endpoint from a snapshot rebuilt at most every `ttl` seconds.
+
+    The snapshot is built in a worker thread, since building may import
+    litellm or call AWS. Once it is stale, requests keep getting it while a
+    single background refresh runs; if the refresh fails, the previous
+    snapshot stays. Clients revalidate with If-None-Match and get a 304 while
+    the options are unchanged.
+    """
+
+    def __init__(self, name: str, build: Callable[[], object], ttl: float = 600):
+        self.name = name
+        self.ttl = ttl
+        self._build = build
+        self._snapshot: OptionsSnapshot | None = None
+        self._lock = asyncio.Lock()
+        self._refresh_task: asyncio.Task | None = None
+
+    async def _rebuild(self) -> OptionsSnapshot:
+        loop = asyncio.get_running_loop()
+        value = await loop.run_in_executor(None, self._build)
+        self._snapshot = OptionsSnapshot.build(value)
+        return self._snapshot
+
+    async def _refresh(self) -> None:
+        try:
+            # shared with the first build, so warming up does not build twice
+            async with self._lock:
+                await self._rebuild()
+        except Exception as e:
+            logger.warning(f'Failed to refresh {self.name} options: {e}')
+
+    def refresh_in_background(self) -> None:
+        """Rebuilds the snapshot without blocking, e.g. to warm it up at startup."""
+        if self._refresh_task is None or self._refresh_task.done():
+            self._refresh_task = asyncio.create_task(self._refresh())
+
+    async def get(self) -> OptionsSnapshot:
+        snapshot = self._snapshot
+        if snapshot is None:
+            # the first requests wait for one shared build
+            async with self._lock:
+                if self._snapshot is None:
+                    return await self._rebuild()
+                return self._snapshot
+        if time.monotonic() - snapshot.built_at > self.ttl:
+            self.refresh_in_background()
+        return snapshot
+
+    async def response(self, request: Request) -> Response:
+        snapshot = await self.get()
+        headers = {'ETag': snapshot.etag, 'Cache-Control': 'no-cache'}
+        if _etag_matches(request.headers.get('if-none-match'), snapshot.etag):
+            return Response(status_code=304, headers=headers)
+        return Response(
+            content=snapshot.body, media_type='application/json', headers=headers
+        )
@@ -0,0 +1,309 @@
+import os
+import socket
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from dataclasses import dataclass, field
+
+from easyweb.core.config import config
+from easyweb.core.logger import easyweb_logger as logger
+
+__all__ = [
+    'WorkerInfo',
+    'SessionRegistry',
+    'InMemorySessionRegistry',
+    'SQLiteSessionRegistry',
+    'get_session_registry',
+    'get_worker_id',
+]
+
+
+@dataclass
+class WorkerInfo:
+    """
+    A backend worker process as seen by the registry.
+
+    Attributes:
+        worker_id: Unique per process, see `get_worker_id`.
+        url: The address the router reaches this worker at, e.g. http://127.0.0.1:5001.
+        load: The number of live sessions, updated with every heartbeat.
+        heartbeat: When the worker last reported, in seconds since the epoch.
+    """
+
+    worker_id: str
+    url: str
+    load: int = 0
+    heartbeat: float = field(default_factory=time.time)
+
+    def to_dict(self) -> dict:
+        return {
+            'worker_id': self.worker_id,
+            'url': self.url,
+            'load': self.load,
+            'heartbeat': self.heartbeat,
+        }
+
+
+def get_worker_id() -> str:
+    return f'{socket.gethostname()}-{os.getpid()}'
+
+
+class SessionRegistry(ABC):
+    """
+    Records which worker owns which session, and which workers are alive.
+
+    Workers register themselves and heartbeat their load; a worker that has not
+    reported for `worker_ttl` seconds is considered dead and its sessions free
+    to be picked up elsewhere. The router reads the registry to send a session's
+    websocket and API requests to the worker that holds it.
+    """
+
+    def __init__(self, worker_ttl: float = 30):
+        self.worker_ttl = worker_ttl
+
+    def is_alive(self, worker: WorkerInfo) -> bool:
+        return time.time() - worker.heartbeat <= self.worker_ttl
+
+    @abstractmethod
+    def register_worker(self, worker: WorkerInfo) -> None:
+        pass
+
+    @abstractmethod
+    def heartbeat(self, worker_id: str, load: int) -> None:
+        pass
+
+    @abstractmethod
+    def remove_worker(self, worker_id: str) -> None:
+        """
+        Removes the worker and releases all of its sessions.
+        """
+
+    @abstractmethod
+    def get_worker(self, worker_id: str) -> WorkerInfo | None:
+        pass
+
+    @abstractmethod
+    def _list_workers(self) -> list[WorkerInfo]:
+        pass
+
+    @abstractmethod
+    def claim(self, sid: str, worker_id: str) -> None:
+        """
+        Makes the worker the owner of the session.
+        """
+
+    @abstractmethod
+    def release(self, sid: str, worker_id: str) -> None:
+        """
+        Forgets the session, unless another worker has claimed it since.
+        """
+
+    @abstractmethod
+    def get_owner_id(self, sid: str) -> str | None:
+        pass
+
+    @abstractmethod
+    def sessions_of(self, worker_id: str) -> list[str]:
+        pass
+
+    def list_workers(self, include_dead: bool = False) -> list[WorkerInfo]:
+        workers = self._list_workers()
+        if include_dead:
+            return workers
+        return [worker for worker in workers if self.is_alive(worker)]
+
+    def get_owner(self, sid: str) -> WorkerInfo | None:
+        """
+        Returns the live worker owning the session, or None if it has none.
+        """
+        worker_id = self.get_owner_id(sid)
+        if worker_id is None:
+            return None
+        worker = self.get_worker(worker_id)
+        if worker is None or not self.is_alive(worker):
+            return None
+        return worker
+
+    def least_loaded(self) -> WorkerInfo | None:
+        workers = self.list_workers()
+        if not workers:
+            return None
+        return min(workers, key=lambda worker: worker.load)
+
+
+class InMemorySessionRegistry(SessionRegistry):
+    """
+    Registry of a single backend process: nothing to share, nothing to route.
+    """
+
+    def __init__(self, worker_ttl: float = 30):
+        super().__init__(worker_ttl)
+        self._workers: dict[str, WorkerInfo] = {}
+        self._owners: dict[str, str] = {}
+        self._lock = threading.Lock()
+
+    def register_worker(self, worker: WorkerInfo) -> None:
+        with self._lock:
+            worker.heartbeat = time.time()
+            self._workers[worker.worker_id] = worker
+
+    def heartbeat(self, worker_id: str, load: int) -> None:
+        with self._lock:
+            worker = self._workers.get(worker_id)
+            if worker is not None:
+                worker.load = load
+                worker.heartbeat = time.time()
+
+    def remove_worker(self, worker_id: str) -> None:
+        with self._lock:
+            self._workers.pop(worker_id, None)
+            for sid, owner in list(self._owners.items()):
+                if owner == worker_id:
+                    del self._owners[sid]
+
+    def get_worker(self, worker_id: str) -> WorkerInfo | None:
+        with self._lock:
+            return self._workers.get(worker_id)
+
+    def _list_workers(self) -> list[WorkerInfo]:
+        with self._lock:
+            return list(self._workers.values())
+
+    def claim(self, sid: str, worker_id: str) -> None:
+        with self._lock:
+            self._owners[sid] = worker_id
+
+    def release(self, sid: str, worker_id: str) -> None:
+        with self._lock:
+            if self._owners.get(sid) == worker_id:
+                del self._owners[sid]
+
+    def get_owner_id(self, sid: str) -> str | None:
+        with self._lock:
+            return self._owners.get(sid)
+
+    def sessions_of(self, worker_id: str) -> list[str]:
+        with self._lock:
+            return [sid for sid, owner in self._owners.items() if owner == worker_id]
+
+
+class SQLiteSessionRegistry(SessionRegistry):
+    """
+    Registry shared by the workers of one host through a SQLite file.
+
+    Stand-in for a networked store (e.g. Redis) when scaling past one host:
+    the same tables map directly onto keys with a TTL.
+    """
+
+    def __init__(self, path: str, worker_ttl: float = 30):
+        super().__init__(worker_ttl)
+        self.path = path
+        dirname = os.path.dirname(path)
+        if dirname:
+            os.makedirs(dirname, exist_ok=True)
+        self._lock = threading.Lock()
+        # several processes write this file; wait for their locks instead of failing
+        self._conn = sqlite3.connect(path, timeout=10, check_same_thread=False)
+        with self._lock, self._conn:
+            self._conn.execute('PRAGMA journal_mode=WAL')
+            self._conn.execute(
+                'CREATE TABLE IF NOT EXISTS workers ('
+                'worker_id TEXT PRIMARY KEY, url TEXT NOT NULL, '
+                'load INTEGER NOT NULL, heartbeat REAL NOT NULL)'
+            )
+            self._conn.execute(
+                'CREATE TABLE IF NOT EXISTS sessions ('
+                'sid TEXT PRIMARY KEY, worker_id TEXT NOT NULL, claimed REAL NOT NULL)'
+            )
+            self._conn.execute(
+                'CREATE INDEX IF NOT EXISTS sessions_worker ON sessions (worker_id)'
+            )
+
+    def register_worker(self, worker: WorkerInfo) -> None:
+        worker.heartbeat = time.time()
+        with self._lock, self._conn:
+            self._conn.execute(
+                'INSERT OR REPLACE INTO workers VALUES (?, ?, ?, ?)',
+                (worker.worker_id, worker.url, worker.load, worker.heartbeat),
+            )
+
+    def heartbeat(self, worker_id: str, load: int) -> None:
+        with self._lock, self._conn:
+            self._conn.execute(
+                'UPDATE workers SET load = ?, heartbeat = ? WHERE worker_id = ?',
+                (load, time.time(), worker_id),
+            )
+
+    def remove_worker(self, worker_id: str) -> None:
+        with self._lock, self._conn:
+            self._conn.execute('DELETE FROM workers WHERE worker_id = ?', (worker_id,))
+            self._conn.execute('DELETE FROM sessions WHERE worker_id = ?', (worker_id,))
+
+    def get_worker(self, worker_id: str) -> WorkerInfo | None:
+        with self._lock:
+            row = self._conn.execute(
+                'SELECT worker_id, url, load, heartbeat FROM workers WHERE worker_id = ?',
+                (worker_id,),
+            ).fetchone()
+        return WorkerInfo(*row) if row is not None else None
+
+    def _list_workers(self) -> list[WorkerInfo]:
+        with self._lock:
+            rows = self._conn.execute(
+                'SELECT worker_id, url, load, heartbeat FROM workers'
+            ).fetchall()
+        return [WorkerInfo(*row) for row in rows]
+
+    def claim(self, sid: str, worker_id: str) -> None:
+        with self._lock, self._conn:
+            self._conn.execute(
+                'INSERT OR REPLACE INTO sessions VALUES (?, ?, ?)',
+                (sid, worker_id, time.time()),
+            )
+
+    def release(self, sid: str, worker_id: str) -> None:
+        with self._lock, self._conn:
+            self._conn.execute(
+                'DELETE FROM sessions WHERE sid = ? AND worker_id = ?',
+                (sid, worker_id),
+            )
+
+    def get_owner_id(self, sid: str) -> str | None:
+        with self._lock:
+            row = self._conn.execute(
+                'SELECT worker_id FROM sessions WHERE sid = ?', (sid,)
+            ).fetchone()
+        return row[0] if row is not None else None
+
+    def sessions_of(self, worker_id: str) -> list[str]:
+        with self._lock:
+            rows = self._conn.execute(
+                'SELECT sid FROM sessions WHERE worker_id = ?', (worker_id,)
+            ).fetchall()
+        return [row[0] for row in rows]
+
+
+_registry: SessionRegistry | None = None
+_registry_lock = threading.Lock()
+
+
+def get_session_registry() -> SessionRegistry:
+    """
+    Returns the process-wide registry configured by `session_registry`:
+    'memory' for a single backend, 'sqlite' to share it between workers.
+    """
+    global _registry
+    with _registry_lock:
+        if _registry is None:
+            if config.session_registry == 'sqlite':
+                path = config.session_registry_path or os.path.join(
+                    config.cache_dir, 'session_registry.db'
+                )
+                logger.info(f'Using shared session registry at {path}')
+                _registry = SQLiteSessionRegistry(path, config.worker_ttl)
+            elif config.session_registry == 'memory':
+                _registry = InMemorySessionRegistry(config.worker_ttl)
+            else:
+                raise ValueError(f'Invalid session registry: {config.session_registry}')
+        return _registry
@@ -0,0 +1,227 @@
+"""
+Sticky router in front of several backend workers on one port.
+
+Each worker registers itself in the shared session registry with its
+WORKER_URL and claims the sessions it creates. The router sends a session's
+websocket and API requests to the worker that owns it, and new sessions (or
+those whose worker died) to the least-loaded live worker:
+
+    SESSION_REGISTRY=sqlite JWT_SECRET=... WORKER_URL=http://127.0.0.1:5001 \\
+        uvicorn easyweb.server.listen:app --port 5001
+    SESSION_REGISTRY=sqlite JWT_SECRET=... python -m easyweb.server.router --port 3000
+
+All workers and the router need the same JWT_SECRET to read the session id
+from a token, and the same registry file.
+"""
+
+import argparse
+import asyncio
+
+import aiohttp
+import uvicorn
+from fastapi import FastAPI, Request, WebSocket
+from fastapi.responses import JSONResponse, StreamingResponse
+from starlette.background import BackgroundTask
+from starlette.concurrency import run_in_threadpool
+from starlette.websockets import WebSocketDisconnect
+
+from easyweb.core.logger import easyweb_logger as logger
+from easyweb.server.auth import get_sid_from_token
+from easyweb.server.registry import WorkerInfo, get_session_registry
+
+__all__ = ['app', 'pick_worker']
+
+# hop-by-hop headers are not forwarded; aiohttp also decodes compressed bodies
+HOP_HEADERS = {
+    'connection',
+    'keep-alive',
+    'transfer-encoding',
+    'upgrade',
+    'host',
+    'content-length',
+    'content-encoding',
+}
+
+app = FastAPI()
+registry = get_session_registry()
+_client: aiohttp.ClientSession | None = None
+
+
+def _get_client() -> aiohttp.ClientSession:
+    global _client
+    if _client is None or _client.closed:
+        _client = aiohttp.ClientSession(
+            timeout=aiohttp.ClientTimeout(total=None, sock_connect=10)
+        )
+    return _client
+
+
+@app.on_event('shutdown')
+async def close_client():
+    if _client is not None:
+        await _client.close()
+
+
+def _token_from_header(authorization: str | None) -> str | None:
+    if not authorization:
+        return None
+    if 'Bearer' in authorization:
+        return authorization.split('Bearer')[1].strip()
+    return authorization
+
+
+def pick_worker(token: str | None) -> WorkerInfo | None:
+    """
+    Returns the live owner of the token's session, otherwise the least-loaded live worker.
+
+    Queries the registry, which may block on SQLite; call it off the event loop.
+    """
+    if token:
+        sid = get_sid_from_token(token)
+        if sid:
+            owner = registry.get_owner(sid)
+            if owner is not None:
+                return owner
+    return registry.least_loaded()
+
+
+def _no_worker() -> JSONResponse:
+    return JSONResponse(
+        status_code=503,
+        headers={'retry-after': str(max(1, int(registry.worker_ttl // 3)))},
+        content={'error': 'No backend worker available'},
+    )
+
+
+@app.get('/router/workers')
+async def list_workers():
+    """
+    Get the registered workers, their load and the sessions they own.
+
+    ```sh
+    curl http://localhost:3000/router/workers
+    ```
+    """
+    return await run_in_threadpool(_describe_workers)
+
+
+def _describe_workers() -> list[dict]:
+    return [
+        {
+            **worker.to_dict(),
+            'alive': registry.is_alive(worker),
+            'sessions': registry.sessions_of(worker.worker_id),
+        }
+        for worker in registry.list_workers(include_dead=True)
+    ]
+
+
+@app.websocket('/ws')
+async def proxy_websocket(websocket: WebSocket):
+    worker = await run_in_threadpool(pick_worker, websocket.query_params.get('token'))
+    if worker is None:
+        await websocket.accept()
+        await websocket.send_json(
+            {'error': 'No backend worker available', 'error_code': 503}
+        )
+        await websocket.close()
+        return
+    url = f'{worker.url.replace("http", "ws", 1)}/ws'
+    try:
+        upstream = await _get_client().ws_connect(
+            url, params=dict(websocket.query_params), heartbeat=30
+        )
+    except aiohttp.ClientError as e:
+        logger.warning(f'Could not reach worker {worker.worker_id} at {url}: {e}')
+        await websocket.accept()
+        await websocket.send_json({'error': 'Backend unavailable', 'error_code': 502})
+        await websocket.close()
+        return
+    await websocket.accept()
+
+    async def client_to_worker():
+        try:
+            while True:
+                message = await websocket.receive()
+                if message['type'] == 'websocket.disconnect':
+                    break
+                if message.get('text') is not None:
+                    await upstream.send_str(message['text'])
+                elif message.get('bytes') is not None:
+                    await upstream.send_bytes(message['bytes'])
+        except WebSocketDisconnect:
+            pass
+
+    async def worker_to_client():
+        async for message in upstream:
+            if message.type == aiohttp.WSMsgType.TEXT:
+                await websocket.send_text(message.data)
+            elif message.type == aiohttp.WSMsgType.BINARY:
+                await websocket.send_bytes(message.data)
+            else:
+                break
+
+    pumps = [
+        asyncio.create_task(client_to_worker()),
+        asyncio.create_task(worker_to_client()),
+    ]
+    try:
+        await asyncio.wait(pumps, return_when=asyncio.FIRST_COMPLETED)
+    finally:
+        for pump in pumps:
+            pump.cancel()
+        await upstream.close()
+        try:
+            await websocket.close()
+        except RuntimeError:
+            # already closed by the client
+            pass
+
+
+@app.api_route(
+    '/api/{path:path}', methods=['GET', 'POST', 'PUT', 'PATCH', 'DELETE', 'OPTIONS']
+)
+async def proxy_http(request: Request, path: str):
+    worker = await run_in_threadpool(
+        pick_worker, _token_from_header(request.headers.get('Authorization'))
+    )
+    if worker is None:
+        return _no_worker()
+    headers = {
+        key: value
+        for key, value in request.headers.items()
+        if key.lower() not in HOP_HEADERS
+    }
+    try:
+        upstream = await _get_client().request(
+            request.method,
+            f'{worker.url}/api/{path}',
+            params=list(request.query_params.multi_items()),
+            headers=headers,
+            data=request.stream() if request.method not in ('GET', 'HEAD') else None,
+        )
+    except aiohttp.ClientError as e:
+        logger.warning(f'Could not reach worker {worker.worker_id}: {e}')
+        return JSONResponse(status_code=502, content={'error': 'Backend unavailable'})
+    return StreamingResponse(
+        upstream.content.iter_any(),
+        status_code=upstream.status,
+        headers={
+            key: value
+            for key, value in upstream.headers.items()
+            if key.lower() not in HOP_HEADERS
+        },
+        background=BackgroundTask(upstream.release),
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Sticky router for backend workers')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=3000)
+    args = parser.parse_args()
+    uvicorn.run(app, host=args.host, port=args.port)
+
+
+if __name__ == '__main__':
+    main()
@@ -1,17 +1,32 @@
+import asyncio
+import json
+import time
 from typing import Optional
 
 # from agenthub.codeact_agent.codeact_agent import CodeActAgent
 from easyweb.controller import AgentController
 from easyweb.controller.agent import Agent
 from easyweb.controller.state.state import State
-from easyweb.core.config import config, get_model_port_arg
+from easyweb.core.config import config, load_model_port_config
 from easyweb.core.logger import easyweb_logger as logger
-from easyweb.core.schema import ConfigType
+from easyweb.core.prometheus import session_rehydrate_seconds
+from easyweb.core.schema import AgentState, ConfigType
 from easyweb.events.stream import EventStream
-from easyweb.llm.llm import LLM
 from easyweb.runtime.e2b.runtime import E2BRuntime
 from easyweb.runtime.runtime import Runtime
 from easyweb.runtime.server.runtime import ServerRuntime
+from easyweb.storage import FileStore
+
+# states in which the agent waits on the user, so its resources can be released
+HIBERNATE_STATES = (
+    AgentState.INIT,
+    AgentState.AWAITING_USER_INPUT,
+    AgentState.FINISHED,
+    AgentState.PAUSED,
+    AgentState.STOPPED,
+    AgentState.REJECTED,
+    AgentState.ERROR,
+)
 
 
 class AgentSession:
@@ -19,18 +34,24 @@ class AgentSession:
 
     Attributes:
         controller: The AgentController instance for controlling the agent.
+        hibernated: Whether the controller and runtime are released until the next `wake`.
     """
 
     sid: str
     event_stream: EventStream
     controller: Optional[AgentController] = None
     runtime: Optional[Runtime] = None
+    hibernated: bool = False
     _closed: bool = False
+    _start_event: dict | None = None
+    _hibernated_state: AgentState | None = None
+    _workspace_files: FileStore | None = None
 
     def __init__(self, sid):
         """Initializes a new instance of the Session class."""
         self.sid = sid
         self.event_stream = EventStream(sid)
+        self._hibernate_lock = asyncio.Lock()
 
     async def start(self, start_event: dict):
         """Starts the agent session.
@@ -42,8 +63,11 @@ class AgentSession:
             raise Exception(
                 'Session already started. You need to close this session and start a new one.'
             )
+        self._start_event = start_event
         await self._create_runtime()
         await self._create_controller(start_event)
+        await self._restore_browser()
+        self.hibernated = False
 
     async def close(self):
         if self._closed:
@@ -51,11 +75,135 @@ class AgentSession:
         if self.controller is not None:
             end_state = self.controller.get_state()
             end_state.save_to_session(self.sid)
+            self._save_trace()
             await self.controller.close()
         if self.runtime is not None:
             self.runtime.close()
         self._closed = True
 
+    @property
+    def agent_state(self) -> AgentState | None:
+        """The state of the agent, kept while hibernated; None before initialization."""
+        if self.controller is not None:
+            return self.controller.get_agent_state()
+        return self._hibernated_state if self.hibernated else None
+
+    @property
+    def file_store(self) -> FileStore | None:
+        """The workspace files, kept while hibernated; None before initialization."""
+        if self.runtime is not None:
+            return self.runtime.file_store
+        return self._workspace_files if self.hibernated else None
+
+    @property
+    def idle(self) -> bool:
+        """Whether the agent is waiting on the user, with nothing running."""
+        if self._closed or self.hibernated or self.controller is None:
+            return False
+        return (
+            self.controller.get_agent_state() in HIBERNATE_STATES
+            and not self.controller.step_in_progress
+        )
+
+    @property
+    def _browser_snapshot_path(self) -> str:
+        return f'sessions/{self.sid}/browser.json'
+
+    async def hibernate(self) -> bool:
+        """
+        Releases the browser, the sandbox and the agent of an idle session.
+
+        The agent state is checkpointed to the file store, as on close, along
+        with the open pages, cookies and localStorage of the browser. The
+        workspace files are kept. `wake` brings the session back.
+
+        Returns:
+        - bool: Whether the session was hibernated
+        """
+        async with self._hibernate_lock:
+            if not self.idle or self.controller is None or self.runtime is None:
+                return False
+            loop = asyncio.get_running_loop()
+            browser = self.runtime.browser
+            if browser is not None:
+                try:
+                    snapshot = await loop.run_in_executor(None, browser.snapshot)
+                    self.event_stream._file_store.write(
+                        self._browser_snapshot_path, json.dumps(snapshot)
+                    )
+                except Exception as e:
+                    logger.warning(
+                        f'Failed to snapshot the browser of session {self.sid}: {e}'
+                    )
+            self._hibernated_state = self.controller.get_agent_state()
+            self.controller.get_state().save_to_session(self.sid)
+            self._save_trace()
+            # the client keeps seeing the agent in the state it left it
+            await self.controller.close(set_stop_state=False)
+            self._workspace_files = self.runtime.file_store
+            runtime = self.runtime
+            self.controller = None
+            self.runtime = None
+            self.hibernated = True
+            runtime.detach()
+            # stopping the browser and the sandbox blocks for seconds
+            await loop.run_in_executor(None, runtime.release)
+        logger.info(f'Hibernated idle session {self.sid}')
+        return True
+
+    async def wake(self) -> float:
+        """
+        Brings back the browser, the sandbox and the agent of a hibernated session.
+
+        Returns:
+        - float: The seconds rehydration took
+        """
+        async with self._hibernate_lock:
+            if not self.hibernated:
+                return 0.0
+            start = time.monotonic()
+            await self.start(self._start_event or {})
+            if self.controller is not None and self._hibernated_state is not None:
+                # restoring the checkpoint sets LOADING; put back what the client saw
+                self.controller.state.agent_state = self._hibernated_state
+                self.controller.state.resume_state = None
+            if self.runtime is not None and self._workspace_files is not None:
+                self.runtime.file_store = self._workspace_files
+            self._hibernated_state = None
+            self._workspace_files = None
+            seconds = time.monotonic() - start
+        session_rehydrate_seconds.observe(seconds)
+        logger.info(f'Woke session {self.sid} in {seconds:.2f}s')
+        return seconds
+
+    async def _restore_browser(self):
+        if self.runtime is None or self.runtime.browser is None:
+            return
+        file_store = self.event_stream._file_store
+        try:
+            snapshot = json.loads(file_store.read(self._browser_snapshot_path))
+        except Exception:
+            # not hibernated since the last restore
+            return
+        # restored once; a later restart starts from a blank browser
+        file_store.delete(self._browser_snapshot_path)
+        loop = asyncio.get_running_loop()
+        try:
+            await loop.run_in_executor(None, self.runtime.browser.restore, snapshot)
+        except Exception as e:
+            logger.warning(f'Failed to restore the browser of session {self.sid}: {e}')
+
+    def _save_trace(self):
+        if self.controller is None or not self.controller.tracer.spans:
+            return
+        try:
+            self.event_stream._file_store.write(
+                f'sessions/{self.sid}/trace.json',
+                self.controller.tracer.export('chrome'),
+            )
+        except Exception as e:
+            logger.error(f'Failed to save trace for session {self.sid}: {e}')
+
     async def _create_runtime(self):
         if self.runtime is not None:
             raise Exception('Runtime already created')
@@ -89,12 +237,22 @@ class AgentSession:
         model = args.get(ConfigType.LLM_MODEL, config.llm.model)
         api_key = args.get(ConfigType.LLM_API_KEY, config.llm.api_key)
         api_base = config.llm.base_url
+        fallbacks = None
         if config.llm.model_port_config_file:
-            model, api_base = get_model_port_arg(
+            model, api_base, fallbacks = load_model_port_config(
                 config.llm.model_port_config_file, model
             )
         logger.info(f'Creating agent {agent_cls} using LLM {model}')
-        llm = LLM(model=model, api_key=api_key, base_url=api_base)
+        # deferred: importing litellm is slow and not needed until the first session
+        from easyweb.llm.llm import LLM
+
+        llm = LLM(
+            model=model,
+            api_key=api_key,
+            base_url=api_base,
+            fallbacks=fallbacks,
+            session_id=self.sid,
+        )
         agent = Agent.get_cls(agent_cls)(llm)
 
         max_iterations = args.get(ConfigType.MAX_ITERATIONS, config.max_iterations)
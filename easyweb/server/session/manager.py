@@ -3,8 +3,14 @@ import time
 from typing import Optional
 
 from fastapi import WebSocket
+from starlette.concurrency import run_in_threadpool
 
+from easyweb.core.config import config
+from easyweb.core.exceptions import SessionCapacityError
 from easyweb.core.logger import easyweb_logger as logger
+from easyweb.core.prometheus import event_stream_pending_events
+from easyweb.server.admission import AdmissionController
+from easyweb.server.registry import WorkerInfo, get_session_registry, get_worker_id
 
 from .session import Session
 
@@ -13,15 +19,87 @@ class SessionManager:
     _sessions: dict[str, Session] = {}
     cleanup_interval: int = 600
     session_timeout: int = 1800
+    draining: bool = False
+    drain_report: dict | None = None
 
     def __init__(self):
+        self.registry = get_session_registry()
+        self.worker_id = get_worker_id()
+        self.admission = AdmissionController.from_config()
+        self.registry.register_worker(
+            WorkerInfo(self.worker_id, config.worker_url or '', load=0)
+        )
         asyncio.create_task(self._cleanup_sessions())
+        asyncio.create_task(self._heartbeat())
+        asyncio.create_task(self._hibernate_idle_sessions())
 
-    def add_or_restart_session(self, sid: str, ws_conn: WebSocket) -> Session:
+    async def add_or_restart_session(self, sid: str, ws_conn: WebSocket) -> Session:
+        """
+        Starts the session, replacing its previous instance if any.
+
+        Raises SessionCapacityError if this is a new session and the server is at
+        capacity, or for any session while draining.
+        """
+        if self.draining:
+            # reconnects go to another worker too
+            raise SessionCapacityError('draining for a restart', retry_after=1)
         if sid in self._sessions:
             asyncio.create_task(self._sessions[sid].close())
-        self._sessions[sid] = Session(sid=sid, ws=ws_conn)
-        return self._sessions[sid]
+        else:
+            self.admission.admit(self.active_sessions, self.browsers)
+        session = Session(sid=sid, ws=ws_conn)
+        self._sessions[sid] = session
+        # reconnects through the router land on the worker holding the session;
+        # the registry may block on SQLite, so it is queried off the loop
+        await run_in_threadpool(self.registry.claim, sid, self.worker_id)
+        return session
+
+    @property
+    def active_sessions(self) -> int:
+        """The number of sessions with a connected client."""
+        return sum(1 for session in self._sessions.values() if session.is_alive)
+
+    def _runtimes(self) -> list:
+        return [
+            session.agent_session.runtime
+            for session in self._sessions.values()
+            if not session.agent_session._closed
+            and session.agent_session.runtime is not None
+        ]
+
+    @property
+    def browsers(self) -> int:
+        """The number of running browser processes."""
+        return sum(1 for runtime in self._runtimes() if runtime.browser is not None)
+
+    @property
+    def sandboxes(self) -> int:
+        """The number of open sandboxes."""
+        return len(self._runtimes())
+
+    @property
+    def hibernated(self) -> int:
+        """The number of sessions with their browser and sandbox released."""
+        return sum(
+            1 for session in self._sessions.values() if session.agent_session.hibernated
+        )
+
+    def agent_states(self) -> dict[str, int]:
+        """The number of held sessions per agent state, 'none' before initialization."""
+        states: dict[str, int] = {}
+        for session in self._sessions.values():
+            agent_state = session.agent_session.agent_state
+            state = agent_state.value if agent_state is not None else 'none'
+            states[state] = states.get(state, 0) + 1
+        return states
+
+    def capacity(self) -> dict:
+        """Capacity gauges: sessions and browsers in use, host headroom and limits."""
+        gauges = self.admission.gauges(self.active_sessions, self.browsers)
+        gauges['hibernated'] = self.hibernated
+        gauges['draining'] = self.draining
+        gauges['admitting'] = gauges['admitting'] and not self.draining
+        return gauges
 
     def get_session(self, sid: str) -> Session | None:
         if sid not in self._sessions:
@@ -57,9 +135,92 @@ class SessionManager:
             for sid in session_ids_to_remove:
                 to_del_session: Optional[Session] = self._sessions.pop(sid, None)
                 if to_del_session is not None:
+                    await run_in_threadpool(self.registry.release, sid, self.worker_id)
                     await to_del_session.close()
                     logger.info(
                         f'Session {sid} and related resource have been removed due to inactivity.'
                     )
 
             await asyncio.sleep(self.cleanup_interval)
+
+    async def _hibernate_idle_sessions(self):
+        if not config.hibernate_after:
+            return
+        interval = max(1, min(60, config.hibernate_after / 4))
+        while True:
+            await asyncio.sleep(interval)
+            idle_since = time.time() - config.hibernate_after
+            for sid, session in list(self._sessions.items()):
+                if self.draining:
+                    break
+                if session.last_active_ts > idle_since:
+                    continue
+                try:
+                    await session.agent_session.hibernate()
+                except Exception as e:
+                    logger.error(f'Failed to hibernate session {sid}: {e}')
+
+    async def _heartbeat(self):
+        interval = max(1, config.worker_ttl / 3)
+        while True:
+            try:
+                await run_in_threadpool(
+                    self.registry.heartbeat, self.worker_id, len(self._sessions)
+                )
+            except Exception as e:
+                logger.warning(f'Session registry heartbeat failed: {e}')
+            await asyncio.sleep(interval)
+
+    def shutdown(self):
+        """Unregisters this worker, so the router stops sending it sessions."""
+        self.registry.remove_worker(self.worker_id)
+
+    def _steps_in_progress(self) -> list[str]:
+        return [
+            sid
+            for sid, session in self._sessions.items()
+            if session.agent_session.controller is not None
+            and session.agent_session.controller.step_in_progress
+        ]
+
+    async def drain(self, deadline: float | None = None) -> dict:
+        """
+        Empties this worker for a restart.
+
+        New sessions and reconnects are refused and the worker leaves the
+        registry, so the router sends clients elsewhere. Running steps get up
+        to `deadline` seconds to finish, then every session is checkpointed and
+        its client told to reconnect to resume from its latest event.
+
+        Returns:
+        - dict: The drain time, and how many sessions were preserved or had their step interrupted
+        """
+        deadline = config.drain_timeout if deadline is None else deadline
+        start = time.monotonic()
+        self.draining = True
+        await run_in_threadpool(self.registry.remove_worker, self.worker_id)
+        logger.info(f'Draining {len(self._sessions)} sessions')
+        for session in self._sessions.values():
+            if session.agent_session.controller is not None:
+                session.agent_session.controller.hold_steps()
+
+        while time.monotonic() - start < deadline:
+            if not self._steps_in_progress() and event_stream_pending_events.get() <= 0:
+                break
+            await asyncio.sleep(0.2)
+        interrupted = self._steps_in_progress()
+
+        preserved = 0
+        sessions = list(self._sessions.items())
+        for sid, session in sessions:
+            if await session.hand_off():
+                preserved += 1
+            self._sessions.pop(sid, None)
+        self.drain_report = {
+            'drain_seconds': round(time.monotonic() - start, 3),
+            'sessions': len(sessions),
+            'sessions_preserved': preserved,
+            'steps_interrupted': len(interrupted),
+        }
+        logger.info(f'Drained: {self.drain_report}')
+        return self.drain_report
@@ -5,8 +5,10 @@ from fastapi import WebSocket, WebSocketDisconnect
 
 from easyweb.core.const.guide_url import TROUBLESHOOTING_URL
 from easyweb.core.logger import easyweb_logger as logger
+from easyweb.core.prometheus import websocket_send_seconds
 from easyweb.core.schema import AgentState
 from easyweb.core.schema.action import ActionType
+from easyweb.core.tracing import span
 from easyweb.events.action import ChangeAgentStateAction, NullAction
 from easyweb.events.event import Event, EventSource
 from easyweb.events.observation import AgentStateChangedObservation, NullObservation
@@ -38,6 +40,38 @@ class Session:
         self.is_alive = False
         await self.agent_session.close()
 
+    async def hand_off(self) -> bool:
+        """
+        Parks the session for another worker to resume and tells the client to reconnect.
+
+        The agent state is checkpointed to the file store; the client
+        reconnects with its token and latest_event_id and re-initializes the
+        agent, which resumes from the checkpoint.
+
+        Returns:
+        - bool: Whether the checkpoint was saved
+        """
+        self.is_alive = False
+        preserved = True
+        try:
+            await self.agent_session.close()
+        except Exception as e:
+            preserved = False
+            logger.error(f'Failed to park session {self.sid}: {e}')
+        if self.websocket is not None:
+            try:
+                await self.websocket.send_json(
+                    {
+                        'reconnect': True,
+                        'message': 'This server is restarting, please reconnect.',
+                    }
+                )
+                # 1012: service restart
+                await self.websocket.close(code=1012)
+            except (WebSocketDisconnect, RuntimeError):
+                pass
+        return preserved
+
     async def loop_recv(self):
         try:
             if self.websocket is None:
@@ -91,10 +125,21 @@ class Session:
             await self.send(event_to_dict(event))
 
     async def dispatch(self, data: dict):
+        self.last_active_ts = int(time.time())
         action = data.get('action', '')
         if action == ActionType.INIT:
             await self._initialize_agent(data)
             return
+        if self.agent_session.hibernated:
+            try:
+                seconds = await self.agent_session.wake()
+            except Exception as e:
+                logger.exception(f'Error waking session {self.sid}: {e}')
+                await self.send_error(
+                    'Error resuming the session. Please re-initialize the agent.'
+                )
+                return
+            await self.send({'rehydrated': True, 'seconds': round(seconds, 3)})
         event = event_from_dict(data.copy())
         await self.agent_session.event_stream.add_event(event, EventSource.USER)
 
@@ -102,8 +147,11 @@ class Session:
         try:
             if self.websocket is None or not self.is_alive:
                 return False
-            await self.websocket.send_json(data)
-            await asyncio.sleep(0.001)  # This flushes the data to the client
+            with span('websocket.send'):
+                start = time.monotonic()
+                await self.websocket.send_json(data)
+                await asyncio.sleep(0.001)  # This flushes the data to the client
+                websocket_send_seconds.observe(time.monotonic() - start)
             self.last_active_ts = int(time.time())
             return True
         except WebSocketDisconnect:
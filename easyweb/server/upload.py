@@ -0,0 +1,66 @@
+import time
+from typing import Awaitable, Callable
+
+from fastapi import UploadFile
+from starlette.concurrency import run_in_threadpool
+
+from easyweb.core.exceptions import UploadTooLargeError
+from easyweb.storage import FileStore
+
+__all__ = ['stream_upload']
+
+CHUNK_SIZE = 1024 * 1024
+# progress is reported at most this often, in seconds
+PROGRESS_INTERVAL = 0.5
+
+
+async def stream_upload(
+    file: UploadFile,
+    store: FileStore,
+    max_bytes: int = 0,
+    on_progress: Callable[[dict], Awaitable] | None = None,
+) -> int:
+    """
+    Copies an uploaded file to the file store chunk by chunk.
+
+    Only one chunk is held in memory at a time; reading the spooled upload
+    and writing to the store both run in the threadpool, so a large upload
+    does not stall the event loop and the other sessions on it.
+
+    Parameters:
+    - file: The uploaded file
+    - store: The file store to write to
+    - max_bytes: The size limit, 0 for no limit. Raises UploadTooLargeError beyond it, leaving no partial file
+    - on_progress: Called with {'filename', 'bytes', 'total'} as the upload advances
+
+    Returns:
+    - int: The size of the file
+    """
+    filename = file.filename or 'upload'
+    total = getattr(file, 'size', None)
+    if max_bytes and total is not None and total > max_bytes:
+        raise UploadTooLargeError(filename, max_bytes)
+    written = 0
+    last_progress = time.monotonic()
+    writer = await run_in_threadpool(store.open_write, filename)
+    try:
+        while chunk := await file.read(CHUNK_SIZE):
+            written += len(chunk)
+            if max_bytes and written > max_bytes:
+                raise UploadTooLargeError(filename, max_bytes)
+            await run_in_threadpool(writer.write, chunk)
+            if (
+                on_progress is not None
+                and time.monotonic() - last_progress >= PROGRESS_INTERVAL
+            ):
+                last_progress = time.monotonic()
+                await on_progress(
+                    {'filename': filename, 'bytes': written, 'total': total}
+                )
+        await run_in_threadpool(writer.close)
+    except BaseException:
+        await run_in_threadpool(writer.abort)
+        raise
+    if on_progress is not None:
+        await on_progress({'filename': filename, 'bytes': written, 'total': written})
+    return written
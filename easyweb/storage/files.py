@@ -1,6 +1,58 @@
 from abc import abstractmethod
 
 
+class FileWriter:
+    """
+    A file written in chunks, e.g. a large upload.
+
+    The file only appears in the store once `close` is called; `abort`
+    discards what was written. Used as a context manager, it is closed on
+    success and aborted on error.
+    """
+
+    @abstractmethod
+    def write(self, chunk: bytes) -> None:
+        pass
+
+    @abstractmethod
+    def close(self) -> None:
+        pass
+
+    @abstractmethod
+    def abort(self) -> None:
+        pass
+
+    def __enter__(self) -> 'FileWriter':
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+
+
+class BufferedFileWriter(FileWriter):
+    """
+    Collects the chunks and writes the file at once, for stores without streaming writes.
+    """
+
+    def __init__(self, store: 'FileStore', path: str):
+        self.store = store
+        self.path = path
+        self.chunks: list[bytes] = []
+
+    def write(self, chunk: bytes) -> None:
+        self.chunks.append(chunk)
+
+    def close(self) -> None:
+        self.store.write(self.path, b''.join(self.chunks))  # type: ignore[arg-type]
+        self.chunks = []
+
+    def abort(self) -> None:
+        self.chunks = []
+
+
 class FileStore:
     @abstractmethod
     def write(self, path: str, contents: str) -> None:
@@ -17,3 +69,10 @@ class FileStore:
     @abstractmethod
     def delete(self, path: str) -> None:
         pass
+
+    def open_write(self, path: str) -> FileWriter:
+        """
+        Opens the file for writing in chunks. Stores that can stream to their
+        backend override this; the default buffers the whole file.
+        """
+        return BufferedFileWriter(self, path)
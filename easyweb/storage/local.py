@@ -1,6 +1,30 @@
 import os
 
-from .files import FileStore
+from .files import FileStore, FileWriter
+
+
+class LocalFileWriter(FileWriter):
+    """
+    Streams to a temporary file next to the target, renamed into place on close.
+    """
+
+    def __init__(self, full_path: str):
+        os.makedirs(os.path.dirname(full_path), exist_ok=True)
+        self.full_path = full_path
+        self.part_path = f'{full_path}.part'
+        self.file = open(self.part_path, 'wb')
+
+    def write(self, chunk: bytes) -> None:
+        self.file.write(chunk)
+
+    def close(self) -> None:
+        self.file.close()
+        os.replace(self.part_path, self.full_path)
+
+    def abort(self) -> None:
+        self.file.close()
+        if os.path.exists(self.part_path):
+            os.remove(self.part_path)
 
 
 class LocalFileStore(FileStore):
@@ -21,6 +45,9 @@ class LocalFileStore(FileStore):
         with open(full_path, 'w') as f:
             f.write(contents)
 
+    def open_write(self, path: str) -> FileWriter:
+        return LocalFileWriter(self.get_full_path(path))
+
     def read(self, path: str) -> str:
         full_path = self.get_full_path(path)
         with open(full_path, 'r') as f:
@@ -1,10 +1,47 @@
 import os
+import tempfile
 
 from minio import Minio
 
-from .files import FileStore
+from .files import FileStore, FileWriter
 
 AWS_S3_ENDPOINT = 's3.amazonaws.com'
+# uploads above this size go to S3 as a multipart upload of parts this size
+MULTIPART_PART_SIZE = 16 * 1024 * 1024
+
+
+class S3FileWriter(FileWriter):
+    """
+    Spools the chunks (in memory up to one part, then on disk) and uploads
+    them on close; minio sends files larger than a part as a multipart upload.
+    """
+
+    def __init__(self, client: Minio, bucket: str, path: str):
+        self.client = client
+        self.bucket = bucket
+        self.path = path
+        self.file = tempfile.SpooledTemporaryFile(max_size=MULTIPART_PART_SIZE)
+        self.size = 0
+
+    def write(self, chunk: bytes) -> None:
+        self.file.write(chunk)
+        self.size += len(chunk)
+
+    def close(self) -> None:
+        try:
+            self.file.seek(0)
+            self.client.put_object(
+                self.bucket,
+                self.path,
+                self.file,
+                length=self.size,
+                part_size=MULTIPART_PART_SIZE,
+            )
+        finally:
+            self.file.close()
+
+    def abort(self) -> None:
+        self.file.close()
 
 
 class S3FileStore(FileStore):
@@ -17,6 +54,9 @@ class S3FileStore(FileStore):
     def write(self, path: str, contents: str) -> None:
         self.client.put_object(self.bucket, path, contents)
 
+    def open_write(self, path: str) -> FileWriter:
+        return S3FileWriter(self.client, self.bucket, path)
+
     def read(self, path: str) -> str:
         return self.client.get_object(self.bucket, path).data.decode('utf-8')
 
@@ -1,17 +1,19 @@
 import argparse
-import base64
+import asyncio
 import json
+import math
 import os
-import queue
+import threading
 import time
+from collections import deque
 from datetime import datetime
-from io import BytesIO
 
 import gradio as gr
 import requests
-import websocket
 from bs4 import BeautifulSoup
-from PIL import Image, UnidentifiedImageError
+from PIL import Image
+
+from easyweb.client import MessageLog, ScreenshotWindow, SessionClient
 
 parser = argparse.ArgumentParser(description='Specify the number of backends to use.')
 parser.add_argument(
@@ -20,6 +22,30 @@ parser.add_argument(
     default=1,
     help='The number of backends to initialize (default: 1)',
 )
+parser.add_argument(
+    '--start-port',
+    type=int,
+    default=5000,
+    help='The port of the first backend (default: 5000)',
+)
+parser.add_argument(
+    '--max-wait',
+    type=float,
+    default=600,
+    help='Seconds a user waits in line for a free backend (default: 600)',
+)
+parser.add_argument(
+    '--health-interval',
+    type=float,
+    default=5,
+    help='Seconds between backend health checks (default: 5)',
+)
+parser.add_argument(
+    '--screenshot-window',
+    type=int,
+    default=8,
+    help='Decoded screenshots kept in memory per session, older ones are reloaded from the log (default: 8)',
+)
 parser.add_argument('--ip', type=str, default=None, help='server name for public demo')
 parser.add_argument(
     '--port', type=int, default=None, help='server port for public demo'
@@ -36,36 +62,188 @@ parser.add_argument(
 )
 args = parser.parse_args()
 
-backend_ports = [5000 + i for i in range(args.num_backends)]
+backend_ports = [args.start_port + i for i in range(args.num_backends)]
 default_api_key = 'sk-123'
 global_sessions = dict()
+# how often a user waiting for a backend sees their position updated
+WAIT_UPDATE_INTERVAL = 2.0
+
+# the websockets of all sessions run on one event loop, gradio worker threads
+# wait on it instead of each blocking on its own socket
+client_loop = asyncio.new_event_loop()
+threading.Thread(target=client_loop.run_forever, daemon=True).start()
+
+
+def run_async(coro):
+    return asyncio.run_coroutine_threadsafe(coro, client_loop).result()
+
+
+class Backend:
+    def __init__(self, port):
+        self.port = port
+        self.url = f'http://127.0.0.1:{port}'
+        # optimistic until the first health check says otherwise
+        self.healthy = True
+        self.failures = 0
+        self.capacity = 1
+        self.sessions = 0
+        self.cpu_load = 0.0
+        self.admitting = True
+        self.leases = 0
+
+    @property
+    def load(self):
+        # our own leases count immediately, the backend's report lags behind
+        return max(self.leases, self.sessions)
+
+    @property
+    def free_slots(self):
+        return self.capacity - self.load
 
 
 class BackendManager:
-    def __init__(self, backend_ports):
-        self.available_ports = queue.Queue()
-        for port in backend_ports:
-            self.available_ports.put(port)
+    """
+    Hands out backends to user sessions.
 
-    def acquire_backend(self):
+    Backends are health checked in the background: a backend failing
+    `max_failures` checks in a row is taken out of rotation until it answers
+    again. A session gets the least-loaded healthy backend with a free slot
+    (backends report how many sessions they serve). When all are busy, users
+    wait in line, with their position and an estimated wait shown.
+    """
+
+    def __init__(
+        self,
+        backend_ports,
+        health_interval=5.0,
+        max_failures=3,
+        default_session_seconds=120.0,
+    ):
+        self.backends = {port: Backend(port) for port in backend_ports}
+        self.health_interval = health_interval
+        self.max_failures = max_failures
+        self.session_seconds = default_session_seconds
+        self.leases = {}
+        self.waiting = deque()
+        self.cond = threading.Condition()
+        threading.Thread(target=self._check_health_loop, daemon=True).start()
+
+    def _check_health_loop(self):
+        while True:
+            for backend in list(self.backends.values()):
+                self._check_health(backend)
+            time.sleep(self.health_interval)
+
+    def _check_health(self, backend):
         try:
-            # Wait indefinitely until a port becomes available
-            port = self.available_ports.get(block=True)
-            print(f'Acquired backend on port {port}')
-            return port
+            response = requests.get(f'{backend.url}/health', timeout=2)
+            response.raise_for_status()
+            report = response.json()
         except Exception as e:
-            print(f'Error acquiring backend: {e}')
+            with self.cond:
+                backend.failures += 1
+                if backend.healthy and backend.failures >= self.max_failures:
+                    backend.healthy = False
+                    print(f'Removing backend on port {backend.port}: {e}')
+            return
+        with self.cond:
+            if not backend.healthy:
+                print(f'Backend on port {backend.port} is back')
+            backend.healthy = True
+            backend.failures = 0
+            backend.capacity = report.get('capacity') or 1
+            backend.sessions = report.get('sessions') or 0
+            backend.cpu_load = report.get('cpu_load') or 0.0
+            # out of memory or CPU headroom, whatever its session count
+            backend.admitting = report.get('admitting', True)
+            self.cond.notify_all()
+
+    def _pick(self):
+        candidates = [
+            backend
+            for backend in self.backends.values()
+            if backend.healthy and backend.admitting and backend.free_slots > 0
+        ]
+        if not candidates:
             return None
+        return min(
+            candidates,
+            key=lambda backend: (backend.load / backend.capacity, backend.cpu_load),
+        )
 
-    def release_backend(self, port):
-        if port in self.available_ports.queue:
-            print(f'{port} already available')
-        else:
-            self.available_ports.put(port, block=True)
-            print(f'Released backend on port {port}')
+    def _eta(self, position):
+        capacity = sum(
+            backend.capacity for backend in self.backends.values() if backend.healthy
+        )
+        return math.ceil(position / max(capacity, 1)) * self.session_seconds
+
+    def acquire_backend(self, owner, timeout):
+        """
+        Waits up to `timeout` seconds for a backend for the user session `owner`.
+
+        Yields (port, position, eta) tuples: port is None while waiting in
+        line, with the 1-based position and the estimated wait in seconds. The
+        last tuple has the acquired port, or None if the wait timed out.
+        """
+        deadline = time.monotonic() + timeout
+        with self.cond:
+            self.waiting.append(owner)
+        try:
+            while True:
+                port = None
+                with self.cond:
+                    backend = self._pick() if self.waiting[0] == owner else None
+                    if backend is not None:
+                        self.waiting.popleft()
+                        backend.leases += 1
+                        port = backend.port
+                        self.leases[owner] = (port, time.monotonic())
+                        # the next in line may fit as well
+                        self.cond.notify_all()
+                    else:
+                        remaining = deadline - time.monotonic()
+                        if remaining > 0:
+                            self.cond.wait(min(remaining, WAIT_UPDATE_INTERVAL))
+                        position = self.waiting.index(owner) + 1
+                        eta = self._eta(position)
+                # never yield holding the lock: the caller may take its time
+                if port is not None:
+                    print(f'Acquired backend on port {port}')
+                    yield port, 0, 0
+                    return
+                if remaining <= 0:
+                    print(f'Timed out waiting for a backend at position {position}')
+                    yield None, position, eta
+                    return
+                yield None, position, eta
+        finally:
+            with self.cond:
+                if owner in self.waiting:
+                    self.waiting.remove(owner)
+                    self.cond.notify_all()
+
+    def mark_unavailable(self, port):
+        """Takes a draining backend out of rotation until its next health check."""
+        with self.cond:
+            self.backends[port].admitting = False
+
+    def release_backend(self, owner):
+        with self.cond:
+            lease = self.leases.pop(owner, None)
+            if lease is None:
+                return
+            port, acquired = lease
+            backend = self.backends[port]
+            backend.leases = max(0, backend.leases - 1)
+            # moving average of session length, for the wait estimate
+            self.session_seconds = 0.8 * self.session_seconds + 0.2 * (
+                time.monotonic() - acquired
+            )
+            self.cond.notify_all()
+        print(f'Released backend on port {port}')
 
 
-backend_manager = BackendManager(backend_ports)
+backend_manager = BackendManager(backend_ports, health_interval=args.health_interval)
 
 
 class EasyWebSession:
@@ -98,25 +276,21 @@ class EasyWebSession:
         formatted_now = now.strftime('%Y-%m-%d-%H:%M:%S')
         formatted_model = self.model.replace('/', '-')
         self.output_path = (
-            f'frontend_logs/{formatted_now}_{self.agent}_{formatted_model}_steps.json'
+            f'frontend_logs/{formatted_now}_{self.agent}_{formatted_model}_steps.jsonl'
         )
 
         self.agent_state = None
-        if self.ws:
+        if self.client:
             self._reset()
-        self.ws = websocket.WebSocket()
-        self.ws.connect(f'ws://127.0.0.1:{self.port}/ws')
-
-        payload = {
-            'action': 'initialize',
-            'args': {
-                'LLM_MODEL': self.model,
-                'AGENT': self.agent,
-                'LANGUAGE': self.language,
-                'LLM_API_KEY': self.api_key,
-            },
-        }
-        self.ws.send(json.dumps(payload))
+        # raw messages are streamed to the log rather than kept for save_log
+        self.client = SessionClient(
+            f'http://127.0.0.1:{self.port}',
+            MessageLog(self.output_path),
+            args.screenshot_window,
+        )
+        self.browser_history = self.client.screenshots
+        run_async(self.client.connect())
+        run_async(self.client.send(self._initialize_payload()))
 
         while self.agent_state != 'init':
             message = self._get_message()
@@ -128,13 +302,40 @@ class EasyWebSession:
                     yield self.agent_state
         print(f'{self.agent} Initialized')
 
+    def _initialize_payload(self):
+        return {
+            'action': 'initialize',
+            'args': {
+                'LLM_MODEL': self.model,
+                'AGENT': self.agent,
+                'LANGUAGE': self.language,
+                'LLM_API_KEY': self.api_key,
+            },
+        }
+
+    def _reconnect(self, owner):
+        # the backend is draining for a restart: resume the session on another one
+        print(f'Backend on port {self.port} is restarting, reconnecting')
+        backend_manager.mark_unavailable(self.port)
+        backend_manager.release_backend(owner)
+        port = None
+        for port, _, _ in backend_manager.acquire_backend(owner, args.max_wait):
+            pass
+        if port is None:
+            raise ConnectionError('No backend available to resume the session')
+        self.port = port
+        # with the token and the latest event id received so far
+        run_async(self.client.connect(f'http://127.0.0.1:{port}'))
+        # the agent resumes from the state checkpointed by the previous backend
+        run_async(self.client.send(self._initialize_payload()))
+
     def stop(self):
         # if self.agent_state != 'running':
         #     raise ValueError('Agent not running, nothing to stop')
         print('Stopping')
 
         payload = {'action': 'change_agent_state', 'args': {'agent_state': 'stopped'}}
-        self.ws.send(json.dumps(payload))
+        run_async(self.client.send(payload))
 
         self.agent_state = 'stopped'
         self._reset
@@ -147,36 +348,26 @@ class EasyWebSession:
 
         if task is not None:
             payload = {'action': 'message', 'args': {'content': task}}
-            self.ws.send(json.dumps(payload))
+            run_async(self.client.send(payload))
 
         try:
             while self.agent_state not in ['finished', 'stopped']:
                 message = self._get_message()
+                if message.get('reconnect'):
+                    self._reconnect(request.session_hash)
+                    continue
                 self._read_message(message)
 
                 print(self.agent_state)
                 yield message
         finally:
             if request.session_hash in global_sessions.keys():
-                backend_manager.release_backend(self.port)
+                backend_manager.release_backend(request.session_hash)
                 del global_sessions[request.session_hash]
 
     def _get_message(self):
-        response = self.ws.recv()
-        try:
-            message = json.loads(response)
-            message_size = len(str(message))
-            print(f'Received message of size: {message_size}')
-        except json.decoder.JSONDecodeError as e:
-            print(e)
-            print(response)
-            message = {
-                'action': 'error',
-                'message': 'Received JSON response cannot be parsed. Skipping..',
-                'response': response,
-            }
-
-        self.raw_messages.append(message)
+        message = run_async(self.client.recv())
+        print(f'Received message of size: {len(str(message))}')
         return message
 
     def _read_message(self, message, verbose=True):
@@ -202,16 +393,13 @@ class EasyWebSession:
                 self.action_history.append((0, message['message']))
 
             printable = {k: v for k, v in message.items() if k not in 'args'}
-        elif 'extras' in message and 'screenshot' in message['extras']:
-            image_data = base64.b64decode(message['extras']['screenshot'])
-            try:
-                screenshot = Image.open(BytesIO(image_data))
-                url = message['extras']['url']
+        elif 'screenshot_index' in message:
+            # the client has added it to self.browser_history
+            if message['screenshot_index'] is not None:
                 printable = {
                     k: v for k, v in message.items() if k not in ['extras', 'content']
                 }
-                self.browser_history.append((screenshot, url))
-            except UnidentifiedImageError:
+            else:
                 err_msg = (
                     'Failure to receive screenshot, likely due to a server-side error.'
                 )
@@ -220,22 +408,23 @@ class EasyWebSession:
             print(printable)
 
     def _reset(self, agent_state=None):
+        if getattr(self, 'client', None) is not None:
+            run_async(self.client.close())
         self.token, self.status = None, None
-        self.ws, self.agent_state = None, agent_state
-        self.raw_messages = []
-        self.browser_history = []
+        self.client, self.agent_state = None, agent_state
+        self.browser_history = ScreenshotWindow(args.screenshot_window)
         self.action_history = []
         self.last_active_strategy = ''
         self.action_messages = []
 
     def save_log(self):
         print(f'Closing connection {self.token}')
-        if self.ws:
-            self.ws.close()
+        if self.client:
+            # the messages are already in the log
+            run_async(self.client.close())
 
         if self.output_path:
-            print('Saving log to', self.output_path)
-            json.dump(self.raw_messages, open(self.output_path, 'w'))
+            print('Saved log to', self.output_path)
 
     def save_user_feedback(self, vote):
         path = self.output_path
@@ -243,17 +432,12 @@ class EasyWebSession:
             stars = 1
         else:
             stars = 0
-        try:
-            if os.path.exists(path):
-                with open(path, 'r') as file:
-                    f = json.load(file)
-            else:
-                f = self.raw_messages
-            f.insert(0, {'user feedback: ': stars})
-            json.dump(f, open(path, 'w'))
-            print('User feedback saved!')
-        except Exception:
+        if not os.path.exists(path):
             print("Couldn't find output log: " + str(path) + '.')
+            return
+        with open(path, 'a') as f:
+            f.write(json.dumps({'user feedback: ': stars}) + '\n')
+        print('User feedback saved!')
 
 
 def get_status(agent_state):
@@ -328,21 +512,60 @@ def get_messages(
         # if session is not None and session.agent_state is not None:
         #     stop_flag = session.agent_state == 'stopped'
 
+        port = None
+        if user_message is None:
+            chat_history = chat_history[:-1]
+        else:
+            # a backend is only needed once there is a task to run
+            for port, position, eta in backend_manager.acquire_backend(
+                request.session_hash, args.max_wait
+            ):
+                if port is not None:
+                    break
+                chat_history[-1] = gr.ChatMessage(
+                    role='assistant',
+                    content=f'⏳ All browsers are busy. You are number {position} in line, '
+                    f'about {max(1, round(eta / 60))} min left...',
+                ).__dict__
+                screenshot, url = browser_history[-1]
+                yield (
+                    chat_history,
+                    screenshot,
+                    url,
+                    action_messages,
+                    browser_history,
+                    session,
+                    get_status(None),
+                    gr.Button('🗑️ Clear', interactive=False),
+                    options_visible,
+                    gr.Button('👍 Good Response', interactive=False),
+                    gr.Button('👎 Bad Response', interactive=False),
+                    gr.Button(
+                        'Submit',
+                        variant='primary',
+                        scale=1,
+                        min_width=150,
+                        visible=False,
+                    ),
+                    gr.Button('Stop', scale=1, min_width=150, visible=False),
+                )
+            if port is None:
+                chat_history[-1] = gr.ChatMessage(
+                    role='assistant',
+                    content='All browsers are still busy. Please try again in a few minutes.',
+                ).__dict__
+                user_message = None
+
         new_session = EasyWebSession(
             agent=agent_selection,
-            port=backend_manager.acquire_backend(),
+            port=port,
             model=model_selection,
             # api_key=api_key if model_requires_key[model_selection] else default_api_key,
             api_key=api_key,
         )
         session = new_session
-        if request.session_hash not in global_sessions.keys():
+        if user_message is not None and request.session_hash not in global_sessions:
             global_sessions[request.session_hash] = session
-        if user_message is None:
-            backend_manager.release_backend(session.port)
-            del global_sessions[request.session_hash]
-            session.agent_state = None
-            chat_history = chat_history[:-1]
 
     if (
         session.agent_state is None or session.agent_state in ['finished', 'stopped']
@@ -570,9 +793,7 @@ def get_messages(
                 chat_history = display_history(
                     chat_history, sites_visited, action_messages
                 )
-            while len(session.browser_history) > (len(browser_history) - 1):
-                diff = len(session.browser_history) - (len(browser_history) - 1)
-                browser_history.append(session.browser_history[-diff])
+            sync_browser_history(browser_history, session)
             screenshot, url = browser_history[-1]
 
             submit = gr.Button(
@@ -602,6 +823,24 @@ def get_messages(
             )
 
 
+def sync_browser_history(browser_history, session):
+    """
+    Appends the pages the session visited to the gradio state.
+
+    Only the latest entry keeps its screenshot; the session's window keeps the
+    recent ones, so the state stays small over a long session.
+    """
+    new_pages = len(session.browser_history) - (len(browser_history) - 1)
+    if new_pages <= 0:
+        return
+    # the first entry is the blank page
+    if len(browser_history) > 1:
+        browser_history[-1] = (None, browser_history[-1][1])
+    for url in session.browser_history.urls()[-new_pages:-1]:
+        browser_history.append((None, url))
+    browser_history.append(session.browser_history[-1])
+
+
 def clear_page(browser_history, session):
     browser_history = browser_history[:1]
     current_screenshot, current_url = browser_history[-1]
@@ -797,7 +1036,7 @@ def toggle_options(visible, ifClick):
 def unload_fn(request: gr.Request):
     if request.session_hash in global_sessions.keys():
         global_sessions[request.session_hash].stop()
-        backend_manager.release_backend(global_sessions[request.session_hash].port)
+        backend_manager.release_backend(request.session_hash)
         del global_sessions[request.session_hash]
 
 
@@ -1108,7 +1347,8 @@ Include specific websites or detailed instructions in your prompt for more consi
                 submit,
                 stop,
             ],
-            concurrency_limit=args.num_backends,
+            # the backend manager queues users and bounds their wait
+            concurrency_limit=None,
         )
         (
             stop.click(
@@ -8,6 +8,7 @@ import gradio as gr
 import plotly.graph_objects as go
 from PIL import Image, UnidentifiedImageError
 
+from easyweb.client import load_messages
 from my_frontend import (
     LABEL_LEN,
     LINE_LEN,
@@ -175,7 +176,7 @@ class TestSession:
 
 
 def load_history(log_selection):
-    messages = json.load(open(log_selection, 'r'))
+    messages = load_messages(log_selection)
     self = TestSession()
     for message in messages:
         self._read_message(message, verbose=False)
@@ -249,7 +250,7 @@ def load_history(log_selection):
 
 
 def select_log_dir(log_dir_selection):
-    log_list = list(reversed(sorted(glob(f'./{log_dir_selection}/*.json'))))
+    log_list = list(reversed(sorted(glob(f'./{log_dir_selection}/*.json*'))))
     return gr.Dropdown(
         log_list,
         value=None,
@@ -260,7 +261,7 @@ def select_log_dir(log_dir_selection):
 
 
 def refresh_log_selection(log_dir_selection):
-    log_list = list(reversed(sorted(glob(f'./{log_dir_selection}/*.json'))))
+    log_list = list(reversed(sorted(glob(f'./{log_dir_selection}/*.json*'))))
     return gr.Dropdown(
         log_list,
         value=None,
@@ -281,7 +282,7 @@ if __name__ == '__main__':
                     log_dir_options = glob('**/*_logs/', recursive=True)
                     default_logdir = log_dir_options[-1]
                     log_list = list(
-                        reversed(sorted(glob(f'./{default_logdir}/*.json')))
+                        reversed(sorted(glob(f'./{default_logdir}/*.json*')))
                     )
                     log_dir_selection = gr.Dropdown(
                         log_dir_options, value=default_logdir, label='Log Directory'
@@ -0,0 +1,43 @@
+import pytest
+
+from easyweb.core.exceptions import SessionCapacityError
+from easyweb.server.admission import AdmissionController, HostSample
+
+
+def controller(sample=None, **limits):
+    if sample is None:
+        sample = HostSample(4096, 0.5)
+    admission = AdmissionController(**limits)
+    admission.host = lambda: sample
+    return admission
+
+
+def test_session_and_browser_limits():
+    admission = controller(max_sessions=2, max_browsers=1, retry_after=7)
+    admission.admit(sessions=1, browsers=0)
+    with pytest.raises(SessionCapacityError) as e:
+        admission.admit(sessions=2, browsers=0)
+    assert e.value.retry_after == 7
+    with pytest.raises(SessionCapacityError):
+        admission.admit(sessions=0, browsers=1)
+    assert (admission.admitted, admission.rejected) == (1, 2)
+
+
+def test_host_headroom():
+    admission = controller(HostSample(100, 0.5), min_free_memory_mb=256)
+    with pytest.raises(SessionCapacityError, match='memory'):
+        admission.admit(sessions=0, browsers=0)
+    admission = controller(HostSample(4096, 3.0), max_cpu_load=2.0)
+    with pytest.raises(SessionCapacityError, match='CPU'):
+        admission.admit(sessions=0, browsers=0)
+    # unknown headroom (no /proc/meminfo, no load average) does not block
+    controller(HostSample(None, None), min_free_memory_mb=256, max_cpu_load=2.0).admit(
+        sessions=0, browsers=0
+    )
+
+
+def test_gauges():
+    gauges = controller(max_sessions=1).gauges(sessions=1, browsers=1)
+    assert gauges['sessions'] == 1
+    assert gauges['free_memory_mb'] == 4096
+    assert not gauges['admitting']
@@ -0,0 +1,104 @@
+import asyncio
+import time
+from types import SimpleNamespace
+
+from easyweb.controller.agent import Agent
+from easyweb.controller.agent_controller import AgentController
+from easyweb.core.cancellation import raise_if_cancelled
+from easyweb.core.metrics import Metrics
+from easyweb.events.action import CmdRunAction, NullAction
+from easyweb.events.stream import EventStream, EventStreamSubscriber
+from easyweb.runtime.runtime import Runtime
+
+
+class AsyncAgent(Agent):
+    def __init__(self, delay: float = 0.0):
+        super().__init__(SimpleNamespace(metrics=Metrics()))
+        self.delay = delay
+        self.started = asyncio.Event()
+
+    def step(self, state):
+        raise AssertionError('the controller should await astep')
+
+    async def astep(self, state):
+        self.started.set()
+        await asyncio.sleep(self.delay)
+        return NullAction()
+
+    def search_memory(self, query: str) -> list[str]:
+        return []
+
+
+class CommandAgent(AsyncAgent):
+    async def astep(self, state):
+        return CmdRunAction(command='sleep 10')
+
+
+def make_controller(agent: Agent, sid: str) -> AgentController:
+    # a delegate does not start its own step loop
+    return AgentController(agent, EventStream(sid), sid=sid, is_delegate=True)
+
+
+def test_run_agent_step_awaits_astep():
+    async def run():
+        agent = AsyncAgent()
+        controller = make_controller(agent, 'controller-astep')
+        await controller._run_agent_step()
+        assert agent.started.is_set()
+        assert controller.state.iteration == 1
+
+    asyncio.run(run())
+
+
+def test_cancel_step_interrupts_astep():
+    async def run():
+        agent = AsyncAgent(delay=10)
+        controller = make_controller(agent, 'controller-cancel')
+        step = asyncio.create_task(controller._run_agent_step())
+        await agent.started.wait()
+        start = time.monotonic()
+        controller.cancel_step('stopped by the user')
+        await asyncio.wait_for(step, timeout=1)
+        assert time.monotonic() - start < 1
+        assert controller._step_token is None
+        assert len(agent.llm.metrics.cancel_latencies) == 1
+
+    asyncio.run(run())
+
+
+def test_cancel_step_interrupts_only_the_runtime():
+    async def run():
+        stream = EventStream('controller-cancel-action')
+        controller = make_controller(CommandAgent(), 'controller-cancel-action')
+        controller.event_stream = stream
+        started = asyncio.Event()
+
+        async def run_action(action):
+            started.set()
+            while True:
+                await asyncio.sleep(0.01)
+                raise_if_cancelled()
+
+        runtime = SimpleNamespace(run_action=run_action, event_stream=stream)
+        seen = []
+
+        async def on_server_event(event):
+            seen.append(event)
+
+        stream.subscribe(
+            EventStreamSubscriber.RUNTIME,
+            lambda event: Runtime.on_event(runtime, event),
+        )
+        stream.subscribe(EventStreamSubscriber.SERVER, on_server_event)
+
+        step = asyncio.create_task(controller._run_agent_step())
+        await started.wait()
+        controller.cancel_step('stopped by the user')
+        await asyncio.wait_for(step, timeout=1)
+        assert controller._pending_action is None
+        assert controller._step_token is None
+        assert len(controller.agent.llm.metrics.cancel_latencies) == 1
+        # the subscribers after the runtime still get the action
+        assert [type(event) for event in seen] == [CmdRunAction]
+
+    asyncio.run(run())
@@ -0,0 +1,124 @@
+import asyncio
+import json
+
+from easyweb.core.schema import AgentState
+from easyweb.storage import InMemoryFileStore
+
+
+class _Browser:
+    def __init__(self):
+        self.restored = []
+
+    def snapshot(self):
+        return {'urls': ['https://example.com'], 'active_page_index': 0}
+
+    def restore(self, snapshot):
+        self.restored.append(snapshot)
+
+
+class _Runtime:
+    def __init__(self):
+        self.browser = _Browser()
+        self.file_store = InMemoryFileStore()
+        self.released = False
+
+    def detach(self):
+        pass
+
+    def release(self):
+        self.released = True
+
+    def close(self):
+        self.release()
+
+
+class _State:
+    agent_state = AgentState.AWAITING_USER_INPUT
+    resume_state = None
+
+    def save_to_session(self, sid):
+        pass
+
+
+class _Tracer:
+    spans: list = []
+
+
+class _Controller:
+    step_in_progress = False
+
+    def __init__(self):
+        self.state = _State()
+        self.tracer = _Tracer()
+
+    def get_state(self):
+        return self.state
+
+    def get_agent_state(self):
+        return self.state.agent_state
+
+    async def close(self, set_stop_state=True):
+        pass
+
+
+def _session(sid):
+    # importing the session package starts the session manager, which needs a running loop
+    from easyweb.server.session.agent import AgentSession
+
+    session = AgentSession(sid)
+    runtimes = []
+
+    async def create_runtime():
+        session.runtime = _Runtime()
+        runtimes.append(session.runtime)
+
+    async def create_controller(start_event):
+        session.controller = _Controller()
+        # a restarted controller loads its checkpoint
+        session.controller.state.agent_state = AgentState.LOADING
+
+    session._create_runtime = create_runtime
+    session._create_controller = create_controller
+    return session, runtimes
+
+
+def test_hibernate_wake_restores_browser_and_workspace():
+    async def run():
+        session, runtimes = _session('hibernate-wake')
+        await session.start({})
+        session.controller.state.agent_state = AgentState.AWAITING_USER_INPUT
+        session.runtime.file_store.write('notes.txt', 'kept')
+        snapshot = session.runtime.browser.snapshot()
+
+        assert await session.hibernate()
+        assert session.hibernated and session.runtime is None
+        assert runtimes[0].released
+        assert session.agent_state == AgentState.AWAITING_USER_INPUT
+        assert session.file_store.read('notes.txt') == 'kept'
+        stored = session.event_stream._file_store.read(session._browser_snapshot_path)
+        assert json.loads(stored) == snapshot
+
+        await session.wake()
+        assert not session.hibernated
+        assert session.runtime is runtimes[1]
+        assert session.runtime.browser.restored == [snapshot]
+        assert session.agent_state == AgentState.AWAITING_USER_INPUT
+        assert session.file_store.read('notes.txt') == 'kept'
+
+        # restored once; a later restart starts from a blank browser
+        assert not session.event_stream._file_store.list('sessions/hibernate-wake/')
+        assert await session.wake() == 0.0
+        assert len(runtimes) == 2
+
+    asyncio.run(run())
+
+
+def test_busy_session_is_not_hibernated():
+    async def run():
+        session, runtimes = _session('hibernate-busy')
+        await session.start({})
+        session.controller.state.agent_state = AgentState.RUNNING
+        assert not await session.hibernate()
+        assert session.runtime is runtimes[0] and not runtimes[0].released
+
+    asyncio.run(run())
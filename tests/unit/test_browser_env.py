@@ -0,0 +1,47 @@
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from easyweb.runtime.browser.browser_env import BrowserEnv
+
+
+def _browser_env():
+    # the queues and lock of a BrowserEnv, answered by a thread instead of a browser process
+    env = BrowserEnv.__new__(BrowserEnv)
+    env.browser_queue = queue.Queue()
+    env.agent_queue = queue.Queue()
+    env._request_lock = threading.Lock()
+
+    def serve():
+        while True:
+            request_id, action_data = env.browser_queue.get()
+            if request_id == 'SHUTDOWN':
+                return
+            if request_id == 'IS_ALIVE':
+                env.agent_queue.put(('ALIVE', None))
+                continue
+            time.sleep(0.01)
+            env.agent_queue.put((request_id, {'request': action_data}))
+
+    threading.Thread(target=serve, daemon=True).start()
+    return env
+
+
+def test_concurrent_requests_get_their_own_response():
+    env = _browser_env()
+    with ThreadPoolExecutor(max_workers=3) as executor:
+        step = executor.submit(env._step, 'noop()', 5)
+        snapshot = executor.submit(env.snapshot, 5)
+        alive = executor.submit(env.check_alive, 5)
+        assert step.result() == {'request': {'action': 'noop()'}}
+        assert snapshot.result() == {'request': {'snapshot': True}}
+        assert alive.result() is True
+    env.browser_queue.put(('SHUTDOWN', None))
+
+
+def test_late_response_is_skipped():
+    env = _browser_env()
+    env.agent_queue.put(('cancelled-request', {'request': 'stale'}))
+    assert env.snapshot(5) == {'request': {'snapshot': True}}
+    env.browser_queue.put(('SHUTDOWN', None))
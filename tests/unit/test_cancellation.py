@@ -0,0 +1,39 @@
+import threading
+import time
+
+import pytest
+
+from easyweb.core.cancellation import (
+    CancellationToken,
+    cancellable_sleep,
+    get_current_token,
+    raise_if_cancelled,
+    use_token,
+)
+from easyweb.core.exceptions import AgentStepCancelledError
+
+
+def test_no_token_is_noop():
+    assert get_current_token() is None
+    raise_if_cancelled()
+
+
+def test_cancelled_token_raises():
+    token = CancellationToken()
+    with use_token(token):
+        raise_if_cancelled()
+        token.cancel('agent stopped')
+        with pytest.raises(AgentStepCancelledError, match='agent stopped'):
+            raise_if_cancelled()
+    assert get_current_token() is None
+
+
+def test_sleep_wakes_up_on_cancel():
+    token = CancellationToken()
+    threading.Timer(0.05, token.cancel).start()
+    start = time.monotonic()
+    with use_token(token):
+        with pytest.raises(AgentStepCancelledError):
+            cancellable_sleep(10)
+    assert time.monotonic() - start < 5
+    assert token.time_since_cancel() is not None
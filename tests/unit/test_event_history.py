@@ -0,0 +1,85 @@
+import asyncio
+
+from easyweb.core.schema import AgentState
+from easyweb.events import EventSource, EventStream
+from easyweb.events.action import MessageAction
+from easyweb.events.observation import (
+    AgentStateChangedObservation,
+    AgentThoughtObservation,
+    BrowserOutputObservation,
+)
+from easyweb.events.stream import EventStreamSubscriber
+from easyweb.server.history import decode_screenshot, latest_screenshot, page_events
+
+
+def make_stream(sid: str) -> EventStream:
+    stream = EventStream(sid)
+
+    async def add_events():
+        for i in range(5):
+            await stream.add_event(MessageAction(f'message {i}'), EventSource.USER)
+            await stream.add_event(
+                AgentStateChangedObservation('', AgentState.RUNNING), EventSource.AGENT
+            )
+        await stream.add_event(
+            BrowserOutputObservation('page', url='https://a.b', screenshot='iVBO'),
+            EventSource.AGENT,
+        )
+
+    asyncio.run(add_events())
+    return stream
+
+
+def test_page_after_cursor():
+    stream = make_stream('history-after')
+    page = page_events(stream, limit=2)
+    assert [event['args']['content'] for event in page.events] == [
+        'message 0',
+        'message 1',
+    ]
+    assert page.has_more
+
+    contents = []
+    while page.has_more:
+        page = page_events(stream, after=page.after, limit=2)
+        contents.extend(
+            event.get('content') or event['args']['content'] for event in page.events
+        )
+    assert contents == ['message 2', 'message 3', 'message 4', 'page']
+    assert page.after == stream.latest_id
+
+
+def test_page_before_cursor_drops_screenshots():
+    stream = make_stream('history-before')
+    page = page_events(stream, before=stream.latest_id + 1, limit=2)
+    assert [event['id'] for event in page.events] == [8, 10]
+    assert 'screenshot' not in page.events[-1]['extras']
+    assert page.events[-1]['screenshot_ref'] == '/api/events/10/screenshot'
+
+    page = page_events(stream, before=page.before, limit=10)
+    assert [event['id'] for event in page.events] == [0, 2, 4, 6]
+    assert not page.has_more
+
+
+def test_latest_screenshot():
+    stream = make_stream('history-screenshot')
+    assert latest_screenshot(stream)['id'] == 10
+    image, media_type = decode_screenshot('data:image/jpeg;base64,aGk=')
+    assert (image, media_type) == (b'hi', 'image/jpeg')
+
+
+def test_published_event_is_not_persisted():
+    stream = make_stream('history-publish')
+    received = {EventStreamSubscriber.SERVER: [], EventStreamSubscriber.TEST: []}
+
+    for subscriber, events in received.items():
+
+        async def on_event(event, events=events):
+            events.append(event)
+
+        stream.subscribe(subscriber, on_event)
+    latest_id = stream.latest_id
+    asyncio.run(stream.publish(AgentThoughtObservation('thinking'), EventSource.AGENT))
+    assert [e.content for e in received[EventStreamSubscriber.SERVER]] == ['thinking']
+    assert received[EventStreamSubscriber.TEST] == []
+    assert stream.latest_id == latest_id
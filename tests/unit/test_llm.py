@@ -0,0 +1,91 @@
+import asyncio
+
+from easyweb.llm.llm import LLM
+
+
+def test_acompletion_accounts_cost():
+    llm = LLM(model='gpt-4o', api_key='sk-test')
+    messages = [{'role': 'user', 'content': 'Hello'}]
+    resp = asyncio.run(llm.ado_completion(messages=messages, mock_response='Hi!'))
+    assert resp['choices'][0]['message']['content'] == 'Hi!'
+    assert llm.metrics.accumulated_cost > 0
+
+
+def test_stream_completion_stops_on_complete_action():
+    llm = LLM(model='gpt-4o', api_key='sk-test')
+    messages = [{'role': 'user', 'content': 'Hello'}]
+    partials = []
+    resp = llm.stream_completion(
+        messages=messages,
+        mock_response='Click it.\n```click("a")\n```\nand then some more text',
+        on_partial=partials.append,
+        is_complete=lambda text: text.count('```') >= 2,
+    )
+    content = resp['choices'][0]['message']['content']
+    assert content.startswith('Click it.\n```click("a")\n```')
+    assert 'more text' not in content
+    assert partials[-1] == content
+    assert resp.usage.completion_tokens > 0
+    assert len(llm.metrics.time_to_first_action) == 1
+
+
+def test_stream_holds_rate_limit_slot_until_done():
+    llm = LLM(model='gpt-4o', api_key='sk-test')
+    limiter = llm._get_rate_limiter('gpt-4o', None)
+    in_flight = []
+    llm.stream_completion(
+        messages=[{'role': 'user', 'content': 'Hello'}],
+        mock_response='Click it.',
+        on_partial=lambda text: in_flight.append(limiter.in_flight),
+    )
+    assert in_flight and min(in_flight) == 1
+    assert limiter.in_flight == 0
+
+
+def test_streamed_response_is_logged_with_the_prompt_id(monkeypatch):
+    llm = LLM(model='gpt-4o', api_key='sk-test')
+    ids = iter(['first', 'second'])
+    logged = []
+    monkeypatch.setattr(llm, '_sample_log', lambda: next(ids))
+    monkeypatch.setattr(
+        llm, '_log_prompt', lambda args, kwargs, log_id: logged.append(log_id)
+    )
+    monkeypatch.setattr(
+        llm, '_log_response', lambda content, log_id: logged.append(log_id)
+    )
+    llm.stream_completion(
+        messages=[{'role': 'user', 'content': 'Hello'}], mock_response='Hi!'
+    )
+    assert logged == ['first', 'first']
+
+
+def test_completion_tokens_and_latency_are_recorded():
+    llm = LLM(model='gpt-4o', api_key='sk-test')
+    messages = [{'role': 'user', 'content': 'Hello'}]
+    llm.completion(messages=messages, mock_response='Hi!')
+    [record] = llm.metrics.completions
+    assert record.model == 'gpt-4o'
+    assert record.prompt_tokens > 0 and record.completion_tokens > 0
+    assert record.retries == 0
+    summary = llm.metrics.completion_summary()['gpt-4o']
+    assert summary['requests'] == 1
+    assert summary['latency_p99'] >= summary['latency_p50'] > 0
+
+
+def test_batch_completion_keeps_order_and_partial_failures():
+    llm = LLM(model='gpt-4o', api_key='sk-test', num_retries=1)
+    messages = [{'role': 'user', 'content': 'Hello'}]
+    requests = [
+        {'messages': messages, 'mock_response': 'first'},
+        {'messages': messages, 'mock_response': ValueError('boom')},
+        {'messages': messages, 'mock_response': 'third'},
+    ]
+    results = llm.batch_completion(requests, max_concurrency=2)
+    assert results[0]['choices'][0]['message']['content'] == 'first'
+    assert isinstance(results[1], Exception)
+    assert results[2]['choices'][0]['message']['content'] == 'third'
+
+    results = asyncio.run(llm.abatch_completion(requests, max_concurrency=2))
+    assert results[0]['choices'][0]['message']['content'] == 'first'
+    assert isinstance(results[1], Exception)
+    assert results[2]['choices'][0]['message']['content'] == 'third'
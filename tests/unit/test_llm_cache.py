@@ -0,0 +1,84 @@
+import time
+
+from easyweb.core.config import config
+from easyweb.llm.cache import (
+    InMemoryResponseCache,
+    SQLiteResponseCache,
+    make_cache_key,
+)
+from easyweb.llm.llm import LLM
+
+
+def test_cache_key_ignores_unrelated_params():
+    params = {'model': 'gpt-4o', 'messages': [{'role': 'user', 'content': 'hi'}]}
+    key = make_cache_key(params)
+    assert key == make_cache_key({**params, 'timeout': 10, 'api_key': 'sk-test'})
+    assert key != make_cache_key({**params, 'temperature': 0.5})
+
+
+def test_cache_key_covers_every_completion_param():
+    params = {'model': 'gpt-4o', 'messages': [{'role': 'user', 'content': 'hi'}]}
+    key = make_cache_key(params)
+    assert key == make_cache_key({**params, 'seed': None})
+    for name, value in [
+        ('n', 2),
+        ('seed', 1),
+        ('base_url', 'http://localhost:8000'),
+        ('tools', [{'type': 'function', 'function': {'name': 'click'}}]),
+        ('tool_choice', 'auto'),
+        ('response_format', {'type': 'json_object'}),
+        ('logit_bias', {'50256': -100}),
+        ('mock_response', 'hi'),
+    ]:
+        assert key != make_cache_key({**params, name: value}), name
+
+
+def test_in_memory_cache_evicts_least_recently_used():
+    cache = InMemoryResponseCache(max_bytes=10)
+    cache.set('a', 'aaaa')
+    cache.set('b', 'bbbb')
+    assert cache.get('a') == 'aaaa'
+    cache.set('c', 'cccc')
+    assert cache.get('b') is None
+    assert cache.get('a') == 'aaaa'
+    assert cache.stats() == {'hits': 2, 'misses': 1, 'bytes_served': 8}
+
+
+def test_sqlite_cache_ttl_and_size_cap(tmp_path):
+    cache = SQLiteResponseCache(str(tmp_path / 'cache.db'), max_bytes=10, ttl=60)
+    cache.set('a', 'aaaa')
+    cache.set('b', 'bbbb')
+    cache.set('c', 'cccc')
+    assert cache.get('a') is None
+    assert cache.get('c') == 'cccc'
+
+    cache.ttl = 0
+    time.sleep(0.01)
+    assert cache.get('c') is None
+
+
+def test_cache_hit_is_free(monkeypatch):
+    monkeypatch.setattr(config.llm, 'response_cache', 'memory')
+    llm = LLM(model='gpt-4o', api_key='sk-test', llm_temperature=0)
+    messages = [{'role': 'user', 'content': 'cache me'}]
+
+    first = llm.completion(messages=messages, mock_response='cached!')
+    llm.completion_cost(first)
+    cost = llm.metrics.accumulated_cost
+    assert cost > 0
+
+    second = llm.completion(messages=messages, mock_response='cached!')
+    assert second['choices'][0]['message']['content'] == 'cached!'
+    assert llm.completion_cost(second) == 0.0
+    assert llm.metrics.accumulated_cost == cost
+    assert llm.metrics.cache_hits == 1
+    assert llm.metrics.cache_misses == 1
+
+
+def test_nondeterministic_requests_are_not_cached(monkeypatch):
+    monkeypatch.setattr(config.llm, 'response_cache', 'memory')
+    llm = LLM(model='gpt-4o', api_key='sk-test', llm_temperature=0.7)
+    messages = [{'role': 'user', 'content': 'sample me'}]
+    llm.completion(messages=messages, mock_response='one')
+    llm.completion(messages=messages, mock_response='one')
+    assert llm.metrics.cache_hits == 0
@@ -0,0 +1,44 @@
+import asyncio
+import gc
+
+from easyweb.llm.client_pool import LLMClientPool
+
+
+def test_clients_are_shared_per_endpoint_and_key():
+    pool = LLMClientPool()
+    client = pool.get_client('gpt-4o', None, 'sk-a')
+    assert pool.get_client('gpt-4o-mini', None, 'sk-a') is client
+    assert pool.get_client('gpt-4o', None, 'sk-b') is not client
+    assert pool.get_client('gpt-4o', 'http://localhost:8000/v1', 'sk-a') is not client
+    assert pool.stats()['clients'] == 3
+    pool.close()
+
+
+def test_async_clients_are_dropped_with_their_loop():
+    pool = LLMClientPool()
+
+    async def get_client():
+        return pool.get_async_client('gpt-4o', None, 'sk-a')
+
+    first = asyncio.run(get_client())
+    assert asyncio.run(get_client()) is not first
+    gc.collect()
+    assert pool.stats()['async_clients'] <= 1
+    pool.close()
+
+
+def test_other_providers_are_not_pooled():
+    pool = LLMClientPool()
+    assert pool.get_client('anthropic/claude-3-5-sonnet-20240620', None, 'k') is None
+    assert pool.stats()['clients'] == 0
+
+
+def test_model_info_is_memoized():
+    pool = LLMClientPool()
+    assert pool.get_model_info('gpt-4o') is not None
+    assert pool.get_model_info('gpt-4o') is not None
+    assert pool.get_model_info('not-a-real-model') is None
+    assert pool.get_model_info('not-a-real-model') is None
+    stats = pool.stats()
+    assert stats['model_info_hits'] == 2
+    assert stats['model_info_misses'] == 2
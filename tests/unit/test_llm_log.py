@@ -0,0 +1,36 @@
+import json
+import logging
+import os
+import queue
+from logging.handlers import QueueListener
+
+from easyweb.core.logger import LlmJsonlHandler, LlmQueueHandler
+
+
+def test_llm_log_writes_jsonl_per_session_and_rotates(tmp_path):
+    log_queue = queue.SimpleQueue()
+    handler = LlmJsonlHandler(str(tmp_path), max_bytes=300, backup_count=2)
+    listener = QueueListener(log_queue, handler)
+    llm_logger = logging.getLogger('test_llm_log')
+    llm_logger.propagate = False
+    llm_logger.setLevel(logging.DEBUG)
+    llm_logger.addHandler(LlmQueueHandler(log_queue))
+    listener.start()
+    try:
+        for i in range(10):
+            llm_logger.debug(
+                'prompt',
+                extra={'session_id': 'a/b', 'llm': {'id': str(i), 'content': 'x' * 50}},
+            )
+        llm_logger.debug('prompt', extra={'llm': {'id': 'other'}})
+    finally:
+        listener.stop()
+        handler.close()
+
+    files = sorted(os.listdir(tmp_path))
+    # the session id is sanitized, old files rotate up to backup_count
+    assert files == ['a_b.jsonl', 'a_b.jsonl.1', 'a_b.jsonl.2', 'default.jsonl']
+    with open(tmp_path / 'default.jsonl') as f:
+        entry = json.loads(f.readline())
+    assert entry['id'] == 'other'
+    assert entry['kind'] == 'test_llm_log'
@@ -0,0 +1,84 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from easyweb.llm.router import Endpoint, EndpointRouter, get_endpoint_stats
+
+
+def _warm_up(endpoint, latency):
+    stats = get_endpoint_stats(endpoint)
+    for _ in range(20):
+        stats.record_success(latency)
+
+
+def test_slow_request_is_hedged():
+    slow = Endpoint('hedge-model', 'http://slow')
+    fast = Endpoint('hedge-model', 'http://fast')
+    _warm_up(slow, 0.05)
+    router = EndpointRouter([slow, fast], hedge_budget=1.0)
+    discarded = []
+
+    def attempt(endpoint):
+        time.sleep(1.0 if endpoint == slow else 0.01)
+        return endpoint.base_url
+
+    start = time.monotonic()
+    assert router.call(attempt, on_discarded=discarded.append) == 'http://fast'
+    assert time.monotonic() - start < 0.5
+    assert router.stats()['hedge_wins'] == 1
+    time.sleep(1.1)
+    assert discarded == ['http://slow']
+
+
+def test_failover_on_error():
+    broken = Endpoint('failover-model', 'http://broken')
+    backup = Endpoint('failover-model', 'http://backup')
+    router = EndpointRouter([broken, backup], failover_after=1)
+
+    def attempt(endpoint):
+        if endpoint == broken:
+            raise ConnectionError('down')
+        return endpoint.base_url
+
+    assert router.call(attempt) == 'http://backup'
+    assert not get_endpoint_stats(broken).healthy
+    # the unhealthy endpoint is tried last from now on
+    assert asyncio.run(router.acall(_async(attempt))) == 'http://backup'
+    assert router.stats()['failovers'] == 1
+
+
+def test_unhedged_attempts_run_on_the_calling_thread():
+    # no latency history yet, so nothing to hedge against
+    broken = Endpoint('inline-model', 'http://broken')
+    backup = Endpoint('inline-model', 'http://backup')
+    router = EndpointRouter([broken, backup], hedge_budget=1.0)
+    threads = []
+
+    def attempt(endpoint):
+        threads.append(threading.current_thread())
+        if endpoint == broken:
+            raise ConnectionError('down')
+        return endpoint.base_url
+
+    assert router.call(attempt) == 'http://backup'
+    assert threads == [threading.current_thread()] * 2
+    assert router.stats()['failovers'] == 1
+
+
+def test_all_endpoints_failing_raises():
+    router = EndpointRouter([Endpoint('m', 'http://a'), Endpoint('m', 'http://b')])
+
+    def attempt(endpoint):
+        raise ConnectionError(endpoint.base_url)
+
+    with pytest.raises(ConnectionError, match='http://b'):
+        router.call(attempt)
+
+
+def _async(attempt):
+    async def run(endpoint):
+        return attempt(endpoint)
+
+    return run
@@ -0,0 +1,85 @@
+import re
+import timeit
+
+from easyweb.core.logger import (
+    MAX_REDACT_SCAN_CHARS,
+    REDACT_WINDOW_CHARS,
+    redact_sensitive,
+)
+
+
+def legacy_redact(msg: str) -> str:
+    # the per-key re.sub the filter used to run
+    sensitive_patterns = [
+        'api_key',
+        'aws_access_key_id',
+        'aws_secret_access_key',
+        'e2b_api_key',
+        'github_token',
+    ]
+    sensitive_patterns.extend([attr.upper() for attr in sensitive_patterns])
+    sensitive_patterns.append('LLM_API_KEY')
+    sensitive_patterns.append('SANDBOX_ENV_GITHUB_TOKEN')
+    for attr in sensitive_patterns:
+        msg = re.sub(rf"{attr}='?([\w-]+)'?", f"{attr}='******'", msg)
+    return msg
+
+
+SAMPLES = [
+    "LLMConfig(model='gpt-4o', api_key='sk-abc123', base_url=None)",
+    'export LLM_API_KEY=sk-abc-123 and AWS_SECRET_ACCESS_KEY=xyz',
+    "e2b_api_key='e2b_1' github_token=ghp_2 SANDBOX_ENV_GITHUB_TOKEN='ghp_3'",
+    'nothing to see here',
+]
+
+
+def make_observation(size: int, secret: bool) -> str:
+    line = 'StaticText "Add to cart" [bid=123] clickable, visible\n'
+    text = line * (size // len(line))
+    if secret:
+        middle = len(text) // 2
+        text = text[:middle] + "api_key='sk-hidden' " + text[middle:]
+    return text
+
+
+def test_redaction_matches_legacy():
+    for sample in SAMPLES:
+        assert redact_sensitive(sample) == legacy_redact(sample)
+
+
+def test_large_messages_are_redacted():
+    text = make_observation(MAX_REDACT_SCAN_CHARS * 4, secret=True)
+    text += ' AWS_ACCESS_KEY_ID=AKIA123'
+    redacted = redact_sensitive(text)
+    assert 'sk-hidden' not in redacted
+    assert 'AKIA123' not in redacted
+    assert redacted == legacy_redact(text)
+
+
+def test_values_longer_than_the_scan_window_are_redacted():
+    secret = 'sk-' + 'x' * REDACT_WINDOW_CHARS * 2
+    text = make_observation(MAX_REDACT_SCAN_CHARS * 2, secret=False)
+    text = f"{text}LLM_API_KEY='{secret}' api_key={secret}\n{text}"
+    redacted = redact_sensitive(text)
+    assert 'x' * 10 not in redacted
+    assert redacted == legacy_redact(text)
+
+
+def benchmark(number: int = 20) -> None:
+    """
+    Compares the legacy and the current redaction on small and large observation records:
+    python tests/unit/test_log_redaction.py
+    """
+    for size, secret in ((200, False), (300_000, False), (300_000, True)):
+        text = make_observation(size, secret)
+        legacy = timeit.timeit(lambda text=text: legacy_redact(text), number=number)
+        current = timeit.timeit(lambda text=text: redact_sensitive(text), number=number)
+        print(
+            f'{size} byte record, secret={secret}: '
+            f'legacy {legacy / number * 1000:.2f} ms, '
+            f'current {current / number * 1000:.3f} ms'
+        )
+
+
+if __name__ == '__main__':
+    benchmark()
@@ -0,0 +1,31 @@
+import json
+
+from easyweb.core.metrics import CompletionRecord, Histogram, LLMStats
+
+
+def test_histogram_percentiles():
+    histogram = Histogram(buckets=(1, 2, 5))
+    for value in [0.5] * 98 + [4, 10]:
+        histogram.observe(value)
+    assert histogram.percentile(0.5) == 1
+    assert histogram.percentile(0.99) == 5
+    # the overflow bucket reports the last bound
+    assert histogram.percentile(1.0) == 5
+
+
+def test_histogram_overflow_is_json_serializable():
+    histogram = Histogram(buckets=(1, 2, 5))
+    histogram.observe(60)
+    assert histogram.percentile(0.5) == 5
+    assert json.loads(json.dumps({'p50': histogram.percentile(0.5)})) == {'p50': 5}
+    assert Histogram().percentile(0.5) is None
+
+
+def test_process_wide_stats_per_model():
+    stats = LLMStats()
+    stats.record(CompletionRecord('gpt-4o', 100, 50, 20, latency=2.0))
+    stats.record(CompletionRecord('gpt-4o', 100, 50, 0, latency=3.0, retries=1))
+    summary = stats.get()['gpt-4o']
+    assert summary['requests'] == 2
+    assert summary['cached_tokens'] == 20
+    assert summary['tokens_per_second'] == 20.0
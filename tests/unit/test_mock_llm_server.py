@@ -0,0 +1,60 @@
+import pytest
+from litellm.exceptions import RateLimitError
+
+from easyweb.llm.llm import LLM
+from easyweb.server.mock.llm_server import (
+    LatencyDistribution,
+    MockLLMConfig,
+    MockLLMServer,
+)
+
+
+@pytest.fixture
+def server():
+    with MockLLMServer(MockLLMConfig(responses=['first', 'second'])) as server:
+        yield server
+
+
+def make_llm(server, num_retries=1):
+    return LLM(
+        model='openai/mock',
+        base_url=server.base_url,
+        api_key='mock',
+        num_retries=num_retries,
+        retry_min_wait=0,
+        retry_max_wait=0,
+    )
+
+
+def test_completion_with_usage(server):
+    llm = make_llm(server)
+    messages = [{'role': 'user', 'content': 'Hello there'}]
+    resp = llm.completion(messages=messages)
+    assert resp['choices'][0]['message']['content'] == 'first'
+    assert resp.usage.prompt_tokens > 0
+    resp = llm.completion(messages=messages)
+    assert resp['choices'][0]['message']['content'] == 'second'
+    assert server.stats()['requests'] == 2
+
+
+def test_streaming(server):
+    llm = make_llm(server)
+    resp = llm.stream_completion(messages=[{'role': 'user', 'content': 'Hi'}])
+    assert resp['choices'][0]['message']['content'] == 'first'
+    assert server.stats()['streams'] == 1
+
+
+def test_rate_limit_injection():
+    config = MockLLMConfig(rate_limit_rate=1.0, retry_after=0)
+    with MockLLMServer(config) as server:
+        llm = make_llm(server)
+        with pytest.raises(RateLimitError):
+            llm.completion(messages=[{'role': 'user', 'content': 'Hi'}])
+        assert server.stats()['rate_limited'] >= 1
+
+
+def test_latency_distribution_parse():
+    distribution = LatencyDistribution.parse('uniform:0.1:0.2')
+    assert distribution.kind == 'uniform'
+    with pytest.raises(ValueError):
+        LatencyDistribution.parse('bogus:1')
@@ -0,0 +1,52 @@
+import time
+
+from fastapi import FastAPI, Request
+from fastapi.testclient import TestClient
+
+from easyweb.server.options import CachedOptions
+
+
+def make_client(ttl=600):
+    calls = []
+
+    def build():
+        calls.append(time.monotonic())
+        return ['model-a', f'model-{len(calls)}']
+
+    options = CachedOptions('test', build, ttl=ttl)
+    app = FastAPI()
+
+    @app.get('/options')
+    async def get_options(request: Request):
+        return await options.response(request)
+
+    return TestClient(app), calls
+
+
+def test_etag_revalidation():
+    client, calls = make_client()
+    response = client.get('/options')
+    assert response.json() == ['model-a', 'model-1']
+    etag = response.headers['etag']
+
+    response = client.get('/options', headers={'If-None-Match': etag})
+    assert response.status_code == 304
+    assert response.headers['etag'] == etag
+    assert (
+        client.get('/options', headers={'If-None-Match': '"other"'}).status_code == 200
+    )
+    assert len(calls) == 1
+
+
+def test_stale_snapshot_is_served_while_refreshing():
+    client, calls = make_client(ttl=0)
+    first = client.get('/options')
+    # stale: served as is, with a refresh started in the background
+    assert client.get('/options').json() == first.json()
+    for _ in range(100):
+        if len(calls) >= 2:
+            break
+        time.sleep(0.01)
+    response = client.get('/options')
+    assert response.json()[1] != 'model-1'
+    assert response.headers['etag'] != first.headers['etag']
@@ -0,0 +1,32 @@
+from easyweb.core.prometheus import Counter, Gauge, Histogram, Registry
+
+
+def test_render_exposition_format():
+    registry = Registry()
+    requests = registry.register(Counter('requests_total', 'Requests.', ['model']))
+    requests.inc(model='gpt-4o')
+    requests.inc(2, model='gpt-4o')
+    requests.inc(model='a "quoted"\nname')
+    latency = registry.register(
+        Histogram('latency_seconds', 'Latency.', buckets=(0.1, 1))
+    )
+    latency.observe(0.05)
+    latency.observe(0.5)
+    latency.observe(5)
+
+    def collect():
+        pending = Gauge('pending', 'Pending.')
+        pending.set(3)
+        return [pending]
+
+    registry.register_collector(collect)
+    text = registry.render()
+    assert '# TYPE requests_total counter' in text
+    assert 'requests_total{model="gpt-4o"} 3' in text
+    assert 'requests_total{model="a \\"quoted\\"\\nname"} 1' in text
+    assert 'latency_seconds_bucket{le="0.1"} 1' in text
+    assert 'latency_seconds_bucket{le="1"} 2' in text
+    assert 'latency_seconds_bucket{le="+Inf"} 3' in text
+    assert 'latency_seconds_sum 5.55' in text
+    assert 'latency_seconds_count 3' in text
+    assert '# TYPE pending gauge\npending 3' in text
@@ -0,0 +1,29 @@
+from easyweb.llm.prompt_cache import add_cache_control, supports_cache_control
+
+
+def test_supports_cache_control():
+    assert supports_cache_control('anthropic/claude-3-haiku-20240307')
+    assert supports_cache_control('bedrock/anthropic.claude-3-haiku-20240307-v1:0')
+    # openai caches repeated prefixes without markers
+    assert not supports_cache_control('gpt-4o')
+
+
+def test_add_cache_control_marks_last_system_message():
+    messages = [
+        {'role': 'system', 'content': 'instructions'},
+        {'role': 'system', 'content': 'action space'},
+        {'role': 'user', 'content': 'goal and page'},
+    ]
+    marked = add_cache_control(messages)
+    assert marked[0] == messages[0]
+    assert marked[1]['content'] == [
+        {'type': 'text', 'text': 'action space', 'cache_control': {'type': 'ephemeral'}}
+    ]
+    assert marked[2] == messages[2]
+    # the caller's messages are left as they were
+    assert messages[1]['content'] == 'action space'
+
+
+def test_add_cache_control_without_static_prefix():
+    messages = [{'role': 'user', 'content': 'Hello'}]
+    assert add_cache_control(messages) == messages
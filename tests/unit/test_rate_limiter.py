@@ -0,0 +1,87 @@
+import asyncio
+import threading
+import time
+
+from easyweb.llm.rate_limiter import MAX_WAIT_INTERVAL, EndpointLimiter
+
+
+def test_concurrency_cap():
+    limiter = EndpointLimiter(max_concurrent_requests=1)
+    first = limiter.acquire(owner=1, tokens=10)
+    acquired = threading.Event()
+
+    def second_request():
+        ticket = limiter.acquire(owner=2, tokens=10)
+        acquired.set()
+        limiter.release(ticket)
+
+    thread = threading.Thread(target=second_request)
+    thread.start()
+    assert not acquired.wait(0.2)
+    limiter.release(first)
+    assert acquired.wait(2)
+    thread.join()
+
+
+def test_owners_are_served_round_robin():
+    limiter = EndpointLimiter(max_concurrent_requests=1)
+    blocker = limiter.acquire(owner=0, tokens=1)
+    order = []
+
+    def request(owner):
+        ticket = limiter.acquire(owner=owner, tokens=1)
+        order.append(owner)
+        limiter.release(ticket)
+
+    threads = []
+    for owner in [1, 1, 1, 2]:
+        thread = threading.Thread(target=request, args=(owner,))
+        thread.start()
+        threads.append(thread)
+        time.sleep(0.05)
+    limiter.release(blocker)
+    for thread in threads:
+        thread.join()
+    assert order[:2] == [1, 2]
+
+
+def test_rate_limit_headers_and_429_feedback():
+    limiter = EndpointLimiter()
+    ticket = limiter.acquire(owner=1, tokens=10)
+    limiter.release(
+        ticket,
+        used_tokens=12,
+        headers={
+            'llm_provider-x-ratelimit-limit-requests': '60',
+            'llm_provider-x-ratelimit-remaining-requests': '0',
+        },
+    )
+    stats = limiter.stats()
+    assert stats['requests_per_minute'] == 60
+    start = time.monotonic()
+    limiter.release(limiter.acquire(owner=1, tokens=10))
+    assert time.monotonic() - start >= 0.5
+
+    ticket = limiter.acquire(owner=1, tokens=10)
+    limiter.release(ticket, headers={'retry-after': '0.3'}, rate_limited=True)
+    assert limiter.stats()['rate_limited'] == 1
+    assert limiter.blocked_until > time.monotonic()
+
+
+def test_async_waiter_wakes_on_release():
+    limiter = EndpointLimiter(max_concurrent_requests=1)
+    first = limiter.acquire(owner=1, tokens=10)
+
+    async def run():
+        waiter = asyncio.create_task(limiter.aacquire(owner=2, tokens=10))
+        await asyncio.sleep(0.05)
+        assert not waiter.done()
+        # released from another thread, as by a sync completion
+        start = time.monotonic()
+        threading.Thread(target=limiter.release, args=(first,)).start()
+        ticket = await waiter
+        assert time.monotonic() - start < MAX_WAIT_INTERVAL / 2
+        limiter.release(ticket)
+
+    asyncio.run(run())
+    assert limiter.stats()['in_flight'] == 0
@@ -0,0 +1,115 @@
+import threading
+
+import pytest
+
+from agenthub.new_world_model_agent.reasoners.base import (
+    Evaluator,
+    LanguageModel,
+    Reasoner,
+)
+from easyweb.core.cancellation import (
+    CancellationToken,
+    get_current_token,
+    raise_if_cancelled,
+    use_token,
+)
+from easyweb.core.exceptions import AgentStepCancelledError
+
+
+class _Model(LanguageModel):
+    def generate(self, prompt, **kwargs):
+        pass
+
+    def get_next_token_logits(self, prompt, candidates, **kwargs):
+        pass
+
+    def get_loglikelihood(self, prompt, **kwargs):
+        pass
+
+
+class _Component:
+    def __init__(self, model):
+        self.model = model
+        self.example = None
+        self.history = []
+
+    def update_example(self, example, prompt=None):
+        self.example = example
+
+
+class _Search:
+    def __init__(self, run):
+        self.run = run
+
+    def __call__(self, world_model, search_config, **kwargs):
+        return self.run(world_model)
+
+
+class _Evaluator(Evaluator):
+    def __init__(self):
+        self.input_processor = lambda example: example
+
+    def sample_prompt(self, shuffle_prompt, num_shot, sample_prompt_type):
+        pass
+
+    def eval_output(self, answer, output):
+        pass
+
+
+def _reasoner(run):
+    model = _Model()
+    return Reasoner(_Component(model), _Component(model), _Search(run))
+
+
+def test_fork_copies_state_and_shares_models():
+    reasoner = _reasoner(lambda world_model: None)
+    reasoner.world_model.history.append('step')
+    fork = reasoner.fork()
+    fork.world_model.history.append('other step')
+    assert reasoner.world_model.history == ['step']
+    assert fork.world_model is not reasoner.world_model
+    assert fork.world_model.model is reasoner.world_model.model
+    assert fork.search_config.model is reasoner.search_config.model
+
+
+def test_run_sc_keeps_order_and_skips_failed_runs():
+    calls = []
+    lock = threading.Lock()
+
+    def run(world_model):
+        with lock:
+            calls.append(world_model.example)
+            j = len(calls)
+        if j == 2:
+            raise RuntimeError('boom')
+        return j
+
+    outputs = _Evaluator()._run_sc(_reasoner(run), 'q', None, 4, 2)
+    assert len(outputs) == 3
+    assert calls == ['q'] * 4
+
+    def fail(world_model):
+        raise RuntimeError('boom')
+
+    with pytest.raises(RuntimeError, match='boom'):
+        _Evaluator()._run_sc(_reasoner(fail), 'q', None, 3, 3)
+
+
+def test_run_sc_runs_see_the_step_token():
+    token = CancellationToken()
+
+    def run(world_model):
+        return get_current_token()
+
+    with use_token(token):
+        outputs = _Evaluator()._run_sc(_reasoner(run), 'q', None, 3, 3)
+    assert outputs == [token] * 3
+
+    token.cancel('agent stopped')
+
+    def stopped(world_model):
+        raise_if_cancelled()
+
+    with use_token(token):
+        with pytest.raises(AgentStepCancelledError, match='agent stopped'):
+            _Evaluator()._run_sc(_reasoner(stopped), 'q', None, 3, 3)
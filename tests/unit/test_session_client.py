@@ -0,0 +1,95 @@
+import asyncio
+import base64
+from io import BytesIO
+
+from aiohttp import web
+from PIL import Image
+
+from easyweb.client import MessageLog, ScreenshotWindow, SessionClient, load_messages
+
+
+def make_screenshot(color) -> str:
+    buffer = BytesIO()
+    Image.new('RGB', (4, 4), color).save(buffer, format='PNG')
+    return base64.b64encode(buffer.getvalue()).decode()
+
+
+def test_window_reloads_old_screenshots(tmp_path):
+    log = MessageLog(str(tmp_path / 'log.jsonl'))
+    window = ScreenshotWindow(size=2, load=log.screenshot)
+    for i, color in enumerate(['red', 'green', 'blue']):
+        screenshot = make_screenshot(color)
+        log.write(
+            {'id': i, 'observation': 'browse', 'extras': {'screenshot': screenshot}}
+        )
+        window.add(screenshot, f'https://example.com/{i}', event_id=i)
+
+    assert len(window._decoded) == 2
+    image, url = window[0]
+    assert url == 'https://example.com/0'
+    assert image.getpixel((0, 0)) == (255, 0, 0)
+    assert len(window._decoded) == 2
+    assert window.urls() == [f'https://example.com/{i}' for i in range(3)]
+
+
+def test_load_messages_reads_both_formats(tmp_path):
+    log = MessageLog(str(tmp_path / 'log.jsonl'))
+    log.write({'id': 0, 'message': 'hi'})
+    log.close()
+    assert load_messages(log.path) == [{'id': 0, 'message': 'hi'}]
+
+    legacy = tmp_path / 'log.json'
+    legacy.write_text('[{"id": 0}]')
+    assert load_messages(str(legacy)) == [{'id': 0}]
+
+
+async def run_client(tmp_path):
+    screenshot = make_screenshot('red')
+    connections = []
+
+    async def ws_handler(request):
+        connections.append(dict(request.query))
+        ws = web.WebSocketResponse()
+        await ws.prepare(request)
+        await ws.send_json({'token': 'abc', 'status': 'ok'})
+        await ws.send_json(
+            {
+                'id': 7,
+                'observation': 'browse',
+                'extras': {'screenshot': screenshot, 'url': 'https://example.com'},
+            }
+        )
+        await ws.receive()
+        return ws
+
+    app = web.Application()
+    app.router.add_get('/ws', ws_handler)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, '127.0.0.1', 0)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]
+
+    client = SessionClient(
+        f'http://127.0.0.1:{port}', MessageLog(str(tmp_path / 'log.jsonl'))
+    )
+    try:
+        await client.connect()
+        assert (await client.recv())['token'] == 'abc'
+        message = await client.recv()
+        # resumes the session where it left off
+        await client.connect()
+    finally:
+        await client.close()
+        await runner.cleanup()
+    return client, message, connections
+
+
+def test_client_streams_to_log(tmp_path):
+    client, message, connections = asyncio.run(run_client(tmp_path))
+    assert message['screenshot_index'] == 0
+    assert 'screenshot' not in message['extras']
+    assert client.screenshots[0][1] == 'https://example.com'
+    assert connections == [{}, {'token': 'abc', 'latest_event_id': '7'}]
+    logged = load_messages(client.log.path)
+    assert logged[1]['extras']['screenshot']
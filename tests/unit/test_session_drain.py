@@ -0,0 +1,86 @@
+import asyncio
+
+
+class _WebSocket:
+    def __init__(self):
+        self.sent = []
+        self.close_code = None
+
+    async def send_json(self, data):
+        self.sent.append(data)
+
+    async def close(self, code=1000):
+        self.close_code = code
+
+
+class _State:
+    def save_to_session(self, sid):
+        pass
+
+
+class _Tracer:
+    spans: list = []
+
+
+class _Controller:
+    def __init__(self):
+        self.step_in_progress = True
+        self.held = False
+        self.tracer = _Tracer()
+
+    def hold_steps(self):
+        self.held = True
+
+    def get_state(self):
+        return _State()
+
+    async def close(self, set_stop_state=True):
+        pass
+
+
+def _manager():
+    # importing the session package starts the session manager, which needs a running loop
+    from easyweb.server.session.manager import SessionManager
+    from easyweb.server.session.session import Session
+
+    manager = SessionManager()
+    manager._sessions = {}
+    websocket = _WebSocket()
+    session = Session(sid='drain', ws=websocket)
+    session.agent_session.controller = _Controller()
+    manager._sessions['drain'] = session
+    return manager, session, websocket
+
+
+def test_drain_waits_for_the_held_step():
+    async def run():
+        manager, session, websocket = _manager()
+        controller = session.agent_session.controller
+
+        def finish_step():
+            controller.step_in_progress = False
+
+        asyncio.get_running_loop().call_later(0.1, finish_step)
+        report = await manager.drain(deadline=5)
+        assert controller.held
+        assert report['sessions'] == 1
+        assert report['sessions_preserved'] == 1
+        assert report['steps_interrupted'] == 0
+        assert report['drain_seconds'] < 5
+        assert websocket.sent[-1]['reconnect'] is True
+        assert websocket.close_code == 1012
+        assert not session.is_alive and not manager._sessions
+        assert manager.draining
+
+    asyncio.run(run())
+
+
+def test_drain_counts_steps_past_the_deadline_as_interrupted():
+    async def run():
+        manager, session, websocket = _manager()
+        report = await manager.drain(deadline=0.3)
+        assert report['steps_interrupted'] == 1
+        assert report['sessions_preserved'] == 1
+        assert websocket.sent[-1]['reconnect'] is True
+
+    asyncio.run(run())
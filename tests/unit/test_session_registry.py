@@ -0,0 +1,62 @@
+import time
+
+import pytest
+
+from easyweb.server.registry import (
+    InMemorySessionRegistry,
+    SQLiteSessionRegistry,
+    WorkerInfo,
+)
+
+
+@pytest.fixture(params=['memory', 'sqlite'])
+def registry(request, tmp_path):
+    if request.param == 'memory':
+        return InMemorySessionRegistry(worker_ttl=0.5)
+    return SQLiteSessionRegistry(str(tmp_path / 'registry.db'), worker_ttl=0.5)
+
+
+def test_claim_routes_to_owner(registry):
+    registry.register_worker(WorkerInfo('a', 'http://127.0.0.1:5000'))
+    registry.register_worker(WorkerInfo('b', 'http://127.0.0.1:5001'))
+    registry.claim('sid', 'b')
+    assert registry.get_owner('sid').url == 'http://127.0.0.1:5001'
+    assert registry.sessions_of('b') == ['sid']
+
+    # a stale release from the previous owner keeps the new claim
+    registry.claim('sid', 'a')
+    registry.release('sid', 'b')
+    assert registry.get_owner('sid').worker_id == 'a'
+    registry.release('sid', 'a')
+    assert registry.get_owner('sid') is None
+
+
+def test_least_loaded(registry):
+    registry.register_worker(WorkerInfo('a', 'http://127.0.0.1:5000'))
+    registry.register_worker(WorkerInfo('b', 'http://127.0.0.1:5001'))
+    registry.heartbeat('a', 3)
+    registry.heartbeat('b', 1)
+    assert registry.least_loaded().worker_id == 'b'
+
+
+def test_dead_workers_are_skipped(registry):
+    registry.register_worker(WorkerInfo('a', 'http://127.0.0.1:5000'))
+    registry.register_worker(WorkerInfo('b', 'http://127.0.0.1:5001'))
+    registry.claim('sid', 'a')
+    time.sleep(0.6)
+    registry.heartbeat('b', 5)
+    assert registry.get_owner('sid') is None
+    assert [worker.worker_id for worker in registry.list_workers()] == ['b']
+    assert len(registry.list_workers(include_dead=True)) == 2
+
+    registry.remove_worker('a')
+    assert registry.get_owner_id('sid') is None
+
+
+def test_sqlite_registry_is_shared(tmp_path):
+    path = str(tmp_path / 'registry.db')
+    worker = SQLiteSessionRegistry(path)
+    router = SQLiteSessionRegistry(path)
+    worker.register_worker(WorkerInfo('a', 'http://127.0.0.1:5000'))
+    worker.claim('sid', 'a')
+    assert router.get_owner('sid').worker_id == 'a'
@@ -0,0 +1,42 @@
+import contextvars
+import json
+from concurrent.futures import ThreadPoolExecutor
+
+from easyweb.core.tracing import Tracer, current_trace_id, span, trace_context
+
+
+def test_unsampled_trace_records_nothing():
+    tracer = Tracer(sample_rate=0.0)
+    trace_id = tracer.start_trace()
+    assert trace_id is None
+    with trace_context(tracer, trace_id):
+        with span('controller.step'):
+            pass
+    assert tracer.spans == []
+
+
+def test_spans_are_recorded_across_threads():
+    tracer = Tracer(sid='test', sample_rate=1.0)
+    trace_id = tracer.start_trace()
+    with trace_context(tracer, trace_id):
+        assert current_trace_id() == trace_id
+        with span('controller.step', iteration=1):
+
+            def complete():
+                with span('llm.completion', model='gpt-4o'):
+                    return current_trace_id()
+
+            # as the controller runs agent steps in its executor
+            with ThreadPoolExecutor(max_workers=1) as executor:
+                ctx = contextvars.copy_context()
+                assert executor.submit(ctx.run, complete).result() == trace_id
+    assert current_trace_id() is None
+
+    names = [s.name for s in tracer.spans]
+    assert names == ['llm.completion', 'controller.step']
+    assert all(s.trace_id == trace_id for s in tracer.spans)
+
+    chrome = json.loads(tracer.export('chrome'))
+    step = chrome['traceEvents'][1]
+    assert step['ph'] == 'X'
+    assert step['args'] == {'trace_id': trace_id, 'iteration': 1}
@@ -0,0 +1,46 @@
+import asyncio
+import io
+
+import pytest
+from fastapi import UploadFile
+
+from easyweb.core.exceptions import UploadTooLargeError
+from easyweb.server import upload
+from easyweb.server.upload import stream_upload
+from easyweb.storage.local import LocalFileStore
+from easyweb.storage.memory import InMemoryFileStore
+
+
+def make_upload(contents: bytes, filename='data.csv') -> UploadFile:
+    return UploadFile(io.BytesIO(contents), filename=filename)
+
+
+def test_streams_in_chunks(tmp_path, monkeypatch):
+    monkeypatch.setattr(upload, 'CHUNK_SIZE', 4)
+    monkeypatch.setattr(upload, 'PROGRESS_INTERVAL', 0)
+    store = LocalFileStore(str(tmp_path))
+    progress = []
+
+    async def on_progress(update):
+        progress.append(update['bytes'])
+
+    size = asyncio.run(
+        stream_upload(make_upload(b'0123456789'), store, on_progress=on_progress)
+    )
+    assert size == 10
+    assert store.read('data.csv') == '0123456789'
+    assert progress == [4, 8, 10, 10]
+
+
+def test_size_limit_leaves_no_file(tmp_path, monkeypatch):
+    monkeypatch.setattr(upload, 'CHUNK_SIZE', 4)
+    store = LocalFileStore(str(tmp_path))
+    with pytest.raises(UploadTooLargeError):
+        asyncio.run(stream_upload(make_upload(b'0123456789'), store, max_bytes=6))
+    assert store.list('') == []
+
+
+def test_buffered_writer():
+    store = InMemoryFileStore()
+    asyncio.run(stream_upload(make_upload(b'abc'), store))
+    assert store.read('data.csv') == b'abc'